@@ -1,3 +1,9 @@
-from web_scraper.services import EyewikiService, MedicalNewsTodayService
+__all__ = ['EyewikiService', 'MedicalNewsTodayService']
 
-__all__ = ['EyewikiService', 'MedicalNewsTodayService']
\ No newline at end of file
+
+def __getattr__(name):
+    # Loaded on first use, importing web_scraper.cli should not start the whole crawler
+    if name in __all__:
+        from web_scraper import services
+        return getattr(services, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
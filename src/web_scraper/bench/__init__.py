@@ -0,0 +1,15 @@
+from .database import CountingDatabase, DatabaseCounters, attach_database
+from .fixture_site import FixtureSite, serve
+from .runner import compare, format_comparison, format_report, run_benchmark
+
+__all__ = [
+    'CountingDatabase',
+    'DatabaseCounters',
+    'FixtureSite',
+    'attach_database',
+    'compare',
+    'format_comparison',
+    'format_report',
+    'run_benchmark',
+    'serve'
+]
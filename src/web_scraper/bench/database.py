@@ -0,0 +1,131 @@
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+from pymongo import MongoClient
+
+from web_scraper.config.config import Config
+from web_scraper.database.client import DatabaseClient
+from web_scraper.database.migrations import ensure_indexes
+
+try:
+    import mongomock
+except ImportError:  # only --db mongo is available
+    mongomock = None
+
+WRITE_METHODS = (
+    'insert_one', 'insert_many', 'update_one', 'update_many', 'replace_one', 'delete_one',
+    'delete_many', 'bulk_write', 'find_one_and_update', 'find_one_and_delete'
+)
+READ_METHODS = ('find', 'find_one', 'count_documents', 'aggregate', 'distinct')
+
+
+class DatabaseCounters:
+    """Round trips, documents written and call latencies, shared by all collections."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = Counter()
+        self.documents_written = 0
+        self.latencies: List[float] = []
+
+    def record(self, kind: str, documents: int, elapsed: float):
+        with self.lock:
+            self.calls[kind] += 1
+            self.documents_written += documents
+            self.latencies.append(elapsed)
+
+    def reset(self):
+        with self.lock:
+            self.calls = Counter()
+            self.documents_written = 0
+            self.latencies = []
+
+    @property
+    def writes(self) -> int:
+        return self.calls['write']
+
+    @property
+    def reads(self) -> int:
+        return self.calls['read']
+
+
+def _documents(method: str, args) -> int:
+    if method in ('insert_many', 'bulk_write') and args:
+        return len(args[0])
+    return 1
+
+
+class CountingCollection:
+    def __init__(self, collection, counters: DatabaseCounters):
+        self._collection = collection
+        self._counters = counters
+
+    def __getattr__(self, name):
+        attribute = getattr(self._collection, name)
+        if name in WRITE_METHODS:
+            kind = 'write'
+        elif name in READ_METHODS:
+            kind = 'read'
+        else:
+            return attribute
+
+        def counted(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return attribute(*args, **kwargs)
+            finally:
+                documents = _documents(name, args) if kind == 'write' else 0
+                self._counters.record(kind, documents, time.perf_counter() - started)
+
+        return counted
+
+
+class CountingDatabase:
+    """Database whose collections count every round trip made through them."""
+
+    def __init__(self, db, counters: DatabaseCounters):
+        self._db = db
+        self._counters = counters
+
+    def __getattr__(self, name):
+        attribute = getattr(self._db, name)
+        if hasattr(attribute, 'bulk_write'):
+            return CountingCollection(attribute, self._counters)
+        return attribute
+
+    def __getitem__(self, name):
+        return CountingCollection(self._db[name], self._counters)
+
+
+def attach_database(backend: str = 'memory', name: Optional[str] = None) -> DatabaseCounters:
+    """Point DatabaseClient at a fresh benchmark database and count its use.
+
+    ``memory`` keeps everything in process with mongomock; ``mongo`` uses
+    the configured server with a separate database that is dropped first.
+    """
+    if backend == 'memory':
+        if mongomock is None:
+            raise RuntimeError('The in-memory benchmark database needs mongomock, install the bench extra')
+        client = mongomock.MongoClient()
+    else:
+        client = MongoClient(
+            Config.MONGODB_URI,
+            username=Config.MONGODB_USERNAME,
+            password=Config.MONGODB_PASSWORD,
+            authSource=Config.MONGODB_AUTH_SOURCE,
+            connectTimeoutMS=30000
+        )
+    name = name or f"{Config.MONGODB_DB}_bench"
+    client.drop_database(name)
+    counters = DatabaseCounters()
+    ensure_indexes(client[name])
+    DatabaseClient.attach(client, CountingDatabase(client[name], counters))
+    counters.reset()
+    return counters
+
+
+def collection_sizes() -> Dict[str, int]:
+    db = DatabaseClient().db
+    return {name: db[name].count_documents({}) for name in db.list_collection_names()}
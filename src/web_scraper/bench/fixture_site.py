@@ -0,0 +1,175 @@
+import hashlib
+import random
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional, Tuple
+
+WORDS = (
+    'retina cornea lens glaucoma cataract macula optic nerve pressure vision patient treatment '
+    'surgery laser drops diagnosis symptom chronic acute therapy clinical study trial risk dose '
+    'infection inflammation diabetes blood sugar heart brain sleep diet exercise vitamin protein '
+    'cell tissue gene immune response doctor hospital test result effect outcome evidence review'
+).split()
+
+SHAPES = ('eyewiki', 'medicalnewstoday')
+# Fixed date, so a revisit run sees unchanged pages unless the site is regenerated
+LAST_MODIFIED = formatdate(1700000000, usegmt=True)
+
+
+class FixtureSite:
+    """Deterministic site of ``pages`` interlinked pages shaped like a real one.
+
+    ``eyewiki`` pages look like MediaWiki articles (div#mw-content-text,
+    edit section links, Category: pages, PDF attachments),
+    ``medicalnewstoday`` pages like news articles (<article>, authors,
+    /categories/ listings). The same seed always renders the same site.
+    """
+
+    def __init__(self, pages: int = 200, shape: str = 'eyewiki', links_per_page: int = 12,
+                 sections: int = 6, seed: int = 0):
+        if shape not in SHAPES:
+            raise ValueError(f"Unknown fixture shape '{shape}', expected one of {', '.join(SHAPES)}")
+        self.pages = pages
+        self.shape = shape
+        self.links_per_page = links_per_page
+        self.sections = sections
+        self.seed = seed
+
+    def page_path(self, index: int) -> str:
+        if self.shape == 'eyewiki':
+            return '/' if index == 0 else f'/Article_{index}'
+        return '/' if index == 0 else f'/articles/{index}'
+
+    def _index(self, path: str) -> Optional[int]:
+        if path == '/':
+            return 0
+        prefix = '/Article_' if self.shape == 'eyewiki' else '/articles/'
+        if path.startswith(prefix) and path[len(prefix):].isdigit():
+            index = int(path[len(prefix):])
+            return index if 0 < index < self.pages else None
+        return None
+
+    def render(self, path: str) -> Optional[str]:
+        if path == '/robots.txt':
+            return 'User-agent: *\nAllow: /\n'
+        index = self._index(path)
+        if index is None:
+            return None
+        rng = random.Random(self.seed * 1_000_003 + index)
+        if self.shape == 'eyewiki':
+            return self._render_wiki(index, rng)
+        return self._render_news(index, rng)
+
+    def _words(self, rng: random.Random, count: int) -> str:
+        return ' '.join(rng.choice(WORDS) for _ in range(count))
+
+    def _targets(self, index: int, rng: random.Random) -> List[int]:
+        # A chain through every page keeps the whole site reachable from the home page
+        targets = {(index + 1) % self.pages}
+        while len(targets) < min(self.links_per_page, self.pages - 1):
+            targets.add(rng.randrange(self.pages))
+        targets.discard(index)
+        return sorted(targets)
+
+    def _render_wiki(self, index: int, rng: random.Random) -> str:
+        title = f'Article {index}'
+        parts = [f'<p><b>{title}</b> {self._words(rng, 60)}</p>']
+        for section in range(self.sections):
+            heading = self._words(rng, 3).title()
+            anchor = heading.replace(' ', '_')
+            parts.append(
+                f'<h2><span class="mw-headline" id="{anchor}">{heading}</span>'
+                f'<span class="mw-editsection">[<a href="/index.php?title=Article_{index}'
+                f'&amp;action=edit&amp;section={section + 1}">edit</a>]</span></h2>'
+            )
+            parts.append(f'<p>{self._words(rng, 120)}</p>')
+            if section % 2:
+                parts.append(f'<h3><span class="mw-headline">{self._words(rng, 2).title()}</span></h3>')
+                parts.append(f'<p>{self._words(rng, 80)}</p>')
+        links = ''.join(
+            f'<li><a href="{self.page_path(target)}">Article {target}</a></li>'
+            for target in self._targets(index, rng)
+        )
+        parts.append(f'<h2><span class="mw-headline" id="See_also">See also</span></h2><ul>{links}</ul>')
+        parts.append(f'<p><a href="/images/Article_{index}.pdf">Handout (PDF)</a></p>')
+        return (
+            f'<!DOCTYPE html><html><head><title>{title} - EyeWiki</title></head><body>'
+            f'<div id="mw-navigation"><a href="/">Main Page</a> <a href="/Category:Cornea">Cornea</a></div>'
+            f'<h1 id="firstHeading">{title}</h1>'
+            f'<div id="mw-content-text"><div class="mw-parser-output">{"".join(parts)}</div></div>'
+            f'<div id="footer">{self._words(rng, 20)}</div></body></html>'
+        )
+
+    def _render_news(self, index: int, rng: random.Random) -> str:
+        title = self._words(rng, 6).capitalize()
+        parts = [
+            f'<h1>{title}</h1>',
+            f'<span class="author-name">{self._words(rng, 2).title()}</span>',
+            f'<p>{self._words(rng, 80)}</p>'
+        ]
+        for _ in range(self.sections):
+            parts.append(f'<h2>{self._words(rng, 4).capitalize()}</h2>')
+            parts.append(f'<p>{self._words(rng, 140)}</p>')
+        links = ''.join(
+            f'<li><a href="{self.page_path(target)}">{self._words(rng, 4)}</a></li>'
+            for target in self._targets(index, rng)
+        )
+        parts.append(f'<aside><h2>Related</h2><ul>{links}</ul></aside>')
+        return (
+            f'<!DOCTYPE html><html><head><title>{title}</title>'
+            f'<script>window.dataLayer = [];</script></head><body>'
+            f'<nav><a href="/">Home</a> <a href="/categories/eye-health">Eye health</a></nav>'
+            f'<article>{"".join(parts)}</article>'
+            f'<footer>{self._words(rng, 20)}</footer></body></html>'
+        )
+
+
+def _handler(site: FixtureSite):
+    class FixtureHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            body = site.render(self.path.split('?')[0].split('#')[0])
+            if body is None:
+                self._send(404, b'Not found', 'text/plain')
+                return
+            data = body.encode('utf-8')
+            etag = '"' + hashlib.md5(data).hexdigest() + '"'
+            if self.headers.get('If-None-Match') == etag:
+                self._send(304, b'', None, etag)
+                return
+            content_type = 'text/plain' if self.path == '/robots.txt' else 'text/html; charset=utf-8'
+            self._send(200, data, content_type, etag)
+
+        def _send(self, status: int, data: bytes, content_type: Optional[str], etag: Optional[str] = None):
+            self.send_response(status)
+            if content_type:
+                self.send_header('Content-Type', content_type)
+            if etag:
+                self.send_header('ETag', etag)
+                self.send_header('Last-Modified', LAST_MODIFIED)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            if data:
+                self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return FixtureHandler
+
+
+def serve(site: FixtureSite, host: str = '127.0.0.1', port: int = 0) -> Tuple[ThreadingHTTPServer, str]:
+    """Serve site from a background thread, returns the server and its base URL."""
+    server = ThreadingHTTPServer((host, port), _handler(site))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='fixture-site', daemon=True).start()
+    return server, f'http://{host}:{server.server_address[1]}/'
+
+
+def serve_forever(site: FixtureSite, host: str, port: int, ready):
+    """Process target: serve site until terminated, put the base URL on ready."""
+    server, base_url = serve(site, host, port)
+    ready.put(base_url)
+    threading.Event().wait()
@@ -0,0 +1,243 @@
+import functools
+import logging
+import multiprocessing
+import platform
+import sys
+import time
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+from web_scraper.bench.database import DatabaseCounters, attach_database
+from web_scraper.bench.fixture_site import FixtureSite, serve_forever
+from web_scraper.crawler.politeness import HostScheduler
+
+try:
+    import resource
+except ImportError:  # Windows, peak RSS is not reported
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+STAGES = ('page', 'fetch', 'extract', 'db')
+UNLIMITED_RATE = 1e6
+MIN_DELTA_MS = 1.0
+
+
+def percentile(samples: Sequence[float], fraction: float) -> float:
+    """Nearest-rank percentile, 0 for no samples."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+
+def peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+class StageTimer:
+    """Wall-clock samples per crawl stage."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+
+    def wrap(self, stage: str, function):
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.samples[stage].append(time.perf_counter() - started)
+        return timed
+
+    def wrap_async(self, stage: str, function):
+        @functools.wraps(function)
+        async def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await function(*args, **kwargs)
+            finally:
+                self.samples[stage].append(time.perf_counter() - started)
+        return timed
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {
+            stage: {
+                'count': len(samples),
+                'p50_ms': percentile(samples, 0.5) * 1000,
+                'p95_ms': percentile(samples, 0.95) * 1000,
+                'mean_ms': sum(samples) / len(samples) * 1000 if samples else 0.0
+            }
+            for stage, samples in self.samples.items()
+        }
+
+
+def start_fixture_server(site: FixtureSite, host: str = '127.0.0.1'):
+    """Serve site from its own process so it does not compete with the crawler for the GIL."""
+    context = multiprocessing.get_context('spawn')
+    ready = context.Queue()
+    process = context.Process(target=serve_forever, args=(site, host, 0, ready), daemon=True)
+    process.start()
+    return process, ready.get(timeout=30)
+
+
+async def run_crawl(service_class, site_id: str, base_url: str, pages: int, concurrency: int,
+                    counters: DatabaseCounters, engine: Optional[str] = None, polite: bool = False,
+                    label: str = 'run') -> Dict:
+    """Crawl the fixture site once and measure it."""
+    service = service_class(site_id=site_id, engine=engine, fetch_mode='http', index_search=False)
+    service.base_url = base_url
+    service.crawl_name = f"{site_id}.bench"
+    service.frontier.close()
+    service.frontier = service.create_frontier()
+    service.frontier.push(base_url)
+    if not polite:
+        service.scheduler = HostScheduler(rate=UNLIMITED_RATE, burst=UNLIMITED_RATE, max_rate=UNLIMITED_RATE)
+
+    timer = StageTimer()
+    service.process_page_custom = timer.wrap_async('page', service.process_page_custom)
+    service.fetch = timer.wrap_async('fetch', service.fetch)
+    service.engine.extract = timer.wrap('extract', service.engine.extract)
+    counters.reset()
+
+    started = time.perf_counter()
+    await service.crawl(max_pages=pages, concurrency=concurrency)
+    elapsed = time.perf_counter() - started
+
+    processed = service.stats['processed']
+    stages = timer.summary()
+    stages['db'] = {
+        'count': len(counters.latencies),
+        'p50_ms': percentile(counters.latencies, 0.5) * 1000,
+        'p95_ms': percentile(counters.latencies, 0.95) * 1000,
+        'mean_ms': sum(counters.latencies) / len(counters.latencies) * 1000 if counters.latencies else 0.0
+    }
+    return {
+        'label': label,
+        'pages': processed,
+        'elapsed_s': elapsed,
+        'pages_per_sec': processed / elapsed if elapsed else 0.0,
+        'stages': stages,
+        'db_writes': counters.writes,
+        'db_reads': counters.reads,
+        'db_writes_per_page': counters.writes / processed if processed else 0.0,
+        'db_documents_per_page': counters.documents_written / processed if processed else 0.0,
+        'peak_rss_mb': peak_rss_mb(),
+        'counters': dict(service.stats.counters)
+    }
+
+
+async def run_benchmark(service_class, site_id: str, shape: str, pages: int = 200, concurrency: int = 8,
+                        runs: int = 2, engine: Optional[str] = None, database: str = 'memory',
+                        polite: bool = False, seed: int = 0) -> Dict:
+    """Crawl a generated fixture site ``runs`` times against a fresh benchmark database.
+
+    The first run is cold, later runs revisit the stored pages and mostly
+    get 304s, like a scheduled re-crawl.
+    """
+    counters = attach_database(database)
+    site = FixtureSite(pages=pages, shape=shape, seed=seed)
+    process, base_url = start_fixture_server(site)
+    try:
+        results = []
+        for index in range(runs):
+            label = 'cold' if index == 0 else f'warm{index}' if runs > 2 else 'warm'
+            result = await run_crawl(service_class, site_id, base_url, pages, concurrency, counters,
+                                     engine=engine, polite=polite, label=label)
+            logger.info(f"Benchmark {label}: {result['pages_per_sec']:.1f} pages/s")
+            results.append(result)
+    finally:
+        process.terminate()
+        process.join()
+    return {
+        'site': site_id,
+        'shape': shape,
+        'pages': pages,
+        'concurrency': concurrency,
+        'engine': engine,
+        'database': database,
+        'polite': polite,
+        'python': platform.python_version(),
+        'runs': results
+    }
+
+
+class Comparison(NamedTuple):
+    run: str
+    metric: str
+    baseline: float
+    current: float
+    change: float  # relative, positive is worse
+    regressed: bool
+
+
+def _metrics(run: Dict) -> Dict[str, float]:
+    """Compared metrics of a run, all of them lower is better."""
+    metrics = {
+        'seconds_per_page': 1 / run['pages_per_sec'] if run['pages_per_sec'] else 0.0,
+        'db_writes_per_page': run['db_writes_per_page']
+    }
+    for stage, summary in run['stages'].items():
+        metrics[f'{stage}_p95_ms'] = summary['p95_ms']
+    if run.get('peak_rss_mb') is not None:
+        metrics['peak_rss_mb'] = run['peak_rss_mb']
+    return metrics
+
+
+def compare(report: Dict, baseline: Dict, tolerance: float = 0.1) -> List[Comparison]:
+    """Metrics of report against baseline, run by run; more than tolerance worse is a regression."""
+    for key in ('shape', 'pages', 'concurrency', 'database'):
+        if report.get(key) != baseline.get(key):
+            logger.warning(f"Baseline was taken with {key}={baseline.get(key)}, this run has {report.get(key)}")
+
+    baseline_runs = {run['label']: run for run in baseline.get('runs', [])}
+    comparisons = []
+    for run in report['runs']:
+        previous = baseline_runs.get(run['label'])
+        if previous is None:
+            continue
+        current_metrics, baseline_metrics = _metrics(run), _metrics(previous)
+        for metric, current in current_metrics.items():
+            if metric not in baseline_metrics:
+                continue
+            before = baseline_metrics[metric]
+            change = (current - before) / before if before else 0.0
+            # Sub-millisecond stages are all noise in relative terms
+            regressed = change > tolerance and not (metric.endswith('_ms') and current - before < MIN_DELTA_MS)
+            comparisons.append(Comparison(run['label'], metric, before, current, change, regressed))
+    return comparisons
+
+
+def format_report(report: Dict) -> str:
+    lines = [
+        f"{report['site']} ({report['shape']}), {report['pages']} pages, concurrency {report['concurrency']}, "
+        f"{report['database']} database"
+    ]
+    for run in report['runs']:
+        rss = f"{run['peak_rss_mb']:.0f} MiB" if run.get('peak_rss_mb') is not None else 'n/a'
+        lines.append(
+            f"  {run['label']}: {run['pages']} pages in {run['elapsed_s']:.2f}s, {run['pages_per_sec']:.1f} pages/s, "
+            f"{run['db_writes_per_page']:.2f} DB writes/page "
+            f"({run['db_documents_per_page']:.1f} documents), peak RSS {rss}"
+        )
+        for stage, summary in run['stages'].items():
+            lines.append(
+                f"    {stage:<8} n={summary['count']:<6} p50 {summary['p50_ms']:8.2f} ms  "
+                f"p95 {summary['p95_ms']:8.2f} ms"
+            )
+    return '\n'.join(lines)
+
+
+def format_comparison(comparisons: List[Comparison]) -> str:
+    lines = []
+    for comparison in comparisons:
+        flag = 'REGRESSION' if comparison.regressed else ''
+        lines.append(
+            f"  {comparison.run:<6} {comparison.metric:<20} {comparison.baseline:10.3f} -> "
+            f"{comparison.current:10.3f}  {comparison.change:+7.1%} {flag}"
+        )
+    return '\n'.join(lines)
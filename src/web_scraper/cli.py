@@ -1,40 +1,483 @@
 import click
 import asyncio
+import cProfile
+import json
 import logging
-from web_scraper.services import EyewikiService, MedicalNewsTodayService
+import multiprocessing
+import os
+import pstats
+import signal
+import time
+from web_scraper.config.choices import ENGINE_NAMES, EXPORT_FORMATS, FETCH_MODES, SEEN_BACKENDS, SITES
+from web_scraper.config.config import Config
 from web_scraper.config.logging_conf import setup_logging
 
-service_map = {
-    'eyewiki': EyewikiService,
-    'medicalnewstoday': MedicalNewsTodayService
-}
+# Commands import the crawler, database and fetch modules themselves, so
+# --help and the light commands start without playwright, pymongo or lxml
+
+
+def _service(site, **options):
+    from web_scraper.services import SERVICES
+    return SERVICES[site](site_id=site, **options)
+
 
 @click.group()
 def cli():
     pass
 
+
+def _shard_option(ctx, param, value):
+    if value is None:
+        return None
+    from web_scraper.crawler.distributed import parse_shard
+    try:
+        return parse_shard(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+
+
+def _worker_options(service_options, index):
+    """Options of worker index: own metrics port and file, so workers don't collide."""
+    options = dict(service_options)
+    if options.get('metrics_port') is not None:
+        options['metrics_port'] += index
+    if options.get('metrics_file'):
+        root, extension = os.path.splitext(options['metrics_file'])
+        options['metrics_file'] = f"{root}.{index}{extension}"
+    return options
+
+
+def _run_distributed_worker(site, service_options, max_pages, concurrency, shard, sitemap, force):
+    # Entry point of the processes started by --processes
+    setup_logging()
+    service = _service(site, **service_options)
+    asyncio.run(service.crawl_distributed(max_pages=max_pages, concurrency=concurrency, shard=shard,
+                                          sitemap=sitemap, force=force))
+
+
 # poetry run scrape crawl --visible --site eyewiki --limit 1
 @cli.command()
-@click.option('--site', type=click.Choice(['eyewiki', 'medicalnewstoday']), required=True)
+@click.option('--site', type=click.Choice(SITES), required=True)
 @click.option('--visible', is_flag=True, help='Run browser in visible mode')
-@click.option('--limit', type=int, default=5, help='Page limit')
-@click.option('--force', is_flag=True, help='Force re-crawl even if unchanged')
-def crawl(site, visible, limit, force):
+@click.option('--limit', type=int, default=5, help='Page limit for this run')
+@click.option('--force', is_flag=True, help='Force re-crawl even if fresh or unchanged')
+@click.option('--concurrency', type=click.IntRange(min=1), default=1,
+              help='Number of pages processed in parallel')
+@click.option('--engine', type=click.Choice(ENGINE_NAMES), default=None,
+              help='HTML extraction engine (defaults to the site setting)')
+@click.option('--fetch-mode', type=click.Choice(FETCH_MODES), default=None,
+              help='auto: HTTP with browser fallback for JS pages (default), http or browser only')
+@click.option('--write-mode', type=click.Choice(['diff', 'replace']), default=None,
+              help='diff: only write changed headings/links (default), replace: rewrite them all')
+@click.option('--resume', is_flag=True, help='Continue from the last checkpoint of this site')
+@click.option('--distributed', is_flag=True,
+              help='Share the frontier in MongoDB with other crawl workers (always resumes)')
+@click.option('--shard', callback=_shard_option, default=None, metavar='I/N',
+              help='With --distributed (required): this worker is I of N (from 0), prefers its share of URLs '
+                   'and uses 1/N of the per-host rate')
+@click.option('--processes', type=click.IntRange(min=1), default=None,
+              help='Start N distributed workers on this machine, --limit applies to each')
+@click.option('--reset-frontier', is_flag=True, help='With --distributed: start over from the base URL')
+@click.option('--sitemap', is_flag=True,
+              help='Seed the frontier from the site sitemaps, skipping URLs unchanged since the last crawl')
+@click.option('--seen-backend', type=click.Choice(SEEN_BACKENDS), default=None,
+              help='memory: exact URL set (default), bloom: fixed size, may skip a few URLs, '
+                   'disk: Bloom filter over an on-disk set, for very large crawls')
+@click.option('--metrics-port', type=click.IntRange(min=1, max=65535), default=Config.METRICS_PORT,
+              help='Serve Prometheus metrics on /metrics (and JSON on /stats.json) at this port')
+@click.option('--metrics-file', type=click.Path(dir_okay=False), default=Config.METRICS_FILE,
+              help='Rewrite the crawl stats as JSON to this file every METRICS_INTERVAL seconds')
+@click.option('--profile', type=click.Path(dir_okay=False), default=None,
+              help='Run under cProfile and write the dump here (read it with pstats or snakeviz)')
+@click.option('--download-files/--no-download-files', default=Config.DOWNLOAD_FILES,
+              help='Also download linked documents (PDF, DOC, XLS, ...) to FILE_STORE '
+                   '(default: DOWNLOAD_FILES)')
+def crawl(site, visible, limit, force, concurrency, engine, fetch_mode, write_mode, resume,
+          distributed, shard, processes, reset_frontier, sitemap, seen_backend, metrics_port, metrics_file,
+          profile, download_files):
     """Main crawl command with change detection"""
     setup_logging()
+    service_options = dict(visible=visible, engine=engine, fetch_mode=fetch_mode, write_mode=write_mode,
+                           seen_backend=seen_backend, metrics_port=metrics_port, metrics_file=metrics_file,
+                           download_files=download_files)
+    distributed = distributed or processes is not None
+    if distributed and resume:
+        raise click.UsageError('--resume does not apply to --distributed, the shared frontier is kept')
+    if (shard or reset_frontier) and not distributed:
+        raise click.UsageError('--shard and --reset-frontier need --distributed')
+    if processes and shard:
+        raise click.UsageError('--processes assigns the shards itself')
+    if distributed and not processes and not shard:
+        # Each worker takes 1/N of the per-host rate, without N every worker would use all of it
+        raise click.UsageError('--distributed needs --shard I/N (use 0/1 for a single worker)')
+    if processes and profile:
+        raise click.UsageError('--profile covers a single process, use --distributed --shard I/N per worker')
+
+    if processes:
+        if reset_frontier:
+            _service(site, **service_options).create_shared_frontier().reset()
+        # Spawned rather than forked: MongoClient is not fork-safe
+        context = multiprocessing.get_context('spawn')
+        workers = [
+            context.Process(target=_run_distributed_worker,
+                            # One worker reading the sitemaps is enough
+                            args=(site, _worker_options(service_options, index), limit, concurrency,
+                                  (index, processes),
+                                  sitemap and index == 0, force))
+            for index in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        if any(worker.exitcode for worker in workers):
+            raise click.ClickException('Some crawl workers failed')
+        return
 
     async def run_crawl():
-        service = service_map[site](site_id=site, visible=visible)
-        await service.crawl(visible=True, max_pages=limit)
+        service = _service(site, **service_options)
+        if distributed:
+            await service.crawl_distributed(max_pages=limit, concurrency=concurrency, shard=shard,
+                                            reset=reset_frontier, sitemap=sitemap, force=force)
+        else:
+            await service.crawl(visible=True, max_pages=limit, concurrency=concurrency, resume=resume,
+                                sitemap=sitemap, force=force)
 
-    asyncio.run(run_crawl())
+    if not profile:
+        asyncio.run(run_crawl())
+        return
+
+    # Covers the event loop thread, work in asyncio.to_thread (database writes) is not included
+    profiler = cProfile.Profile()
+    try:
+        profiler.runcall(asyncio.run, run_crawl())
+    finally:
+        profiler.dump_stats(profile)
+        click.echo(f"Profile written to {profile}, top functions by cumulative time:")
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(20)
+
+
+# poetry run scrape refresh --site eyewiki --budget 200
+@cli.command()
+@click.option('--site', type=click.Choice(SITES), required=True)
+@click.option('--budget', type=click.IntRange(min=1), default=Config.REVISIT_BUDGET,
+              help='Most pages fetched in this run')
+@click.option('--concurrency', type=click.IntRange(min=1), default=1,
+              help='Number of pages processed in parallel')
+@click.option('--engine', type=click.Choice(ENGINE_NAMES), default=None,
+              help='HTML extraction engine (defaults to the site setting)')
+@click.option('--fetch-mode', type=click.Choice(FETCH_MODES), default=None,
+              help='auto: HTTP with browser fallback for JS pages (default), http or browser only')
+@click.option('--resume', is_flag=True, help='Continue the last interrupted refresh of this site')
+def refresh(site, budget, concurrency, engine, fetch_mode, resume):
+    """Revisit stored pages that most likely changed, within a fetch budget"""
+    setup_logging()
+
+    async def run_refresh():
+        service = _service(site, engine=engine, fetch_mode=fetch_mode)
+        await service.refresh(budget=budget, concurrency=concurrency, resume=resume)
+
+    asyncio.run(run_refresh())
+
+
+# poetry run scrape parity --site eyewiki --url https://eyewiki.org/Glaucoma
+@cli.command()
+@click.option('--site', type=click.Choice(SITES), required=True)
+@click.option('--url', default=None, help='Page to compare (defaults to the site base URL)')
+@click.option('--repeat', type=int, default=5, help='Extractions per engine for timing')
+def parity(site, url, repeat):
+    """Check that all extraction engines agree on a page and time them"""
+    from web_scraper.extraction import get_engine
+    from web_scraper.extraction.parity import check_parity
+    setup_logging()
+
+    async def run_parity():
+        service = _service(site)
+        engines = [
+            get_engine(name, content_selector=service.content_selector,
+                       content_exclude=service.content_exclude)
+            for name in ENGINE_NAMES
+        ]
+        async with service.create_browser_fetcher() as fetcher:
+            async with fetcher.page() as page:
+                await page.goto(url or service.base_url)
+                report = await check_parity(engines, await page.content(), page.url,
+                                            page=page, repeat=repeat)
+
+        for name, result in report.items():
+            status = 'OK' if not result['differences'] else 'MISMATCH'
+            click.echo(f"{name:6} {status:8} {result['time_ms']:8.1f} ms  "
+                       f"{result['headings']} headings, {result['links']} links")
+            for difference in result['differences']:
+                click.echo(f"    {difference}")
+
+    asyncio.run(run_parity())
+
+
+# poetry run scrape bench --site eyewiki --pages 500 --save bench/eyewiki.json
+@cli.command()
+@click.option('--site', type=click.Choice(SITES), required=True,
+              help='Service to benchmark, the fixture site is shaped like it')
+@click.option('--pages', type=click.IntRange(min=1), default=200, help='Pages in the fixture site')
+@click.option('--concurrency', type=click.IntRange(min=1), default=8,
+              help='Number of pages processed in parallel')
+@click.option('--runs', type=click.IntRange(min=1), default=2,
+              help='Crawls of the site, the first one cold and the rest revisits')
+@click.option('--engine', type=click.Choice(ENGINE_NAMES), default=None,
+              help='HTML extraction engine (defaults to the site setting)')
+@click.option('--db', 'database', type=click.Choice(['memory', 'mongo']), default='memory',
+              help='memory: in-process mongomock (default), mongo: a scratch database on MONGODB_URI')
+@click.option('--polite', is_flag=True, help='Keep the politeness rate limits instead of crawling flat out')
+@click.option('--save', type=click.Path(dir_okay=False), default=None, help='Write the report as JSON')
+@click.option('--baseline', type=click.Path(exists=True, dir_okay=False), default=None,
+              help='Compare with a saved report, exit with 1 on a regression')
+@click.option('--tolerance', type=float, default=0.1, help='Relative slowdown tolerated against the baseline')
+def bench(site, pages, concurrency, runs, engine, database, polite, save, baseline, tolerance):
+    """Benchmark a crawl offline against a generated local fixture site"""
+    from web_scraper.bench import compare, format_comparison, format_report, run_benchmark
+    from web_scraper.services import SERVICES
+    setup_logging()
+    # Per-page logging would dominate the timings
+    logging.getLogger('web_scraper').setLevel(logging.WARNING)
+    try:
+        report = asyncio.run(run_benchmark(
+            SERVICES[site], site, shape=site, pages=pages, concurrency=concurrency, runs=runs,
+            engine=engine, database=database, polite=polite
+        ))
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    click.echo(format_report(report))
+
+    if save:
+        with open(save, 'w') as file:
+            json.dump(report, file, indent=2)
+        click.echo(f"Report saved to {save}")
+
+    if baseline:
+        with open(baseline) as file:
+            comparisons = compare(report, json.load(file), tolerance)
+        click.echo(f"Against {baseline}:")
+        click.echo(format_comparison(comparisons))
+        if any(comparison.regressed for comparison in comparisons):
+            raise click.ClickException(f"Slower than the baseline by more than {tolerance:.0%}")
+
+
+# poetry run scrape download --site eyewiki --concurrency 4
+@cli.command()
+@click.option('--site', type=click.Choice(SITES), default=None,
+              help='Only files linked from pages of this site (default: all sites)')
+@click.option('--limit', type=click.IntRange(min=1), default=1000, help='Most files downloaded in this run')
+@click.option('--concurrency', type=click.IntRange(min=1), default=Config.DOWNLOAD_CONCURRENCY,
+              help='Number of files downloaded in parallel')
+def download(site, limit, concurrency):
+    """Download linked documents not downloaded yet, resuming interrupted downloads"""
+    from web_scraper.crawler.politeness import HostScheduler
+    from web_scraper.crawler.stats import CrawlStats
+    from web_scraper.database.client import get_pending_file_urls
+    from web_scraper.fetch.downloader import FileDownloader
+    setup_logging()
+
+    async def run_download():
+        urls = await asyncio.to_thread(get_pending_file_urls, site, limit)
+        click.echo(f"{len(urls)} files to download")
+        stats = CrawlStats(labels={'site': site} if site else {})
+        scheduler = HostScheduler()
+        try:
+            async with FileDownloader(concurrency=concurrency, scheduler=scheduler, stats=stats) as downloader:
+                for url in urls:
+                    await downloader.submit(url)
+        finally:
+            await scheduler.close()
+        click.echo(f"{stats['files_downloaded']} downloaded ({stats['files_resumed']} resumed, "
+                   f"{stats['files_deduplicated']} already stored), {stats['files_unchanged']} unchanged, "
+                   f"{stats['files_failed']} failed, {stats['file_bytes'] / 1024 / 1024:.1f} MiB")
+
+    asyncio.run(run_download())
+
+
+# poetry run scrape export --site eyewiki --format parquet
+@cli.command()
+@click.option('--site', type=click.Choice(SITES), required=True)
+@click.option('--out', 'output_dir', type=click.Path(file_okay=False), default=Config.EXPORT_DIR,
+              help='Directory of the export files and the watermark')
+@click.option('--format', 'output_format', type=click.Choice(EXPORT_FORMATS), default='jsonl',
+              help='jsonl: gzip compressed JSON lines (default), parquet: needs pyarrow')
+@click.option('--full', is_flag=True, help='Export every page, not only those saved since the last export')
+@click.option('--html', 'include_html', is_flag=True, help='Include content_html, not only content_text')
+@click.option('--no-links', is_flag=True, help='Leave out the links of each page')
+def export(site, output_dir, output_format, full, include_html, no_links):
+    """Export pages with their heading tree and links, incrementally since the last export"""
+    from web_scraper.export import export_site
+    setup_logging()
+    try:
+        result = export_site(site, output_dir, output_format, full=full, include_html=include_html,
+                             include_links=not no_links)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    since = f"since {result['since']:%Y-%m-%d %H:%M:%S}" if result['since'] else 'all pages'
+    if result['path']:
+        click.echo(f"Exported {result['pages']} pages ({since}) to {result['path']}")
+    else:
+        click.echo(f"No pages to export ({since})")
+
+
+# poetry run scrape index --site eyewiki
+@cli.command()
+@click.option('--site', type=click.Choice(SITES), required=True)
+@click.option('--index', 'index_path', type=click.Path(dir_okay=False), default=Config.SEARCH_INDEX,
+              help='SQLite file of the search index')
+@click.option('--full', is_flag=True, help='Re-index every page, not only those saved since the last run')
+def index(site, index_path, full):
+    """Bring the search index up to date with pages saved without it, e.g. with SEARCH_ON_SAVE=0"""
+    from web_scraper.database.client import DatabaseClient
+    from web_scraper.search import SearchIndex
+    setup_logging()
+    search_index = SearchIndex(index_path)
+    try:
+        started = time.perf_counter()
+        indexed = search_index.sync(DatabaseClient().db, site, full=full)
+        counts = search_index.counts()
+    finally:
+        search_index.close()
+    click.echo(f"Indexed {indexed} pages in {time.perf_counter() - started:.1f}s, "
+               f"{counts['pages']} pages and {counts['sections']} sections in {index_path}")
+
+
+# poetry run scrape search "retinal detachment" --site eyewiki
+@cli.command()
+@click.argument('query', nargs=-1, required=True)
+@click.option('--site', type=click.Choice(SITES), default=None, help='Only pages of this site')
+@click.option('--limit', type=click.IntRange(min=1), default=10, help='Number of sections shown')
+@click.option('--raw', is_flag=True, help='Pass the query to FTS5 as is: OR, NOT, NEAR(), "phrases", prefix*')
+@click.option('--index', 'index_path', type=click.Path(dir_okay=False), default=Config.SEARCH_INDEX,
+              help='SQLite file of the search index')
+def search(query, site, limit, raw, index_path):
+    """Search crawled pages, best matching sections first with links to their anchors"""
+    import sqlite3
+    from web_scraper.search import SearchIndex
+    if not os.path.exists(index_path):
+        raise click.ClickException(f"No search index at {index_path}, crawl or run `scrape index` first")
+    search_index = SearchIndex(index_path)
+    try:
+        started = time.perf_counter()
+        hits = search_index.search(' '.join(query), site_id=site, limit=limit, raw=raw)
+        elapsed = time.perf_counter() - started
+    except sqlite3.OperationalError as e:
+        # Malformed --raw query
+        raise click.ClickException(f"Invalid query: {e}")
+    finally:
+        search_index.close()
+    for hit in hits:
+        heading = ' > '.join(part for part in (hit.path, hit.title) if part)
+        click.echo(f"{hit.link}\n  {heading or '(intro)'}  [{-hit.score:.2f}]\n  {hit.snippet}")
+    click.echo(f"{len(hits)} sections in {elapsed * 1000:.1f} ms")
+
+
+# poetry run scrape migrate
+@cli.command()
+def migrate():
+    """Create the MongoDB indexes the crawler relies on, run once per database"""
+    from web_scraper.database.migrations import ensure_indexes
+    setup_logging()
+    for collection, names in ensure_indexes().items():
+        click.echo(f"{collection}: {', '.join(names)}")
+
+
+# poetry run scrape serve --port 8700 --warm eyewiki
+@cli.command()
+@click.option('--host', default=Config.SERVE_HOST, help='Interface to listen on')
+@click.option('--port', type=click.IntRange(min=0, max=65535), default=Config.SERVE_PORT, help='Port to listen on')
+@click.option('--socket', 'socket_path', type=click.Path(dir_okay=False), default=Config.SERVE_SOCKET,
+              help='Listen on this Unix socket instead of host and port')
+@click.option('--max-jobs', type=click.IntRange(min=1), default=Config.SERVE_MAX_JOBS,
+              help='Jobs crawling at once, later ones wait')
+@click.option('--warm', multiple=True, type=click.Choice(SITES),
+              help='Start the fetchers of this site before the first job (repeatable)')
+def serve(host, port, socket_path, max_jobs, warm):
+    """Run as a daemon taking crawl jobs over HTTP, with warm fetchers shared between jobs"""
+    from web_scraper.daemon import JobManager, JobServer
+    setup_logging()
+
+    async def run_server():
+        manager = JobManager(max_jobs=max_jobs)
+        server = None
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, stop.set)
+            except NotImplementedError:  # Windows, Ctrl+C still interrupts
+                pass
+        try:
+            await manager.warm(warm)
+            server = await JobServer(manager, host=host, port=port, socket_path=socket_path).start()
+            click.echo(f"Accepting crawl jobs on {server.address}")
+            await stop.wait()
+            click.echo("Shutting down, cancelling running jobs")
+        finally:
+            if server is not None:
+                await server.close()
+            await manager.close()
+
+    asyncio.run(run_server())
+
+
+# poetry run scrape submit --site eyewiki --seed https://eyewiki.org/Glaucoma --limit 20 --wait
+@cli.command()
+@click.option('--site', type=click.Choice(SITES), required=True)
+@click.option('--seed', 'seeds', multiple=True, help='Start from this URL instead of the base URL (repeatable)')
+@click.option('--limit', type=click.IntRange(min=1), default=5, help='Page limit for this job')
+@click.option('--concurrency', type=click.IntRange(min=1), default=1,
+              help='Number of pages processed in parallel')
+@click.option('--force', is_flag=True, help='Force re-crawl even if fresh or unchanged')
+@click.option('--sitemap', is_flag=True, help='Seed the job from the site sitemaps')
+@click.option('--engine', type=click.Choice(ENGINE_NAMES), default=None,
+              help='HTML extraction engine (defaults to the site setting)')
+@click.option('--fetch-mode', type=click.Choice(FETCH_MODES), default=None,
+              help='auto: HTTP with browser fallback for JS pages (default), http or browser only')
+@click.option('--server', default=f"http://{Config.SERVE_HOST}:{Config.SERVE_PORT}",
+              help='Address of scrape serve')
+@click.option('--socket', 'socket_path', type=click.Path(dir_okay=False), default=Config.SERVE_SOCKET,
+              help='Unix socket of scrape serve, used instead of --server')
+@click.option('--download-files/--no-download-files', default=None,
+              help='Also download linked documents (default: DOWNLOAD_FILES of scrape serve)')
+@click.option('--wait', is_flag=True, help='Wait for the job to finish and print its summary')
+def submit(site, seeds, limit, concurrency, force, sitemap, engine, fetch_mode, server, socket_path,
+           download_files, wait):
+    """Queue a crawl job on a running scrape serve"""
+    import httpx
+    transport = httpx.HTTPTransport(uds=socket_path) if socket_path else None
+    base_url = 'http://scrape' if socket_path else server
+    request = dict(site=site, seeds=list(seeds), limit=limit, concurrency=concurrency, force=force,
+                   sitemap=sitemap, engine=engine, fetch_mode=fetch_mode)
+    if download_files is not None:
+        request['download_files'] = download_files
+    try:
+        with httpx.Client(base_url=base_url, transport=transport, timeout=Config.HTTP_TIMEOUT) as client:
+            response = client.post('/jobs', json=request)
+            if response.status_code != 202:
+                raise click.ClickException(response.json().get('error', response.text))
+            job = response.json()
+            click.echo(f"Job {job['id']} queued: {job['limit']} pages, concurrency {job['concurrency']}")
+            while wait and job['state'] in ('queued', 'running'):
+                time.sleep(1)
+                job = client.get(f"/jobs/{job['id']}").json()
+    except httpx.HTTPError as e:
+        raise click.ClickException(f"scrape serve is not reachable: {str(e)}")
+
+    if wait:
+        counters = (job.get('stats') or {}).get('counters', {})
+        click.echo(f"Job {job['id']} {job['state']}: {counters.get('processed', 0)} pages, "
+                   f"{counters.get('saved', 0)} saved, {counters.get('failed', 0)} failed")
+        if job['state'] != 'done':
+            raise click.ClickException(job.get('error') or f"Job {job['state']}")
 
 
 if __name__ == '__main__':
     # cli()
     async def run_crawl():
-        # service = service_map['eyewiki'](site_id='eyewiki', visible=True)
-        service = service_map['medicalnewstoday'](site_id='medicalnewstoday', visible=True)
+        # service = _service('eyewiki', visible=True)
+        service = _service('medicalnewstoday', visible=True)
         await service.crawl(max_pages=1000)
 
 
@@ -0,0 +1,7 @@
+# Values of the CLI options and job requests, kept free of imports so the
+# CLI can offer them without loading the modules that implement them
+SITES = ['eyewiki', 'medicalnewstoday']
+ENGINE_NAMES = ['bs4', 'lxml', 'dom']
+FETCH_MODES = ['auto', 'http', 'browser']
+SEEN_BACKENDS = ('memory', 'bloom', 'disk')
+EXPORT_FORMATS = ['jsonl', 'parquet']
@@ -12,12 +12,137 @@ class Config:
     MONGODB_PASSWORD = os.getenv("MONGODB_PASSWORD")
     MONGODB_AUTH_SOURCE = os.getenv("MONGODB_AUTH_SOURCE", "admin")
 
+    # Page content storage: 'mongo' (blobs collection), 'directory' (BLOB_DIR) or 'inline' in pages
+    BLOB_STORE = os.getenv("BLOB_STORE", "mongo")
+    BLOB_DIR = os.getenv("BLOB_DIR", "blobs")
+    BLOB_COMPRESSION = os.getenv("BLOB_COMPRESSION", "zstd")  # zstd (falls back to gzip) or gzip
+    BLOB_COMPRESSION_LEVEL = 3
+
+    # Linked documents (PDF, DOC, XLS, ...), fetched with --download-files
+    DOWNLOAD_FILES = os.getenv("DOWNLOAD_FILES", "0") != "0"
+    FILE_STORE = os.getenv("FILE_STORE", "directory")  # directory (FILE_DIR) or gridfs
+    FILE_DIR = os.getenv("FILE_DIR", "files")
+    DOWNLOAD_PARTIAL_DIR = os.getenv("DOWNLOAD_PARTIAL_DIR", ".downloads")  # unfinished, resumed with Range
+    DOWNLOAD_CONCURRENCY = int(os.getenv("DOWNLOAD_CONCURRENCY", 4))  # separate from page concurrency
+    DOWNLOAD_MAX_BYTES = int(os.getenv("DOWNLOAD_MAX_BYTES", 200 * 1024 * 1024))  # larger files are skipped
+    DOWNLOAD_CHUNK_SIZE = 64 * 1024  # bytes read from the network at a time
+    DOWNLOAD_WRITE_SIZE = 1024 * 1024  # received bytes written to disk at a time, in a worker thread
+    DOWNLOAD_ATTEMPTS = 3  # an interrupted download resumes where it stopped
+    DOWNLOAD_QUEUE_SIZE = 1000  # queued files before the crawl waits
+
+    # scrape export: corpus snapshots for downstream indexing
+    EXPORT_DIR = os.getenv("EXPORT_DIR", "exports")
+    EXPORT_BATCH_SIZE = 100  # pages read (with headings, links and content) per round of queries
+    EXPORT_ROW_GROUP_SIZE = 1000  # pages per Parquet row group
+    # Pages saved this recently wait for the next export, a batch may still be being written
+    EXPORT_SETTLE_SECONDS = 30
+
+    # scrape search: SQLite FTS5 index of page sections, updated as pages are saved
+    SEARCH_INDEX = os.getenv("SEARCH_INDEX", "search.sqlite")
+    SEARCH_ON_SAVE = os.getenv("SEARCH_ON_SAVE", "1") != "0"
+
+    PREFETCH_BATCH_SIZE = 20  # queued URLs whose stored state is looked up in one query
+
+    # Metrics of a running crawl: Prometheus endpoint and/or a JSON file rewritten periodically
+    METRICS_PORT = int(os.getenv("METRICS_PORT")) if os.getenv("METRICS_PORT") else None
+    METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+    METRICS_FILE = os.getenv("METRICS_FILE")
+    METRICS_INTERVAL = float(os.getenv("METRICS_INTERVAL", 10.0))  # seconds between JSON writes
+    METRICS_TIMEOUT = 5.0  # seconds a metrics request waits for the crawl's event loop
+
+    # scrape serve: long-running daemon taking crawl jobs over HTTP
+    SERVE_HOST = os.getenv("SERVE_HOST", "127.0.0.1")
+    SERVE_PORT = int(os.getenv("SERVE_PORT", 8700))
+    SERVE_SOCKET = os.getenv("SERVE_SOCKET")  # Unix socket path, used instead of host and port
+    SERVE_MAX_JOBS = int(os.getenv("SERVE_MAX_JOBS", 4))  # jobs crawling at once, others wait
+    SERVE_MAX_PAGES = int(os.getenv("SERVE_MAX_PAGES", 1000))  # pages per job
+    SERVE_MAX_CONCURRENCY = int(os.getenv("SERVE_MAX_CONCURRENCY", 8))  # parallel pages per job
+    SERVE_JOB_HISTORY = 100  # finished jobs kept for GET /jobs
+
+    # Write-behind persistence
+    WRITE_BATCH_SIZE = int(os.getenv("WRITE_BATCH_SIZE", 50))  # pages per bulk write
+    WRITE_FLUSH_INTERVAL = float(os.getenv("WRITE_FLUSH_INTERVAL", 2.0))  # seconds
+    WRITE_QUEUE_SIZE = int(os.getenv("WRITE_QUEUE_SIZE", 500))  # pending pages before crawl blocks
+    # 'diff' only writes changed headings and links, 'replace' deletes and re-inserts them
+    WRITE_MODE = os.getenv("WRITE_MODE", "diff")
+    WRITE_ATTEMPTS = 3  # a batch that fails as a whole is written again, then its pages count as failed
+    WRITE_RETRY_DELAY = 1.0  # seconds, doubled on every attempt
+
     # Crawler Settings
-    REQUEST_TIMEOUT = 30000  # milliseconds
+    REQUEST_TIMEOUT = int(os.getenv("REQUEST_TIMEOUT", 15000))  # milliseconds, browser navigation
+    # Retries of timeouts, dropped connections and 429/5xx
+    RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", 4))  # including the first
+    RETRY_BASE_DELAY = 2.0  # seconds, doubled on every attempt
+    RETRY_MAX_DELAY = 120.0  # seconds
+    # A host is paused after this many retryable failures in a row
+    CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", 5))
+    CIRCUIT_COOLDOWN = 30.0  # seconds, doubled while the host keeps failing
+    CIRCUIT_MAX_COOLDOWN = 600.0
+    CHECKPOINT_DIR = os.getenv("CHECKPOINT_DIR", ".checkpoints")
+    CHECKPOINT_EVERY = int(os.getenv("CHECKPOINT_EVERY", 50))  # pages
+    CHECKPOINT_INTERVAL = float(os.getenv("CHECKPOINT_INTERVAL", 30.0))  # seconds
     MAX_PAGES = 1000
+    # URLs already queued or crawled: 'memory' (exact set), 'bloom' (fixed size, may skip a
+    # few new URLs) or 'disk' (Bloom filter in front of an exact on-disk store, see crawler.seen)
+    SEEN_BACKEND = os.getenv("SEEN_BACKEND", "memory")
+    SEEN_CAPACITY = int(os.getenv("SEEN_CAPACITY", 10_000_000))  # URLs the Bloom filter is sized for
+    SEEN_ERROR_RATE = float(os.getenv("SEEN_ERROR_RATE", 0.01))  # Bloom filter false positives
+    SEEN_CACHE_MB = 16  # SQLite page cache of the 'disk' backend
+    # scrape refresh: revisit pages by how likely they changed since the last check
+    REVISIT_BUDGET = int(os.getenv("REVISIT_BUDGET", 500))  # pages fetched per refresh run
+    REVISIT_DEFAULT_RATE = 0.1  # changes per day assumed until a page has been checked twice
+    REVISIT_MIN_RATE = 0.005  # static pages are still revisited every few weeks
+    REVISIT_MIN_PROBABILITY = 0.1  # pages less likely to have changed are not revisited
+    # Sitemap seeding
+    SITEMAP_BATCH_SIZE = 1000  # sitemap URLs checked against the database per query
+    SITEMAP_MAX_DEPTH = 3  # nested sitemap indexes followed
+    SITEMAP_MAX_BYTES = 50 * 1024 * 1024  # uncompressed, the limit of the sitemap protocol
+    # Politeness, per host
+    RESPECT_ROBOTS = os.getenv("RESPECT_ROBOTS", "1") != "0"
+    ROBOTS_USER_AGENT = os.getenv("ROBOTS_USER_AGENT", "*")  # user-agent matched in robots.txt
+    ROBOTS_TTL = 3600  # seconds parsed robots.txt rules are cached
+    ROBOTS_ERROR_TTL = 300  # seconds before an unreachable robots.txt is tried again
+    POLITENESS_RATE = float(os.getenv("POLITENESS_RATE", 2.0))  # starting requests per second
+    POLITENESS_MAX_RATE = float(os.getenv("POLITENESS_MAX_RATE", 10.0))
+    POLITENESS_MIN_RATE = 0.05
+    POLITENESS_BURST = 2.0  # requests a host may get at once after being idle
+    POLITENESS_INCREASE = 0.1  # requests per second added after each fast response
+    POLITENESS_BACKOFF = 0.5  # rate multiplier after 429/503, errors and slow responses
+    POLITENESS_SLOW_RESPONSE = 2.0  # seconds
+    # Distributed crawling: workers share the frontier collection in MongoDB
+    FRONTIER_LEASE_SECONDS = float(os.getenv("FRONTIER_LEASE_SECONDS", 300))  # re-issued after this
+    FRONTIER_MAX_ATTEMPTS = 3  # leases before a URL is given up on
+    FRONTIER_SHARDS = int(os.getenv("FRONTIER_SHARDS", 64))  # virtual shards split between workers
+    # 'host' keeps every host on one worker, 'path' spreads a single site over all of them
+    FRONTIER_SHARD_BY = os.getenv("FRONTIER_SHARD_BY", "path")
+    FRONTIER_WORK_STEALING = os.getenv("FRONTIER_WORK_STEALING", "1") != "0"
+    FRONTIER_COMPLETE_EVERY = 20  # pages marked done per update
+    FRONTIER_POLL_INTERVAL = 1.0  # seconds an idle worker waits for new URLs
     IGNORED_EXTENSIONS = ['.pdf', '.jpg', '.png', '.docx']
     FILE_EXTENSIONS = ['.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx']
+    # Near-duplicate detection over the main content
+    NEAR_DUPLICATE_DISTANCE = int(os.getenv("NEAR_DUPLICATE_DISTANCE", 3))  # SimHash bits
+    NEAR_DUPLICATE_MIN_WORDS = 50  # shorter pages are never treated as duplicates
+    EXTRACTION_ENGINE = os.getenv("EXTRACTION_ENGINE", "bs4")  # bs4, lxml or dom
+
+    # Fetching: 'auto' uses plain HTTP and falls back to the browser for
+    # JavaScript pages, 'http' and 'browser' force one fetcher
+    FETCH_MODE = os.getenv("FETCH_MODE", "auto")
+    HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", 15.0))  # seconds
+    HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 20))
+    JS_SHELL_MIN_TEXT = 200  # visible characters below which HTML counts as a JS shell
 
     # Browser Settings
     USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-    HEADLESS = not bool(os.getenv("SHOW_BROWSER", False))
\ No newline at end of file
+    HEADLESS = not bool(os.getenv("SHOW_BROWSER", False))
+    BROWSER_RECYCLE_AFTER = int(os.getenv("BROWSER_RECYCLE_AFTER", 100))  # pages per context
+    # Resource types aborted before they are downloaded. Stylesheets are kept
+    # because they decide what inner_text() sees.
+    BLOCKED_RESOURCE_TYPES = ['image', 'media', 'font', 'texttrack', 'manifest']
+    # Ads and analytics, blocked on every site
+    BLOCKED_HOSTS = [
+        'doubleclick.net', 'googlesyndication.com', 'googleadservices.com',
+        'google-analytics.com', 'googletagmanager.com', 'googletagservices.com',
+        'facebook.net', 'scorecardresearch.com', 'quantserve.com', 'chartbeat.com',
+        'hotjar.com', 'nr-data.net', 'taboola.com', 'outbrain.com'
+    ]
\ No newline at end of file
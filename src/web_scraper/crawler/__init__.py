@@ -0,0 +1,37 @@
+from .checkpoint import CrawlCheckpoint
+from .dedup import SimHashIndex, content_fingerprint, simhash
+from .distributed import MongoFrontier, parse_shard
+from .frontier import Frontier, FrontierEntry
+from .metrics import MetricsFile, MetricsServer
+from .politeness import HostScheduler, TokenBucket
+from .revisit import change_history, select_revisits
+from .seen import SEEN_BACKENDS, BloomFilter, SeenSet, create_seen_set
+from .sitemap import SitemapEntry, SitemapParser, SitemapReader, SitemapTooLarge
+from .stats import CrawlStats, Histogram
+
+__all__ = [
+    'SEEN_BACKENDS',
+    'BloomFilter',
+    'CrawlCheckpoint',
+    'CrawlStats',
+    'Frontier',
+    'FrontierEntry',
+    'HostScheduler',
+    'Histogram',
+    'MetricsFile',
+    'MetricsServer',
+    'MongoFrontier',
+    'SeenSet',
+    'SimHashIndex',
+    'SitemapEntry',
+    'SitemapParser',
+    'SitemapReader',
+    'SitemapTooLarge',
+    'TokenBucket',
+    'change_history',
+    'content_fingerprint',
+    'create_seen_set',
+    'parse_shard',
+    'select_revisits',
+    'simhash'
+]
@@ -0,0 +1,77 @@
+import os
+import sqlite3
+import threading
+from typing import Iterable, Iterator, List, Tuple
+
+from web_scraper.crawler.frontier import FrontierEntry
+
+
+class CrawlCheckpoint:
+    """Crawl state kept in a local SQLite file so a crawl can be resumed.
+
+    ``done`` only grows, so it is appended to. ``pending`` holds every queued
+    URL that is not done yet, including pages still in flight or waiting for a
+    retry: each save inserts what was queued since the last one and deletes
+    what got done, so its cost does not grow with the size of the frontier.
+    Everything a frontier has ever seen is either pending or done, so the two
+    tables are enough to rebuild it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Saves run in worker threads, one at a time
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS pending (seq INTEGER PRIMARY KEY, url TEXT, depth INTEGER)'
+            )
+            self._connection.execute('CREATE UNIQUE INDEX IF NOT EXISTS pending_url ON pending (url)')
+            self._connection.execute('CREATE TABLE IF NOT EXISTS done (url TEXT PRIMARY KEY)')
+
+    def save(self, queued: Iterable[FrontierEntry], done: List[str]):
+        """Add the entries queued and the URLs done since the last save."""
+        with self._lock, self._connection:
+            self._connection.executemany(
+                'INSERT OR IGNORE INTO pending (url, depth) VALUES (?, ?)',
+                ((entry.url, entry.depth) for entry in queued)
+            )
+            self._connection.executemany('DELETE FROM pending WHERE url = ?', ((url,) for url in done))
+            self._connection.executemany(
+                'INSERT OR IGNORE INTO done (url) VALUES (?)', ((url,) for url in done)
+            )
+
+    def load(self) -> Tuple[List[FrontierEntry], int]:
+        """Pending entries and the number of done pages, read those with iter_done."""
+        with self._lock:
+            pending = [
+                FrontierEntry(url, depth)
+                for url, depth in self._connection.execute('SELECT url, depth FROM pending ORDER BY seq')
+            ]
+            (done,) = self._connection.execute('SELECT COUNT(*) FROM done').fetchone()
+        return pending, done
+
+    def iter_done(self, batch_size: int = 10000) -> Iterator[str]:
+        """Done URLs a batch at a time, never all of them in memory at once."""
+        last = ''
+        while True:
+            with self._lock:
+                rows = self._connection.execute(
+                    'SELECT url FROM done WHERE url > ? ORDER BY url LIMIT ?', (last, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for (url,) in rows:
+                yield url
+            last = rows[-1][0]
+
+    def clear(self):
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM pending')
+            self._connection.execute('DELETE FROM done')
+
+    def close(self):
+        self._connection.close()
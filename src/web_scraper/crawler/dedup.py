@@ -0,0 +1,85 @@
+import hashlib
+import re
+from typing import Dict, List, Optional
+
+_WORDS = re.compile(r'\w+', re.UNICODE)
+_MASK_64 = (1 << 64) - 1
+
+
+def normalize_text(text: str) -> str:
+    """Lowercased words of the text separated by single spaces."""
+    return ' '.join(_WORDS.findall(text.lower()))
+
+
+def content_fingerprint(text: str) -> str:
+    """Hash of the normalized main content, stable across page loads."""
+    return hashlib.sha1(normalize_text(text).encode()).hexdigest()
+
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    """64-bit SimHash over word shingles of the normalized text."""
+    words = normalize_text(text).split()
+    if len(words) < shingle_size:
+        shingles = [' '.join(words)] if words else []
+    else:
+        shingles = [' '.join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)]
+
+    weights = [0] * 64
+    for shingle in shingles:
+        value = int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), 'big')
+        for bit in range(64):
+            weights[bit] += 1 if value >> bit & 1 else -1
+
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+
+def hamming_distance(left: int, right: int) -> int:
+    return bin(left ^ right).count('1')
+
+
+def to_signed64(value: int) -> int:
+    # BSON only stores signed 64-bit integers
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def from_signed64(value: int) -> int:
+    return value & _MASK_64
+
+
+class SimHashIndex:
+    """Finds stored SimHashes within ``max_distance`` bits of a new one.
+
+    Hashes are split into ``max_distance + 1`` bands; two hashes that differ
+    in at most ``max_distance`` bits share at least one band exactly, so only
+    the buckets of those bands have to be compared.
+    """
+
+    def __init__(self, max_distance: int = 3):
+        self.max_distance = max_distance
+        self.bands = max_distance + 1
+        self.band_bits = 64 // self.bands
+        self._buckets: List[Dict[int, List[tuple]]] = [{} for _ in range(self.bands)]
+        self._values: Dict[str, int] = {}
+
+    def _band_keys(self, value: int):
+        mask = (1 << self.band_bits) - 1
+        for band in range(self.bands):
+            yield band, value >> (band * self.band_bits) & mask
+
+    def add(self, key: str, value: int):
+        if self._values.get(key) == value:
+            # Already indexed, e.g. read again by a refresh
+            return
+        self._values[key] = value
+        for band, band_key in self._band_keys(value):
+            self._buckets[band].setdefault(band_key, []).append((key, value))
+
+    def find(self, value: int, exclude: Optional[str] = None) -> Optional[str]:
+        for band, band_key in self._band_keys(value):
+            for key, candidate in self._buckets[band].get(band_key, ()):
+                if key != exclude and hamming_distance(value, candidate) <= self.max_distance:
+                    return key
+        return None
+
+    def __len__(self) -> int:
+        return len(self._values)
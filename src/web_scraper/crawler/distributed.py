@@ -0,0 +1,290 @@
+import os
+import socket
+import threading
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from web_scraper.config.config import Config
+from web_scraper.crawler.frontier import FrontierEntry
+from web_scraper.crawler.seen import create_seen_set
+from web_scraper.database.client import DatabaseClient
+from web_scraper.utils.helpers import canonicalize_url
+
+PENDING = 'pending'
+LEASED = 'leased'
+DEFERRED = 'deferred'
+DONE = 'done'
+FAILED = 'failed'
+
+DUPLICATE_KEY = 11000
+CLAIM_ORDER = [('priority', 1), ('depth', 1), ('_id', 1)]
+
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """'2/4' -> (2, 4): worker 2 of 4, counted from 0."""
+    index, _, count = value.partition('/')
+    index, count = int(index), int(count)
+    if not 0 <= index < count:
+        raise ValueError(f"Shard index must be between 0 and {count - 1}: {value}")
+    return index, count
+
+
+def shard_key(url: str, shard_by: str = Config.FRONTIER_SHARD_BY) -> str:
+    parsed = urlparse(url)
+    if shard_by == 'host':
+        return parsed.hostname or ''
+    return f"{parsed.hostname}{parsed.path}"
+
+
+def shard_of(url: str, shards: int = Config.FRONTIER_SHARDS, shard_by: str = Config.FRONTIER_SHARD_BY) -> int:
+    # crc32 rather than hash(): it has to agree between processes
+    return zlib.crc32(shard_key(url, shard_by).encode('utf-8')) % shards
+
+
+class MongoFrontier:
+    """Frontier shared by several crawl processes through the ``frontier`` collection.
+
+    Every URL is stored once per site. A worker claims the next pending URL
+    with a single find_one_and_update that leases it to the worker; the URL is
+    marked done once its page is written, and URLs whose lease expired (the
+    worker died or hung) are handed out again, up to FRONTIER_MAX_ATTEMPTS
+    times. A URL that failed in a way worth retrying is deferred: it can be
+    claimed again once its retry is due, up to RETRY_MAX_ATTEMPTS attempts.
+
+    URLs are spread over FRONTIER_SHARDS virtual shards by a hash of their
+    host or path. Worker ``i`` of ``n`` owns the shards ``s % n == i`` and
+    claims from them first; when they run dry it steals from the others,
+    unless FRONTIER_WORK_STEALING is off.
+
+    push() only buffers new URLs, flush() writes them in one bulk upsert.
+    URLs this worker already pushed are remembered in a seen set of the
+    ``seen_backend`` kind, see crawler.seen, so they are not sent again.
+    """
+
+    def __init__(self, site_id: str,
+                 shard: Optional[Tuple[int, int]] = None,
+                 canonicalize: Callable[[str], str] = canonicalize_url,
+                 priority: Optional[Callable[[str, int], Any]] = None,
+                 worker_id: Optional[str] = None,
+                 lease_seconds: float = Config.FRONTIER_LEASE_SECONDS,
+                 shards: int = Config.FRONTIER_SHARDS,
+                 shard_by: str = Config.FRONTIER_SHARD_BY,
+                 steal: bool = Config.FRONTIER_WORK_STEALING,
+                 seen_backend: str = Config.SEEN_BACKEND):
+        self.site_id = site_id
+        self.canonicalize = canonicalize
+        self.priority = priority or (lambda url, depth: depth)
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.lease = timedelta(seconds=lease_seconds)
+        self.shards = shards
+        self.shard_by = shard_by
+        self.steal = steal
+        self.own_shards: Optional[List[int]] = None
+        if shard and shard[1] > 1:
+            index, count = shard
+            self.own_shards = [s for s in range(shards) if s % count == index]
+        self.collection = DatabaseClient().db.frontier
+        self.stolen = 0
+        self.requeued = 0
+        self.seen_backend = seen_backend
+        self._known = create_seen_set(seen_backend)
+        # Failed attempts of the URLs this worker claimed again after defer()
+        self._retries: Dict[str, int] = {}
+        self._buffer: List[Tuple[str, int]] = []
+        self._lock = threading.Lock()
+
+    def push(self, url: str, depth: int = 0) -> bool:
+        url = self.canonicalize(url)
+        with self._lock:
+            if not self._known.add(url):
+                return False
+            self._buffer.append((url, depth))
+        return True
+
+    def peek(self, count: int) -> List[FrontierEntry]:
+        """Nothing to look ahead at, which worker gets a URL is decided by the claim."""
+        return []
+
+    def mark_seen(self, url: str):
+        """Never push url from this worker, other workers still may."""
+        with self._lock:
+            self._known.add(self.canonicalize(url))
+
+    def flush(self) -> int:
+        """Write buffered URLs, returns how many were new to the shared frontier."""
+        with self._lock:
+            entries, self._buffer = self._buffer, []
+        if not entries:
+            return 0
+
+        now = datetime.now()
+        operations = []
+        for url, depth in entries:
+            rank = self.priority(url, depth)
+            operations.append(UpdateOne(
+                {'site_id': self.site_id, 'url': url},
+                {'$setOnInsert': {
+                    'state': PENDING,
+                    'depth': depth,
+                    'priority': rank[0] if isinstance(rank, tuple) else rank,
+                    'shard': shard_of(url, self.shards, self.shard_by),
+                    'attempts': 0,
+                    'retries': 0,
+                    'created_at': now
+                }},
+                upsert=True
+            ))
+        try:
+            return self.collection.bulk_write(operations, ordered=False).upserted_count
+        except BulkWriteError as e:
+            # Another worker inserted the same URL at the same moment
+            if any(error['code'] != DUPLICATE_KEY for error in e.details['writeErrors']):
+                raise
+            return e.details['nUpserted']
+
+    def claim(self, retries_only: bool = False) -> Optional[FrontierEntry]:
+        """Lease the next pending URL or deferred URL whose retry is due; only the latter with retries_only."""
+        entry = self._claim(retries_only)
+        if entry is None and self.requeue_expired():
+            entry = self._claim(retries_only)
+        return entry
+
+    def _claim(self, retries_only: bool = False) -> Optional[FrontierEntry]:
+        now = datetime.now()
+        update = {
+            '$set': {'state': LEASED, 'worker': self.worker_id, 'lease_expires': now + self.lease},
+            '$unset': {'retry_at': ''},
+            '$inc': {'attempts': 1}
+        }
+        due = {'state': DEFERRED, 'retry_at': {'$lte': now}}
+        attempts = [self.own_shards]
+        if self.own_shards is not None and self.steal:
+            attempts.append(None)
+
+        for shards in attempts:
+            query = {'site_id': self.site_id, **(due if retries_only else {'$or': [{'state': PENDING}, due]})}
+            if shards is not None:
+                query['shard'] = {'$in': shards}
+            document = self.collection.find_one_and_update(
+                query, update,
+                sort=CLAIM_ORDER,
+                projection={'url': 1, 'depth': 1, 'state': 1, 'retries': 1},
+                return_document=ReturnDocument.BEFORE
+            )
+            if document:
+                if shards is None:
+                    self.stolen += 1
+                if document['state'] == DEFERRED:
+                    with self._lock:
+                        self._retries[document['url']] = document.get('retries', 0)
+                return FrontierEntry(document['url'], document['depth'])
+        return None
+
+    def is_retry(self, url: str) -> bool:
+        """Whether url was claimed again after being deferred."""
+        with self._lock:
+            return url in self._retries
+
+    def retries_of(self, url: str) -> int:
+        """Failed attempts of a claimed URL before this one."""
+        with self._lock:
+            return self._retries.get(url, 0)
+
+    def requeue_expired(self) -> int:
+        """Put URLs with an expired lease back in the queue, returns how many."""
+        expired = {'site_id': self.site_id, 'state': LEASED, 'lease_expires': {'$lt': datetime.now()}}
+        # A URL that keeps killing its worker is given up on
+        self.collection.update_many(
+            {**expired, 'attempts': {'$gte': Config.FRONTIER_MAX_ATTEMPTS}},
+            {'$set': {'state': FAILED}, '$unset': {'lease_expires': ''}}
+        )
+        requeued = self.collection.update_many(
+            expired,
+            {'$set': {'state': PENDING}, '$unset': {'worker': '', 'lease_expires': ''}}
+        ).modified_count
+        self.requeued += requeued
+        return requeued
+
+    def complete(self, urls: List[str]):
+        if urls:
+            # Leases that expired and went to another worker are left to it
+            self.collection.update_many(
+                {'site_id': self.site_id, 'url': {'$in': urls}, 'state': LEASED, 'worker': self.worker_id},
+                {'$set': {'state': DONE, 'done_at': datetime.now()}, '$unset': {'worker': '', 'lease_expires': ''}}
+            )
+            self._forget(urls)
+
+    def defer(self, url: str, delay: float, count_attempt: bool = True,
+              max_attempts: int = Config.RETRY_MAX_ATTEMPTS) -> bool:
+        """Let url be claimed again after delay seconds; False once it is out of attempts and failed.
+
+        The lease ended normally, so it does not count towards FRONTIER_MAX_ATTEMPTS.
+        """
+        leased = {'site_id': self.site_id, 'url': url, 'state': LEASED, 'worker': self.worker_id}
+        self._forget([url])
+        if count_attempt:
+            given_up = self.collection.update_one(
+                {**leased, 'retries': {'$gte': max_attempts - 1}},
+                {'$set': {'state': FAILED}, '$unset': {'worker': '', 'lease_expires': ''},
+                 '$inc': {'retries': 1, 'attempts': -1}}
+            )
+            if given_up.modified_count:
+                return False
+        self.collection.update_one(leased, {
+            '$set': {'state': DEFERRED, 'retry_at': datetime.now() + timedelta(seconds=delay)},
+            '$unset': {'worker': '', 'lease_expires': ''},
+            '$inc': {'retries': 1 if count_attempt else 0, 'attempts': -1}
+        })
+        return True
+
+    def release(self, urls: List[str]):
+        """Hand leased URLs back without waiting for the lease to expire."""
+        if urls:
+            self.collection.update_many(
+                {'site_id': self.site_id, 'url': {'$in': urls}, 'state': LEASED, 'worker': self.worker_id},
+                {'$set': {'state': PENDING}, '$unset': {'worker': '', 'lease_expires': ''},
+                 '$inc': {'attempts': -1}}
+            )
+            self._forget(urls)
+
+    def _forget(self, urls: List[str]):
+        with self._lock:
+            for url in urls:
+                self._retries.pop(url, None)
+
+    def outstanding(self, urls: Optional[List[str]] = None) -> bool:
+        """Whether any URL of the site (or of urls) is still queued, waiting for a retry or being crawled."""
+        query = {'site_id': self.site_id, 'state': {'$in': [PENDING, DEFERRED, LEASED]}}
+        if urls is not None:
+            query['url'] = {'$in': list(urls)}
+        return self.collection.count_documents(query, limit=1) > 0
+
+    def reset(self):
+        self.collection.delete_many({'site_id': self.site_id})
+        with self._lock:
+            self._known.close()
+            self._known = create_seen_set(self.seen_backend)
+            self._buffer = []
+            self._retries.clear()
+
+    def seen(self, url: str) -> bool:
+        return self.canonicalize(url) in self._known
+
+    def __contains__(self, url: str) -> bool:
+        return self.seen(url)
+
+    @property
+    def seen_count(self) -> int:
+        return len(self._known)
+
+    @property
+    def seen_memory(self) -> int:
+        return self._known.memory_bytes
+
+    def close(self):
+        self._known.close()
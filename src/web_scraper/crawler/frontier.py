@@ -0,0 +1,88 @@
+import heapq
+import itertools
+from typing import Any, Callable, List, NamedTuple, Optional
+
+from web_scraper.crawler.seen import MemorySeenSet, SeenSet
+from web_scraper.utils.helpers import canonicalize_url
+
+
+class FrontierEntry(NamedTuple):
+    url: str
+    depth: int
+
+
+class Frontier:
+    """Priority queue of URLs to crawl with O(1) de-duplication.
+
+    Every URL is canonicalized before it is queued and remembered for the
+    lifetime of the frontier, so a URL that was already queued or crawled is
+    never queued again. Entries with the lowest priority value are popped
+    first; ties keep insertion order. Where seen URLs are remembered is up to
+    ``seen``, see crawler.seen. Queued entries are also kept until
+    ``take_queued`` collects them, so checkpoints only write what is new.
+    """
+
+    def __init__(self,
+                 canonicalize: Callable[[str], str] = canonicalize_url,
+                 priority: Optional[Callable[[str, int], Any]] = None,
+                 seen: Optional[SeenSet] = None):
+        self.canonicalize = canonicalize
+        self.priority = priority or (lambda url, depth: depth)
+        self._heap: List[tuple] = []
+        self._seen = seen if seen is not None else MemorySeenSet()
+        self._counter = itertools.count()
+        self._queued: List[FrontierEntry] = []
+
+    def push(self, url: str, depth: int = 0) -> bool:
+        url = self.canonicalize(url)
+        if not self._seen.add(url):
+            return False
+        heapq.heappush(self._heap, (self.priority(url, depth), next(self._counter), url, depth))
+        self._queued.append(FrontierEntry(url, depth))
+        return True
+
+    def pop(self) -> Optional[FrontierEntry]:
+        if not self._heap:
+            return None
+        _, _, url, depth = heapq.heappop(self._heap)
+        return FrontierEntry(url, depth)
+
+    def peek(self, count: int) -> List[FrontierEntry]:
+        """The next count entries in crawl order, without popping them."""
+        return [FrontierEntry(url, depth) for _, _, url, depth in heapq.nsmallest(count, self._heap)]
+
+    def mark_seen(self, url: str):
+        """Remember a URL without queueing it, e.g. one crawled before a resume."""
+        self._seen.add(self.canonicalize(url))
+
+    def snapshot(self) -> List[FrontierEntry]:
+        """Queued entries in crawl order."""
+        return [FrontierEntry(url, depth) for _, _, url, depth in sorted(self._heap)]
+
+    def take_queued(self) -> List[FrontierEntry]:
+        """Entries pushed since the last call, in push order."""
+        queued, self._queued = self._queued, []
+        return queued
+
+    def seen(self, url: str) -> bool:
+        return self.canonicalize(url) in self._seen
+
+    def __contains__(self, url: str) -> bool:
+        return self.seen(url)
+
+    @property
+    def seen_count(self) -> int:
+        return len(self._seen)
+
+    @property
+    def seen_memory(self) -> int:
+        return self._seen.memory_bytes
+
+    def close(self):
+        self._seen.close()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def __bool__(self) -> bool:
+        return bool(self._heap)
@@ -0,0 +1,139 @@
+import asyncio
+import concurrent.futures
+import json
+import logging
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+from web_scraper.config.config import Config
+from web_scraper.crawler.stats import CrawlStats
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsServer:
+    """Serves the stats of the running crawl: /metrics for Prometheus, /stats.json for people.
+
+    Requests are answered from a server thread, but the crawl changes its
+    stats on the event loop without locks. Started on a running loop, the
+    response is rendered there, so it is a consistent snapshot.
+    """
+
+    def __init__(self, stats: Callable[[], CrawlStats], port: int, host: str = Config.METRICS_HOST,
+                 timeout: float = Config.METRICS_TIMEOUT):
+        # A callable, every crawl run starts a new CrawlStats
+        self.stats = stats
+        self.port = port
+        self.host = host
+        self.timeout = timeout
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def render(self, format: Callable[[CrawlStats], str]) -> str:
+        """format applied to the current stats, on the event loop when there is one."""
+        if self._loop is None:
+            return format(self.stats())
+        future = concurrent.futures.Future()
+
+        def snapshot():
+            try:
+                future.set_result(format(self.stats()))
+            except Exception as e:
+                future.set_exception(e)
+
+        self._loop.call_soon_threadsafe(snapshot)
+        return future.result(self.timeout)
+
+    @property
+    def address(self):
+        return self._server.server_address if self._server else None
+
+    def start(self):
+        try:
+            self._loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._loop = None
+        render = self.render
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split('?')[0]
+                if path == '/metrics':
+                    format = CrawlStats.prometheus
+                    content_type = 'text/plain; version=0.0.4; charset=utf-8'
+                elif path == '/stats.json':
+                    format = lambda stats: json.dumps(stats.to_dict())  # noqa: E731
+                    content_type = 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                try:
+                    body = render(format).encode('utf-8')
+                except (RuntimeError, concurrent.futures.TimeoutError):
+                    # The loop is closed or too busy to answer
+                    self.send_error(503)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name='metrics', daemon=True).start()
+        logger.info(f"Serving metrics on http://{self.host}:{self._server.server_address[1]}/metrics")
+        return self
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class MetricsFile:
+    """Writes the stats of the running crawl to a JSON file every ``interval`` seconds."""
+
+    def __init__(self, stats: Callable[[], CrawlStats], path: str, interval: float = Config.METRICS_INTERVAL):
+        self.stats = stats
+        self.path = path
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def write(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        # Replaced in one go, readers never see half a file
+        descriptor, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(descriptor, 'w') as file:
+            json.dump(self.stats().to_dict(), file, indent=2)
+        os.replace(temporary, self.path)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.write()
+            except OSError as e:
+                logger.error(f"Failed to write metrics to {self.path}: {str(e)}")
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        # Final numbers of the run
+        try:
+            self.write()
+        except OSError as e:
+            logger.error(f"Failed to write metrics to {self.path}: {str(e)}")
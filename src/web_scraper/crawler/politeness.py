@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+import httpx
+
+from web_scraper.config.config import Config
+
+logger = logging.getLogger(__name__)
+
+THROTTLE_STATUSES = (429, 503)
+
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Retry-After header as seconds from now, it is either seconds or an HTTP date."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class TokenBucket:
+    """Requests per second allowed to one host.
+
+    reserve() always takes a token and returns how long the caller has to
+    wait for it, so concurrent callers queue up behind each other instead
+    of racing for the next refill.
+    """
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def reserve(self, now: Optional[float] = None) -> float:
+        now = time.monotonic() if now is None else now
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class HostState:
+    """Rate, robots.txt rules and back-off of one host."""
+
+    def __init__(self, rate: float, burst: float, max_rate: float):
+        self.bucket = TokenBucket(rate, burst)
+        self.max_rate = max_rate
+        self.robots: Optional[RobotFileParser] = None
+        self.robots_expires = 0.0
+        self.robots_lock = asyncio.Lock()
+        self.blocked_until = 0.0
+        self.requests = 0
+        self.throttled = 0
+
+    @property
+    def rate(self) -> float:
+        return self.bucket.rate
+
+    def set_rate(self, rate: float):
+        self.bucket.rate = min(self.max_rate, max(Config.POLITENESS_MIN_RATE, rate))
+
+
+class HostScheduler:
+    """Per-host politeness: robots.txt, Crawl-delay and an adaptive request rate.
+
+    Every host gets a token bucket starting at POLITENESS_RATE requests per
+    second. The rate grows additively while responses are fast and is cut
+    multiplicatively on 429/503, errors and slow responses (AIMD), never
+    above the robots.txt Crawl-delay. Retry-After pauses the host entirely.
+
+    robots.txt is fetched on the first request to a host and cached for
+    ROBOTS_TTL seconds. ``share`` divides all rates, for workers of a
+    distributed crawl that hit the same hosts.
+    """
+
+    def __init__(self, user_agent: str = Config.ROBOTS_USER_AGENT,
+                 respect_robots: bool = Config.RESPECT_ROBOTS,
+                 rate: float = Config.POLITENESS_RATE,
+                 burst: float = Config.POLITENESS_BURST,
+                 share: float = 1.0,
+                 max_rate: float = Config.POLITENESS_MAX_RATE):
+        self.user_agent = user_agent
+        self.respect_robots = respect_robots
+        self.share = share
+        self.rate = rate * share
+        self.max_rate = max_rate * share
+        self.burst = burst
+        self.hosts: Dict[str, HostState] = {}
+        self.client: Optional[httpx.AsyncClient] = None
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    def host(self, url: str) -> Tuple[str, HostState]:
+        parsed = urlparse(url)
+        origin = f"{parsed.scheme}://{parsed.netloc}"
+        state = self.hosts.get(origin)
+        if state is None:
+            state = self.hosts[origin] = HostState(self.rate, self.burst, self.max_rate)
+        return origin, state
+
+    def allowed(self, url: str) -> bool:
+        """robots.txt verdict from the cache, URLs of hosts not loaded yet are allowed."""
+        if not self.respect_robots:
+            return True
+        _, state = self.host(url)
+        return state.robots is None or state.robots.can_fetch(self.user_agent, url)
+
+    async def can_fetch(self, url: str) -> bool:
+        if not self.respect_robots:
+            return True
+        _, state = await self.load_robots(url)
+        return state.robots.can_fetch(self.user_agent, url)
+
+    async def sitemaps(self, url: str) -> List[str]:
+        """Sitemap URLs listed in the host's robots.txt."""
+        _, state = await self.load_robots(url)
+        return state.robots.site_maps() or []
+
+    async def load_robots(self, url: str) -> Tuple[str, HostState]:
+        origin, state = self.host(url)
+        async with state.robots_lock:
+            if state.robots is None or state.robots_expires <= time.monotonic():
+                state.robots, ttl = await self._fetch_robots(origin)
+                state.robots_expires = time.monotonic() + ttl
+                self._apply_crawl_delay(origin, state)
+        return origin, state
+
+    async def _fetch_robots(self, origin: str) -> Tuple[RobotFileParser, float]:
+        robots = RobotFileParser(f"{origin}/robots.txt")
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                follow_redirects=True,
+                timeout=Config.HTTP_TIMEOUT,
+                headers={'User-Agent': Config.USER_AGENT}
+            )
+        try:
+            response = await self.client.get(robots.url)
+        except httpx.HTTPError as e:
+            # Unreachable robots.txt: crawl, but ask again soon
+            logger.warning(f"Could not fetch {robots.url}: {str(e)}")
+            robots.allow_all = True
+            return robots, Config.ROBOTS_ERROR_TTL
+
+        if response.status_code in (401, 403):
+            robots.disallow_all = True
+        elif response.status_code >= 400:
+            # Missing robots.txt allows everything; a server error only for a while
+            robots.allow_all = True
+            if response.status_code >= 500:
+                return robots, Config.ROBOTS_ERROR_TTL
+        else:
+            robots.parse(response.text.splitlines())
+        return robots, Config.ROBOTS_TTL
+
+    def _apply_crawl_delay(self, origin: str, state: HostState):
+        delay = state.robots.crawl_delay(self.user_agent)
+        request_rate = state.robots.request_rate(self.user_agent)
+        max_rate = self.max_rate
+        if delay:
+            max_rate = min(max_rate, self.share / float(delay))
+        if request_rate:
+            max_rate = min(max_rate, self.share * request_rate.requests / request_rate.seconds)
+        state.max_rate = max_rate
+        state.set_rate(state.rate)
+        if delay:
+            # Crawl-delay is the gap between any two requests, no bursts
+            state.bucket.burst = 1.0
+        if delay or request_rate:
+            logger.info(f"{origin}: robots.txt limits crawling to {state.max_rate:.2f} requests/s")
+
+    async def acquire(self, url: str):
+        """Wait until the host of url may get another request."""
+        _, state = self.host(url)
+        state.requests += 1
+        delay = max(state.bucket.reserve(), state.blocked_until - time.monotonic())
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def record(self, url: str, status_code: int, elapsed: float, retry_after: Optional[str] = None):
+        """Adapt the host's rate to how a request went; status 0 is a failed request."""
+        origin, state = self.host(url)
+        if status_code in THROTTLE_STATUSES or status_code == 0:
+            state.throttled += status_code != 0
+            state.set_rate(state.rate * Config.POLITENESS_BACKOFF)
+            pause = retry_after_seconds(retry_after)
+            if pause:
+                state.blocked_until = max(state.blocked_until, time.monotonic() + pause)
+            logger.info(f"{origin}: backing off to {state.rate:.2f} requests/s after status {status_code}")
+        elif elapsed > Config.POLITENESS_SLOW_RESPONSE:
+            state.set_rate(state.rate * Config.POLITENESS_BACKOFF)
+        else:
+            state.set_rate(state.rate + Config.POLITENESS_INCREASE * self.share)
+
+    @property
+    def throttled(self) -> int:
+        return sum(state.throttled for state in self.hosts.values())
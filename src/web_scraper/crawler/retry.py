@@ -0,0 +1,153 @@
+import heapq
+import itertools
+import random
+import re
+import time
+from collections import Counter
+from typing import List, Optional, Tuple
+
+import httpx
+
+from web_scraper.config.config import Config
+from web_scraper.crawler.frontier import FrontierEntry
+
+# Worth another try later: the server or the network had a bad moment
+RETRYABLE_STATUSES = (408, 425, 429, 500, 502, 503, 504)
+_RETRYABLE_BROWSER_ERRORS = re.compile(
+    r'net::ERR_(CONNECTION_(REFUSED|RESET|CLOSED|ABORTED|TIMED_OUT)|TIMED_OUT|EMPTY_RESPONSE|'
+    r'NETWORK_CHANGED|INTERNET_DISCONNECTED|NAME_NOT_RESOLVED|ADDRESS_UNREACHABLE|HTTP2_PROTOCOL_ERROR)'
+    r'|Target (page, context or browser )?(has been )?closed'
+)
+
+
+class RetryableStatusError(Exception):
+    """The server answered with a status that is worth retrying."""
+
+    def __init__(self, status_code: int, retry_after: Optional[float] = None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Timeouts, dropped connections and 5xx/429 are retried, everything else is permanent."""
+    if isinstance(error, RetryableStatusError):
+        return True
+    if isinstance(error, (httpx.TimeoutException, httpx.TransportError, TimeoutError, ConnectionError)):
+        return True
+    # Playwright errors are matched by name, so HTTP-only crawls never import playwright
+    playwright_errors = {cls.__name__ for cls in type(error).__mro__ if cls.__module__.startswith('playwright')}
+    if 'TimeoutError' in playwright_errors:
+        return True
+    if 'Error' in playwright_errors:
+        return bool(_RETRYABLE_BROWSER_ERRORS.search(str(error)))
+    return False
+
+
+def backoff_delay(attempt: int, base: float = Config.RETRY_BASE_DELAY, cap: float = Config.RETRY_MAX_DELAY,
+                  retry_after: Optional[float] = None) -> float:
+    """Seconds before retry ``attempt`` (from 1): exponential with full jitter, at least Retry-After."""
+    delay = random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+    return max(delay, retry_after or 0.0)
+
+
+class RetryQueue:
+    """URLs waiting for their next attempt, ordered by when it is due."""
+
+    def __init__(self, max_attempts: int = Config.RETRY_MAX_ATTEMPTS):
+        self.max_attempts = max_attempts
+        self.attempts = Counter()
+        self._heap: List[Tuple[float, int, FrontierEntry]] = []
+        self._counter = itertools.count()
+
+    def schedule(self, entry: FrontierEntry, delay: float, count_attempt: bool = True) -> bool:
+        """Queue entry again after delay seconds; False once it is out of attempts."""
+        if count_attempt:
+            self.attempts[entry.url] += 1
+            if self.attempts[entry.url] >= self.max_attempts:
+                return False
+        heapq.heappush(self._heap, (time.monotonic() + delay, next(self._counter), entry))
+        return True
+
+    def pop_due(self) -> Optional[FrontierEntry]:
+        if self._heap and self._heap[0][0] <= time.monotonic():
+            return heapq.heappop(self._heap)[2]
+        return None
+
+    def next_due(self) -> Optional[float]:
+        """Seconds until the next retry is due."""
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0][0] - time.monotonic())
+
+    def entries(self) -> List[FrontierEntry]:
+        return [entry for _, _, entry in sorted(self._heap)]
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def __bool__(self) -> bool:
+        return bool(self._heap)
+
+
+class CircuitBreaker:
+    """Stops sending requests to a host that keeps failing.
+
+    After ``threshold`` retryable failures in a row the circuit opens and the
+    host is left alone for ``cooldown`` seconds. Then one request is let
+    through: if it succeeds the circuit closes, if not it opens again for
+    twice as long, up to ``max_cooldown``.
+    """
+
+    def __init__(self, threshold: int = Config.CIRCUIT_FAILURE_THRESHOLD,
+                 cooldown: float = Config.CIRCUIT_COOLDOWN,
+                 max_cooldown: float = Config.CIRCUIT_MAX_COOLDOWN):
+        self.threshold = threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.cooldown = cooldown
+        self.failures = 0
+        self.open_until = 0.0
+        self.probing = False
+        self.trips = 0
+
+    @property
+    def is_open(self) -> bool:
+        return self.failures >= self.threshold
+
+    def wait(self) -> float:
+        """Seconds until a request may go to the host, 0 when it may go now."""
+        if not self.is_open:
+            return 0.0
+        remaining = self.open_until - time.monotonic()
+        if remaining > 0:
+            return remaining
+        if self.probing:
+            # Someone is already trying the host, check back shortly
+            return min(self.base_cooldown, 1.0)
+        self.probing = True
+        return 0.0
+
+    def release(self):
+        """Give the probe back without a verdict, no request was sent to the host."""
+        self.probing = False
+
+    def record_success(self):
+        self.failures = 0
+        self.probing = False
+        self.cooldown = self.base_cooldown
+
+    def record_failure(self) -> bool:
+        """Count a failure, True when it opened the circuit."""
+        if self.is_open and not self.probing:
+            # Sent before the circuit opened, the host already has its break
+            return False
+        self.failures += 1
+        if not self.is_open:
+            return False
+        if self.probing:
+            self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+        self.probing = False
+        self.open_until = time.monotonic() + self.cooldown
+        self.trips += 1
+        return True
@@ -0,0 +1,83 @@
+import heapq
+import math
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from web_scraper.config.config import Config
+
+SECONDS_PER_DAY = 86400.0
+
+
+def estimate_change_rate(checks: int, changes: int, first_checked_at: Optional[datetime],
+                         last_checked_at: Optional[datetime]) -> Optional[float]:
+    """Changes per day estimated from the checks of a page.
+
+    A check only tells whether the page changed since the one before, not
+    how often, so counting changes underestimates busy pages. This is the
+    Cho and Garcia-Molina estimator for that case: -ln((n - X + 0.5) / (n + 0.5))
+    over the mean interval, with n intervals and X of them with a change.
+    """
+    if checks < 2 or not first_checked_at or not last_checked_at:
+        return None
+    intervals = checks - 1
+    days = (last_checked_at - first_checked_at).total_seconds() / SECONDS_PER_DAY
+    if days <= 0:
+        return None
+    changes = min(changes, intervals)
+    return math.log((intervals + 0.5) / (intervals - changes + 0.5)) / (days / intervals)
+
+
+def change_history(existing_page: Optional[Dict], changed: bool, now: datetime) -> Dict:
+    """Page fields recording one more check of the page."""
+    if not existing_page or not existing_page.get('checks'):
+        return {
+            'checks': 1,
+            'changes': 0,
+            'first_checked_at': now,
+            'last_checked_at': now,
+            'last_changed_at': now,
+            'change_rate': None
+        }
+
+    checks = existing_page['checks'] + 1
+    changes = existing_page.get('changes', 0) + (1 if changed else 0)
+    first_checked_at = existing_page.get('first_checked_at') or now
+    return {
+        'checks': checks,
+        'changes': changes,
+        'first_checked_at': first_checked_at,
+        'last_checked_at': now,
+        'last_changed_at': now if changed else existing_page.get('last_changed_at'),
+        'change_rate': estimate_change_rate(checks, changes, first_checked_at, now)
+    }
+
+
+def change_probability(page: Dict, now: datetime,
+                       default_rate: float = Config.REVISIT_DEFAULT_RATE) -> float:
+    """Chance that the page changed since its last check, changes being a Poisson process."""
+    last_checked_at = page.get('last_checked_at') or page.get('updated_at')
+    if not last_checked_at:
+        return 1.0
+    rate = page.get('change_rate')
+    if rate is None:
+        rate = default_rate
+    # Pages never seen changing still get a look now and then
+    rate = max(rate, Config.REVISIT_MIN_RATE)
+    days = max(0.0, (now - last_checked_at).total_seconds() / SECONDS_PER_DAY)
+    return 1 - math.exp(-rate * days)
+
+
+def select_revisits(pages: Iterable[Dict], budget: int, now: Optional[datetime] = None,
+                    min_probability: float = Config.REVISIT_MIN_PROBABILITY) -> List[Tuple[str, float]]:
+    """The ``budget`` pages most likely to have changed, as (url, probability), best first.
+
+    Pages below min_probability are left alone even when budget is left over.
+    """
+    now = now or datetime.now()
+    candidates = (
+        (probability, page['url'])
+        for page in pages
+        for probability in (change_probability(page, now),)
+        if probability >= min_probability
+    )
+    return [(url, probability) for probability, url in heapq.nlargest(budget, candidates)]
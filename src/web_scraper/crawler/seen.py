@@ -0,0 +1,215 @@
+import hashlib
+import logging
+import math
+import sqlite3
+import sys
+from abc import ABCMeta, abstractmethod
+from typing import Optional, Set, Tuple
+
+from web_scraper.config.choices import SEEN_BACKENDS
+from web_scraper.config.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def url_hashes(url: str) -> Tuple[int, int]:
+    """Two independent 64-bit hashes of url, the first one is its key."""
+    digest = hashlib.blake2b(url.encode('utf-8'), digest_size=16).digest()
+    return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little')
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over the hashes from url_hashes.
+
+    Sized for ``capacity`` items at ``error_rate`` false positives; past
+    capacity it keeps working with a growing false-positive rate.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.size = max(8, int(math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, hashes: Tuple[int, int]):
+        # Double hashing, k positions from two hashes
+        first, second = hashes
+        for i in range(self.hash_count):
+            yield (first + i * second) % self.size
+
+    def add(self, hashes: Tuple[int, int]) -> bool:
+        """Set the bits of an item, True when at least one was not set yet."""
+        new = False
+        bits = self.bits
+        for position in self._positions(hashes):
+            byte, mask = position >> 3, 1 << (position & 7)
+            if not bits[byte] & mask:
+                bits[byte] |= mask
+                new = True
+        if new:
+            self.count += 1
+            if self.count == self.capacity + 1:
+                logger.warning(f"Seen-URL filter is past its capacity of {self.capacity}, "
+                               f"false positives will exceed {self.error_rate}")
+        return new
+
+    def __contains__(self, hashes: Tuple[int, int]) -> bool:
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(hashes))
+
+    @property
+    def memory_bytes(self) -> int:
+        return len(self.bits)
+
+
+class SeenSet(metaclass=ABCMeta):
+    """URLs a frontier has already queued or crawled."""
+
+    @abstractmethod
+    def add(self, url: str) -> bool:
+        """Remember url, True when it was not seen before."""
+
+    @abstractmethod
+    def __contains__(self, url: str) -> bool:
+        pass
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+    @property
+    @abstractmethod
+    def memory_bytes(self) -> int:
+        """Approximate RAM held by the set."""
+
+    def close(self):
+        pass
+
+
+class MemorySeenSet(SeenSet):
+    """Exact set of URL strings, fastest but grows with every URL."""
+
+    def __init__(self):
+        self._urls: Set[str] = set()
+
+    def add(self, url: str) -> bool:
+        if url in self._urls:
+            return False
+        self._urls.add(url)
+        return True
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._urls
+
+    def __len__(self) -> int:
+        return len(self._urls)
+
+    @property
+    def memory_bytes(self) -> int:
+        return sys.getsizeof(self._urls) + sum(sys.getsizeof(url) for url in self._urls)
+
+
+class BloomSeenSet(SeenSet):
+    """Bloom filter only: fixed memory, but about ``error_rate`` of new URLs are
+    taken for seen and never crawled."""
+
+    def __init__(self, capacity: int = Config.SEEN_CAPACITY, error_rate: float = Config.SEEN_ERROR_RATE):
+        self.filter = BloomFilter(capacity, error_rate)
+
+    def add(self, url: str) -> bool:
+        return self.filter.add(url_hashes(url))
+
+    def __contains__(self, url: str) -> bool:
+        return url_hashes(url) in self.filter
+
+    def __len__(self) -> int:
+        return self.filter.count
+
+    @property
+    def memory_bytes(self) -> int:
+        return self.filter.memory_bytes
+
+
+class DiskSeenSet(SeenSet):
+    """Exact set of 64-bit URL hashes on disk, behind a Bloom filter.
+
+    Most new URLs are answered by the filter alone; only its false
+    positives (``error_rate`` of them) and URLs really seen before are
+    looked up on disk. RAM is the filter plus SQLite's page cache. The
+    hashes live in an anonymous SQLite database, a file in SQLite's temp
+    directory (SQLITE_TMPDIR or TMPDIR) that is deleted with the connection.
+    """
+
+    def __init__(self, capacity: int = Config.SEEN_CAPACITY, error_rate: float = Config.SEEN_ERROR_RATE,
+                 cache_mb: int = Config.SEEN_CACHE_MB):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.cache_mb = cache_mb
+        # Opened on first use, a frontier that is never filled costs nothing
+        self.filter: Optional[BloomFilter] = None
+        self._connection: Optional[sqlite3.Connection] = None
+        self._count = 0
+        self.disk_lookups = 0
+
+    def _open(self):
+        self.filter = BloomFilter(self.capacity, self.error_rate)
+        # Scratch data, a resume rebuilds it from the checkpoint
+        self._connection = sqlite3.connect('', isolation_level=None, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=OFF')
+        self._connection.execute('PRAGMA synchronous=OFF')
+        self._connection.execute(f'PRAGMA cache_size=-{self.cache_mb * 1024}')
+        self._connection.execute('CREATE TABLE seen (hash INTEGER PRIMARY KEY) WITHOUT ROWID')
+
+    @staticmethod
+    def _key(hashes: Tuple[int, int]) -> int:
+        # SQLite integers are signed
+        key = hashes[0]
+        return key - (1 << 64) if key >= 1 << 63 else key
+
+    def _stored(self, key: int) -> bool:
+        self.disk_lookups += 1
+        return self._connection.execute('SELECT 1 FROM seen WHERE hash = ?', (key,)).fetchone() is not None
+
+    def add(self, url: str) -> bool:
+        if self._connection is None:
+            self._open()
+        hashes = url_hashes(url)
+        key = self._key(hashes)
+        if not self.filter.add(hashes) and self._stored(key):
+            return False
+        self._connection.execute('INSERT OR IGNORE INTO seen (hash) VALUES (?)', (key,))
+        self._count += 1
+        return True
+
+    def __contains__(self, url: str) -> bool:
+        if self._connection is None:
+            return False
+        hashes = url_hashes(url)
+        return hashes in self.filter and self._stored(self._key(hashes))
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def memory_bytes(self) -> int:
+        if self.filter is None:
+            return 0
+        return self.filter.memory_bytes + self.cache_mb * 1024 * 1024
+
+    def close(self):
+        if self._connection is None:
+            return
+        self._connection.close()
+        self._connection = None
+
+
+def create_seen_set(backend: str = Config.SEEN_BACKEND) -> SeenSet:
+    if backend == 'bloom':
+        return BloomSeenSet()
+    if backend == 'disk':
+        return DiskSeenSet()
+    if backend == 'memory':
+        return MemorySeenSet()
+    raise ValueError(f"Unknown seen-set backend '{backend}', expected one of {', '.join(SEEN_BACKENDS)}")
@@ -0,0 +1,181 @@
+import logging
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, Awaitable, Callable, Iterable, List, NamedTuple, Optional, Set
+from xml.etree import ElementTree
+
+import httpx
+
+from web_scraper.config.config import Config
+
+logger = logging.getLogger(__name__)
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+class SitemapTooLarge(ValueError):
+    pass
+
+
+class SitemapEntry(NamedTuple):
+    url: str
+    lastmod: Optional[datetime] = None
+
+
+def parse_lastmod(value: Optional[str]) -> Optional[datetime]:
+    """W3C datetime from <lastmod> as naive local time, like the stored timestamps."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.endswith('Z'):
+        value = value[:-1] + '+00:00'
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+
+def _local_name(tag: str) -> str:
+    return tag.rpartition('}')[2]
+
+
+class SitemapParser:
+    """Incremental parser for <urlset> and <sitemapindex> documents.
+
+    Bytes are fed as they arrive, gzip is detected from the first bytes.
+    Every <url> is dropped from the tree as soon as it is read, so memory
+    stays flat no matter how many URLs the sitemap holds. Child sitemaps of
+    an index are collected in ``sitemaps``. Documents larger than
+    ``max_bytes`` once decompressed raise SitemapTooLarge, a gzip bomb is
+    never inflated past that.
+    """
+
+    def __init__(self, max_bytes: int = Config.SITEMAP_MAX_BYTES):
+        self._parser = ElementTree.XMLPullParser(events=('start', 'end'))
+        self._decompressor = None
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._started = False
+        self._root = None
+        self.sitemaps: List[SitemapEntry] = []
+
+    def feed(self, chunk: bytes) -> List[SitemapEntry]:
+        if not self._started and chunk:
+            self._started = True
+            if chunk.startswith(GZIP_MAGIC):
+                self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        if self._decompressor:
+            # One byte past the limit is enough to know it was exceeded
+            chunk = self._decompressor.decompress(chunk, self.max_bytes - self.size + 1)
+        self._feed(chunk)
+        return self._read()
+
+    def close(self) -> List[SitemapEntry]:
+        if self._decompressor:
+            self._feed(self._decompressor.flush(self.max_bytes - self.size + 1))
+        self._parser.close()
+        return self._read()
+
+    def _feed(self, data: bytes):
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            raise SitemapTooLarge(f"larger than {self.max_bytes} bytes")
+        self._parser.feed(data)
+
+    def _read(self) -> List[SitemapEntry]:
+        entries = []
+        for event, element in self._parser.read_events():
+            if event == 'start':
+                if self._root is None:
+                    self._root = element
+                continue
+
+            tag = _local_name(element.tag)
+            if tag not in ('url', 'sitemap'):
+                continue
+            loc = lastmod = None
+            for child in element:
+                name = _local_name(child.tag)
+                if name == 'loc':
+                    loc = (child.text or '').strip()
+                elif name == 'lastmod':
+                    lastmod = parse_lastmod(child.text)
+            if loc:
+                (entries if tag == 'url' else self.sitemaps).append(SitemapEntry(loc, lastmod))
+            self._root.clear()
+        return entries
+
+
+class SitemapReader:
+    """Streams the URLs of sitemaps and sitemap indexes over HTTP."""
+
+    def __init__(self, client: Optional[httpx.AsyncClient] = None,
+                 max_depth: int = Config.SITEMAP_MAX_DEPTH,
+                 max_bytes: int = Config.SITEMAP_MAX_BYTES,
+                 before_request: Optional[Callable[[str], Awaitable]] = None):
+        self.client = client
+        self._own_client = client is None
+        self.max_depth = max_depth
+        self.max_bytes = max_bytes
+        # e.g. HostScheduler.acquire, so sitemaps count against the host's rate
+        self.before_request = before_request
+        self._read: Set[str] = set()
+
+    async def __aenter__(self):
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                follow_redirects=True,
+                timeout=Config.HTTP_TIMEOUT,
+                headers={'User-Agent': Config.USER_AGENT}
+            )
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self._own_client and self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    async def entries(self, url: str, depth: int = 0) -> AsyncIterator[SitemapEntry]:
+        """Page URLs of a sitemap, child sitemaps of an index are read in turn."""
+        if url in self._read or depth > self.max_depth:
+            return
+        self._read.add(url)
+
+        parser = SitemapParser(self.max_bytes)
+        try:
+            if self.before_request:
+                await self.before_request(url)
+            async with self.client.stream('GET', url) as response:
+                if response.status_code != 200:
+                    logger.warning(f"Sitemap {url} returned {response.status_code}")
+                    return
+                async for chunk in response.aiter_bytes():
+                    for entry in parser.feed(chunk):
+                        yield entry
+            for entry in parser.close():
+                yield entry
+        except SitemapTooLarge as e:
+            logger.warning(f"Skipping sitemap {url}: {str(e)}")
+            return
+        except (httpx.HTTPError, ElementTree.ParseError, zlib.error) as e:
+            logger.error(f"Failed to read sitemap {url}: {str(e)}")
+            return
+
+        for sitemap in parser.sitemaps:
+            async for entry in self.entries(sitemap.url, depth + 1):
+                yield entry
+
+    async def batches(self, urls: Iterable[str], size: int = Config.SITEMAP_BATCH_SIZE
+                      ) -> AsyncIterator[List[SitemapEntry]]:
+        batch = []
+        for url in urls:
+            async for entry in self.entries(url):
+                batch.append(entry)
+                if len(batch) >= size:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
@@ -0,0 +1,148 @@
+import bisect
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence
+
+# Seconds, from a fast cache hit to a slow browser render
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """Fixed-bucket histogram, cheap enough to observe every page."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        # One more for values above the last bucket
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, fraction: float) -> float:
+        """Estimate, interpolated within the bucket the quantile falls in."""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                if index == len(self.buckets):
+                    return lower
+                return lower + (self.buckets[index] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def cumulative(self) -> List[int]:
+        totals, running = [], 0
+        for count in self.counts:
+            running += count
+            totals.append(running)
+        return totals
+
+    def to_dict(self) -> Dict:
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+            'buckets': dict(zip([*map(str, self.buckets), '+Inf'], self.cumulative()))
+        }
+
+
+def _label_text(labels: Dict[str, str]) -> str:
+    return ','.join(f'{name}="{value}"' for name, value in sorted(labels.items()))
+
+
+class CrawlStats:
+    """Counters and per-stage timings for one crawl run, logged as a summary at the end."""
+
+    def __init__(self, labels: Optional[Dict[str, str]] = None):
+        self.counters = Counter()
+        self.histograms: Dict[str, Histogram] = {}
+        self.labels = labels or {}
+        self.started = time.monotonic()
+
+    def incr(self, name: str, value: int = 1):
+        self.counters[name] += value
+
+    def observe(self, stage: str, seconds: float):
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            histogram = self.histograms[stage] = Histogram()
+        histogram.observe(seconds)
+
+    @contextmanager
+    def time(self, stage: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def __getitem__(self, name: str) -> int:
+        return self.counters[name]
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def summary(self) -> str:
+        counters = self.counters
+        summary = (
+            f"{counters['processed']} pages in {self.elapsed:.1f}s: "
+            f"{counters['saved']} saved, {counters['unchanged']} unchanged, "
+            f"{counters['failed']} failed, {counters['duplicates']} near duplicates; "
+            f"{counters['revalidated']} revalidated (304), {counters['fresh']} still fresh, "
+            f"{counters['downloaded']} re-downloaded; "
+            f"{counters['writes_avoided']} heading/link writes avoided, {counters['write_failed']} pages not written; "
+            f"{counters['disallowed']} blocked by robots.txt, {counters['throttled']} throttled (429/503); "
+            f"{counters['retried']} retries, {counters['deferred']} deferred by circuit breakers"
+        )
+        if 'download' in self.histograms:
+            summary += (
+                f"; {counters['files_downloaded']} files downloaded ({counters['files_resumed']} resumed, "
+                f"{counters['files_unchanged']} unchanged, {counters['files_failed']} failed)"
+            )
+        return summary
+
+    def stage_summary(self) -> str:
+        return ', '.join(
+            f"{stage} p50 {histogram.quantile(0.5) * 1000:.0f}ms p95 {histogram.quantile(0.95) * 1000:.0f}ms"
+            for stage, histogram in sorted(self.histograms.items())
+        )
+
+    def to_dict(self) -> Dict:
+        return {
+            'labels': self.labels,
+            'elapsed': self.elapsed,
+            'counters': dict(self.counters),
+            'stages': {stage: histogram.to_dict() for stage, histogram in self.histograms.items()}
+        }
+
+    def prometheus(self, prefix: str = 'scraper') -> str:
+        """Counters and stage histograms in the Prometheus text exposition format."""
+        labels = _label_text(self.labels)
+        lines = []
+        for name, value in sorted(self.counters.items()):
+            lines.append(f'# TYPE {prefix}_{name}_total counter')
+            lines.append(f'{prefix}_{name}_total{{{labels}}} {value}')
+
+        metric = f'{prefix}_stage_seconds'
+        lines.append(f'# TYPE {metric} histogram')
+        for stage, histogram in sorted(self.histograms.items()):
+            stage_labels = _label_text({**self.labels, 'stage': stage})
+            bounds = [*map(str, histogram.buckets), '+Inf']
+            for bound, total in zip(bounds, histogram.cumulative()):
+                lines.append(f'{metric}_bucket{{{stage_labels},le="{bound}"}} {total}')
+            lines.append(f'{metric}_sum{{{stage_labels}}} {histogram.sum}')
+            lines.append(f'{metric}_count{{{stage_labels}}} {histogram.count}')
+        lines.append(f'# TYPE {prefix}_elapsed_seconds gauge')
+        lines.append(f'{prefix}_elapsed_seconds{{{labels}}} {self.elapsed:.3f}')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,4 @@
+from web_scraper.daemon.jobs import JOB_STATES, CrawlJob, JobManager
+from web_scraper.daemon.server import JobServer
+
+__all__ = ['JOB_STATES', 'CrawlJob', 'JobManager', 'JobServer']
@@ -0,0 +1,264 @@
+import asyncio
+import logging
+import os
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from web_scraper.config.config import Config
+from web_scraper.crawler.dedup import SimHashIndex, from_signed64
+from web_scraper.crawler.politeness import HostScheduler
+from web_scraper.database.client import get_page_simhashes
+from web_scraper.extraction import ENGINES
+from web_scraper.fetch import FETCH_MODES, Fetcher
+from web_scraper.search import SearchIndex
+from web_scraper.services import SERVICES, BaseScraperService
+
+logger = logging.getLogger(__name__)
+
+JOB_STATES = ('queued', 'running', 'done', 'failed', 'cancelled')
+
+
+@dataclass
+class CrawlJob:
+    id: str
+    site: str
+    seeds: List[str]
+    limit: int
+    concurrency: int
+    force: bool = False
+    sitemap: bool = False
+    engine: Optional[str] = None
+    fetch_mode: Optional[str] = None
+    download_files: bool = False
+    state: str = 'queued'
+    created_at: datetime = field(default_factory=datetime.now)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+    stats: Optional[Dict] = None
+    service: Optional[BaseScraperService] = field(default=None, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.state in ('done', 'failed', 'cancelled')
+
+    def to_dict(self) -> Dict:
+        stats = self.stats
+        if stats is None and self.state == 'running' and self.service is not None:
+            stats = self.service.stats.to_dict()
+        return {
+            'id': self.id,
+            'site': self.site,
+            'seeds': self.seeds,
+            'limit': self.limit,
+            'concurrency': self.concurrency,
+            'force': self.force,
+            'sitemap': self.sitemap,
+            'engine': self.engine,
+            'fetch_mode': self.fetch_mode,
+            'download_files': self.download_files,
+            'state': self.state,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'error': self.error,
+            'stats': stats
+        }
+
+
+class JobManager:
+    """Runs crawl jobs inside one long-lived process.
+
+    At most ``max_jobs`` jobs crawl at once, the rest wait in submission
+    order. Each job is held to ``max_pages`` pages and ``max_concurrency``
+    parallel pages. Fetchers (HTTP client, Chromium) are started once per
+    site and fetch mode and shared by its jobs, and a single host scheduler
+    keeps robots.txt rules and rate limits across all of them. The
+    near-duplicate index of a site is loaded once and only topped up with
+    pages saved since, and all jobs index into one search index.
+    """
+
+    def __init__(self, max_jobs: int = Config.SERVE_MAX_JOBS,
+                 max_pages: int = Config.SERVE_MAX_PAGES,
+                 max_concurrency: int = Config.SERVE_MAX_CONCURRENCY,
+                 history: int = Config.SERVE_JOB_HISTORY):
+        self.max_jobs = max_jobs
+        self.max_pages = max_pages
+        self.max_concurrency = max_concurrency
+        self.history = history
+        self.jobs: Dict[str, CrawlJob] = OrderedDict()
+        self.scheduler = HostScheduler()
+        self._slots = asyncio.Semaphore(max_jobs)
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._fetchers: Dict[Tuple[str, str, str], Fetcher] = {}
+        self._fetchers_lock = asyncio.Lock()
+        # Per site: the index and when it was last refreshed from the database
+        self._near_duplicates: Dict[str, Tuple[SimHashIndex, datetime]] = {}
+        self._near_duplicates_lock = asyncio.Lock()
+        self._search_index: Optional[SearchIndex] = None
+
+    def submit(self, request: Dict) -> CrawlJob:
+        """Queue a crawl job, ValueError when the request is not valid."""
+        site = request.get('site')
+        if site not in SERVICES:
+            raise ValueError(f"Unknown site '{site}', expected one of {', '.join(SERVICES)}")
+        engine = request.get('engine')
+        if engine is not None and engine not in ENGINES:
+            raise ValueError(f"Unknown engine '{engine}'")
+        fetch_mode = request.get('fetch_mode')
+        if fetch_mode is not None and fetch_mode not in FETCH_MODES:
+            raise ValueError(f"Unknown fetch mode '{fetch_mode}'")
+        try:
+            limit = int(request.get('limit', 5))
+            concurrency = int(request.get('concurrency', 1))
+        except (TypeError, ValueError):
+            raise ValueError('limit and concurrency must be integers')
+        if limit < 1 or concurrency < 1:
+            raise ValueError('limit and concurrency must be at least 1')
+
+        seeds = request.get('seeds') or []
+        if isinstance(seeds, str) or not all(isinstance(seed, str) for seed in seeds):
+            raise ValueError('seeds must be a list of URLs')
+
+        download_files = bool(request.get('download_files', Config.DOWNLOAD_FILES))
+        service = SERVICES[site](site_id=site, engine=engine, fetch_mode=fetch_mode, download_files=download_files)
+        site_host = urlparse(service.base_url).netloc
+        for seed in seeds:
+            if urlparse(seed).netloc != site_host:
+                # Rejected before it ever ran, its frontier is not needed
+                service.frontier.close()
+                raise ValueError(f"Seed {seed} is not on {site_host}")
+
+        job = CrawlJob(
+            id=uuid.uuid4().hex[:12],
+            site=site,
+            seeds=list(seeds),
+            limit=min(limit, self.max_pages),
+            concurrency=min(concurrency, self.max_concurrency),
+            force=bool(request.get('force', False)),
+            sitemap=bool(request.get('sitemap', False)),
+            engine=engine,
+            fetch_mode=fetch_mode,
+            download_files=download_files,
+            service=service
+        )
+        self.jobs[job.id] = job
+        self._tasks[job.id] = asyncio.create_task(self._run(job))
+        self._prune()
+        logger.info(f"Job {job.id} queued: {site}, {job.limit} pages, concurrency {job.concurrency}")
+        return job
+
+    def get(self, job_id: str) -> Optional[CrawlJob]:
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[CrawlJob]:
+        job = self.jobs.get(job_id)
+        task = self._tasks.get(job_id)
+        if job is not None and task is not None and not job.finished:
+            task.cancel()
+        return job
+
+    def counts(self) -> Dict[str, int]:
+        counts = dict.fromkeys(JOB_STATES, 0)
+        for job in self.jobs.values():
+            counts[job.state] += 1
+        return counts
+
+    async def warm(self, sites: Iterable[str]):
+        """Start the fetchers of sites ahead of their first job."""
+        for site in sites:
+            await self._fetcher_for(SERVICES[site](site_id=site))
+
+    async def close(self):
+        for task in list(self._tasks.values()):
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        for fetcher in self._fetchers.values():
+            await fetcher.close()
+        self._fetchers.clear()
+        if self._search_index is not None:
+            self._search_index.close()
+            self._search_index = None
+        self._near_duplicates.clear()
+        await self.scheduler.close()
+
+    async def _fetcher_for(self, service: BaseScraperService) -> Fetcher:
+        key = (service.site_id, service.fetch_mode, service.engine.name)
+        async with self._fetchers_lock:
+            fetcher = self._fetchers.get(key)
+            if fetcher is None:
+                # Sized for the largest job, jobs of a site share its pool
+                service.concurrency = self.max_concurrency
+                fetcher = self._fetchers[key] = await service.create_fetcher().start()
+                logger.info(f"Started {fetcher.name} fetcher for {service.site_id}")
+            return fetcher
+
+    async def _near_duplicates_for(self, site_id: str) -> SimHashIndex:
+        """The site's SimHash index, with pages saved since the last job added, e.g. by other crawls."""
+        async with self._near_duplicates_lock:
+            index, refreshed_at = self._near_duplicates.get(site_id, (None, None))
+            if index is None:
+                index = SimHashIndex(Config.NEAR_DUPLICATE_DISTANCE)
+            # Pages still being written at refresh time are read again next time, add() skips known ones
+            now = datetime.now() - timedelta(seconds=Config.EXPORT_SETTLE_SECONDS)
+            for page in await asyncio.to_thread(get_page_simhashes, site_id, refreshed_at):
+                index.add(page['url'], from_signed64(page['simhash']))
+            self._near_duplicates[site_id] = (index, now)
+            return index
+
+    def _search_index_for(self, service: BaseScraperService) -> Optional[SearchIndex]:
+        if not service.index_search:
+            return None
+        if self._search_index is None:
+            self._search_index = SearchIndex()
+        return self._search_index
+
+    async def _run(self, job: CrawlJob):
+        service = job.service
+        try:
+            async with self._slots:
+                job.state = 'running'
+                job.started_at = datetime.now()
+                # Jobs of the same site must not share a checkpoint
+                service.crawl_name = f"{job.site}.job-{job.id}"
+                if job.seeds:
+                    service.frontier.close()
+                    service.frontier = service.create_frontier()
+                    for seed in job.seeds:
+                        service.frontier.push(seed)
+                service.use_shared(
+                    fetcher=await self._fetcher_for(service),
+                    scheduler=self.scheduler,
+                    near_duplicates=await self._near_duplicates_for(job.site),
+                    search_index=self._search_index_for(service)
+                )
+                await service.crawl(max_pages=job.limit, concurrency=job.concurrency,
+                                    sitemap=job.sitemap, force=job.force)
+                job.state = 'done'
+        except asyncio.CancelledError:
+            job.state = 'cancelled'
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {str(e)}")
+            job.state = 'failed'
+            job.error = str(e) or type(e).__name__
+        finally:
+            job.finished_at = datetime.now()
+            if job.started_at:
+                job.stats = service.stats.to_dict()
+                try:
+                    os.remove(service.checkpoint_path())
+                except OSError:
+                    pass
+            # The finished job keeps its numbers, not the service
+            job.service = None
+            self._tasks.pop(job.id, None)
+            logger.info(f"Job {job.id} {job.state}")
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self.jobs[job_id]
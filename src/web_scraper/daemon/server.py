@@ -0,0 +1,137 @@
+import asyncio
+import json
+import logging
+from http import HTTPStatus
+from typing import Dict, Optional, Tuple
+
+from web_scraper.config.config import Config
+from web_scraper.daemon.jobs import JobManager
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_BYTES = 1024 * 1024
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class JobServer:
+    """JSON API of the crawl daemon, one request per connection.
+
+    GET /health, GET /jobs, POST /jobs, GET /jobs/{id} and DELETE /jobs/{id}.
+    Listens on host:port, or on a Unix socket when socket_path is given.
+    """
+
+    def __init__(self, manager: JobManager, host: str = Config.SERVE_HOST, port: int = Config.SERVE_PORT,
+                 socket_path: Optional[str] = Config.SERVE_SOCKET):
+        self.manager = manager
+        self.host = host
+        self.port = port
+        self.socket_path = socket_path
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def address(self) -> str:
+        if self.socket_path:
+            return f"unix:{self.socket_path}"
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    async def start(self):
+        if self.socket_path:
+            self._server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+        else:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        logger.info(f"Accepting crawl jobs on {self.address}")
+        return self
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    def route(self, method: str, path: str, body: bytes) -> Tuple[int, Dict]:
+        parts = [part for part in path.split('/') if part]
+        if parts == ['health']:
+            if method != 'GET':
+                raise HttpError(HTTPStatus.METHOD_NOT_ALLOWED, 'Use GET')
+            return HTTPStatus.OK, {'status': 'ok', 'jobs': self.manager.counts()}
+
+        if parts == ['jobs']:
+            if method == 'GET':
+                return HTTPStatus.OK, {'jobs': [job.to_dict() for job in self.manager.jobs.values()]}
+            if method == 'POST':
+                try:
+                    request = json.loads(body or b'{}')
+                except ValueError:
+                    raise HttpError(HTTPStatus.BAD_REQUEST, 'Body is not valid JSON')
+                if not isinstance(request, dict):
+                    raise HttpError(HTTPStatus.BAD_REQUEST, 'Body must be a JSON object')
+                try:
+                    job = self.manager.submit(request)
+                except ValueError as e:
+                    raise HttpError(HTTPStatus.BAD_REQUEST, str(e))
+                return HTTPStatus.ACCEPTED, job.to_dict()
+            raise HttpError(HTTPStatus.METHOD_NOT_ALLOWED, 'Use GET or POST')
+
+        if len(parts) == 2 and parts[0] == 'jobs':
+            if method == 'GET':
+                job = self.manager.get(parts[1])
+            elif method == 'DELETE':
+                job = self.manager.cancel(parts[1])
+            else:
+                raise HttpError(HTTPStatus.METHOD_NOT_ALLOWED, 'Use GET or DELETE')
+            if job is None:
+                raise HttpError(HTTPStatus.NOT_FOUND, f"No job {parts[1]}")
+            return HTTPStatus.OK, job.to_dict()
+
+        raise HttpError(HTTPStatus.NOT_FOUND, f"No route {path}")
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Tuple[str, str, bytes]:
+        request_line = (await reader.readline()).decode('latin-1').split()
+        if len(request_line) != 3:
+            raise HttpError(HTTPStatus.BAD_REQUEST, 'Malformed request line')
+        method, target, _ = request_line
+        length = 0
+        while True:
+            line = (await reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            if name.strip().lower() == 'content-length':
+                try:
+                    length = int(value)
+                except ValueError:
+                    raise HttpError(HTTPStatus.BAD_REQUEST, 'Invalid Content-Length')
+        if length > MAX_BODY_BYTES:
+            raise HttpError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, 'Body too large')
+        body = await reader.readexactly(length) if length > 0 else b''
+        return method.upper(), target.split('?')[0], body
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            try:
+                method, path, body = await self._read_request(reader)
+                status, payload = self.route(method, path, body)
+            except HttpError as e:
+                status, payload = e.status, {'error': str(e)}
+            except Exception as e:
+                logger.error(f"Failed to handle request: {str(e)}")
+                status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {'error': 'Internal error'}
+            content = json.dumps(payload).encode('utf-8')
+            status = HTTPStatus(status)
+            writer.write(
+                f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(content)}\r\n"
+                f"Connection: close\r\n\r\n".encode('latin-1') + content
+            )
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
@@ -0,0 +1,201 @@
+import gzip
+import hashlib
+import logging
+import os
+import tempfile
+from abc import ABCMeta, abstractmethod
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from bson import Binary
+from pymongo.errors import BulkWriteError
+
+from web_scraper.config.config import Config
+
+try:
+    import zstandard
+except ImportError:  # gzip is used instead
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY = 11000
+_EXTENSIONS = {'zstd': '.zst', 'gzip': '.gz'}
+
+
+def content_key(content: str) -> str:
+    """sha256 of the UTF-8 content, the address of its blob."""
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def default_codec() -> str:
+    codec = Config.BLOB_COMPRESSION
+    if codec == 'zstd' and zstandard is None:
+        return 'gzip'
+    return codec
+
+
+def compress(data: bytes, codec: str) -> bytes:
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=Config.BLOB_COMPRESSION_LEVEL).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def decompress(data: bytes, codec: str) -> bytes:
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError('Blob is zstd compressed, install zstandard to read it')
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+class BlobStore(metaclass=ABCMeta):
+    """Compressed page content addressed by its sha256.
+
+    Identical content is stored once. Every blob records its codec, so
+    blobs written with zstd and gzip can be read side by side.
+    """
+
+    def __init__(self, codec: Optional[str] = None):
+        self.codec = codec or default_codec()
+
+    def put_many(self, contents: Iterable[str]) -> List[str]:
+        """Store contents that are not stored yet, returns their keys in order."""
+        contents = list(contents)
+        keys = [content_key(content) for content in contents]
+        existing = self._existing(set(keys))
+        new = {}
+        for key, content in zip(keys, contents):
+            if key not in existing and key not in new:
+                new[key] = compress(content.encode('utf-8'), self.codec)
+        if new:
+            self._write(new)
+        logger.debug(f"Stored {len(new)} new blobs, {len(keys) - len(new)} already stored")
+        return keys
+
+    def put(self, content: str) -> str:
+        return self.put_many([content])[0]
+
+    def get(self, key: str) -> Optional[str]:
+        blob = self._read(key)
+        if blob is None:
+            return None
+        codec, data = blob
+        return decompress(data, codec).decode('utf-8')
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        """Contents of several blobs, keys not stored are left out."""
+        return {
+            key: decompress(data, codec).decode('utf-8')
+            for key, (codec, data) in self._read_many(set(keys)).items()
+        }
+
+    def _read_many(self, keys: Set[str]) -> Dict[str, Tuple[str, bytes]]:
+        blobs = {}
+        for key in keys:
+            blob = self._read(key)
+            if blob is not None:
+                blobs[key] = blob
+        return blobs
+
+    @abstractmethod
+    def _existing(self, keys: Set[str]) -> Set[str]:
+        pass
+
+    @abstractmethod
+    def _write(self, blobs: Dict[str, bytes]):
+        pass
+
+    @abstractmethod
+    def _read(self, key: str) -> Optional[Tuple[str, bytes]]:
+        pass
+
+
+class MongoBlobStore(BlobStore):
+    """Blobs in a MongoDB collection, one document per blob."""
+
+    def __init__(self, collection, codec: Optional[str] = None):
+        super().__init__(codec)
+        self.collection = collection
+
+    def _existing(self, keys: Set[str]) -> Set[str]:
+        return {blob['_id'] for blob in self.collection.find({'_id': {'$in': list(keys)}}, {'_id': 1})}
+
+    def _write(self, blobs: Dict[str, bytes]):
+        now = datetime.now()
+        try:
+            self.collection.insert_many([
+                {'_id': key, 'codec': self.codec, 'data': Binary(data), 'size': len(data), 'created_at': now}
+                for key, data in blobs.items()
+            ], ordered=False)
+        except BulkWriteError as e:
+            # Stored by another writer in the meantime, same content either way
+            if any(error['code'] != DUPLICATE_KEY for error in e.details['writeErrors']):
+                raise
+
+    def _read(self, key: str) -> Optional[Tuple[str, bytes]]:
+        blob = self.collection.find_one({'_id': key}, {'codec': 1, 'data': 1})
+        return (blob['codec'], bytes(blob['data'])) if blob else None
+
+    def _read_many(self, keys: Set[str]) -> Dict[str, Tuple[str, bytes]]:
+        return {
+            blob['_id']: (blob['codec'], bytes(blob['data']))
+            for blob in self.collection.find({'_id': {'$in': list(keys)}}, {'codec': 1, 'data': 1})
+        }
+
+
+class DirectoryBlobStore(BlobStore):
+    """Blobs as files under ``root``, fanned out by the first two hex digits."""
+
+    def __init__(self, root: str, codec: Optional[str] = None):
+        super().__init__(codec)
+        self.root = root
+
+    def _path(self, key: str, codec: str) -> str:
+        return os.path.join(self.root, key[:2], key + _EXTENSIONS[codec])
+
+    def _find(self, key: str) -> Optional[Tuple[str, str]]:
+        for codec in _EXTENSIONS:
+            path = self._path(key, codec)
+            if os.path.exists(path):
+                return codec, path
+        return None
+
+    def _existing(self, keys: Set[str]) -> Set[str]:
+        return {key for key in keys if self._find(key)}
+
+    def _write(self, blobs: Dict[str, bytes]):
+        for key, data in blobs.items():
+            path = self._path(key, self.codec)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Written next to the target and renamed, readers never see half a blob
+            descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(descriptor, 'wb') as file:
+                file.write(data)
+            os.replace(temporary, path)
+
+    def _read(self, key: str) -> Optional[Tuple[str, bytes]]:
+        found = self._find(key)
+        if found is None:
+            return None
+        codec, path = found
+        with open(path, 'rb') as file:
+            return codec, file.read()
+
+
+_store: Optional[BlobStore] = None
+_store_db = None
+
+
+def get_blob_store(db) -> Optional[BlobStore]:
+    """The configured blob store, None when content stays inline in pages."""
+    global _store, _store_db
+    if Config.BLOB_STORE == 'inline':
+        return None
+    if _store is None or _store_db is not db:
+        _store_db = db
+        if Config.BLOB_STORE == 'directory':
+            _store = DirectoryBlobStore(Config.BLOB_DIR)
+        else:
+            _store = MongoBlobStore(db.blobs)
+    return _store
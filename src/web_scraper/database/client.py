@@ -1,40 +1,117 @@
-from pymongo import MongoClient
-from pymongo.errors import PyMongoError
+from collections import defaultdict, deque
+from bson import ObjectId
+from pymongo import DeleteMany, InsertOne, MongoClient, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
 from web_scraper.config.config import Config
+from web_scraper.database.blob_store import get_blob_store
 import logging
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import Callable, Iterable, List, Dict, Optional, Sequence, Tuple
 from web_scraper.entity.models import PyObjectId
+from web_scraper.entity.records import FileRecord, HeadingRecord, LinkRecord
 
 logger = logging.getLogger(__name__)
 
+# Page fields kept in the blob store, the page keeps <field>_ref
+CONTENT_FIELDS = ('content_html', 'content_text')
+# Everything needed to decide whether a page changed, without its content
+PAGE_META_FIELDS = (
+    'url', 'site_id', 'status_code', 'checksum', 'fingerprint', 'simhash', 'duplicate_of',
+    'etag', 'last_modified', 'max_age', 'fetched_at',
+    'checks', 'changes', 'first_checked_at', 'last_checked_at', 'last_changed_at', 'change_rate',
+    'content_html_ref', 'content_text_ref', 'created_at', 'updated_at', 'error', 'processed'
+)
+# Compared when diffing stored links and files against a new crawl
+LINK_FIELDS = ('title', 'href')
+FILE_FIELDS = ('title', 'file_name', 'file_extension')
+# Set once the headings, links and files of a page are saved: the next crawl compares
+# them to decide whether the page changed, so a page whose related writes failed
+# keeps its old values and is saved again
+COMMIT_FIELDS = ('checksum', 'fingerprint', 'etag', 'last_modified', 'max_age')
+
 
 class DatabaseClient:
     _instance = None
 
     def __new__(cls):
         if cls._instance is None:
-            cls._instance = super().__new__(cls)
             try:
-                cls._instance.client = MongoClient(
+                client = MongoClient(
                     Config.MONGODB_URI,
                     username=Config.MONGODB_USERNAME,
                     password=Config.MONGODB_PASSWORD,
                     authSource=Config.MONGODB_AUTH_SOURCE,
                     connectTimeoutMS=30000
                 )
-                cls._instance.db = cls._instance.client[Config.MONGODB_DB]
-                # Create indexes
-                cls._instance.db.pages.create_index('url', unique=True)
-                cls._instance.db.headings.create_index('page_id')
-                cls._instance.db.headings.create_index('parent_id')
-                cls._instance.db.files.create_index('page_id')
-                cls._instance.db.links.create_index('page_id')
+                cls.attach(client, client[Config.MONGODB_DB])
             except PyMongoError as e:
+                cls._instance = None
                 logger.error(f"Database connection failed: {str(e)}")
                 raise
         return cls._instance
 
+    @classmethod
+    def attach(cls, client, db) -> 'DatabaseClient':
+        """Use db for all database access from now on, e.g. a benchmark database."""
+        # Indexes are created once by `scrape migrate`, see database.migrations
+        instance = super().__new__(cls)
+        instance.client = client
+        instance.db = db
+        cls._instance = instance
+        return instance
+
+
+def _store_content(db, pages: List[Dict]) -> Dict:
+    """Move the content of pages into the blob store, leaving references.
+
+    Returns the $unset that drops content stored inline by older versions.
+    """
+    store = get_blob_store(db)
+    if store is None:
+        return {}
+
+    contents, targets = [], []
+    for page_data in pages:
+        for field in CONTENT_FIELDS:
+            content = page_data.pop(field, None)
+            page_data[f'{field}_ref'] = None
+            if content:
+                contents.append(content)
+                targets.append((page_data, f'{field}_ref'))
+    for (page_data, ref_field), key in zip(targets, store.put_many(contents)):
+        page_data[ref_field] = key
+    return {'$unset': {field: '' for field in CONTENT_FIELDS}}
+
+
+def _bulk_write(collection, operations: List, owners: List) -> set:
+    """Unordered bulk_write, returns the owners (operations[i] belongs to owners[i]) of the writes that failed."""
+    if not operations:
+        return set()
+    try:
+        collection.bulk_write(operations, ordered=False)
+    except BulkWriteError as e:
+        if e.details.get('writeConcernErrors'):
+            raise
+        errors = e.details.get('writeErrors', [])
+        logger.error(f"{len(errors)} of {len(operations)} writes to {collection.name} failed: "
+                     f"{errors[0].get('errmsg') if errors else e}")
+        return {owners[error['index']] for error in errors}
+    return set()
+
+
+def get_page_content(page: Dict, field: str = 'content_html') -> Optional[str]:
+    """Content of a stored page, read and decompressed from the blob store on demand."""
+    if page.get(field):
+        return page[field]
+    key = page.get(f'{field}_ref')
+    if not key:
+        return None
+    try:
+        return get_blob_store(DatabaseClient().db).get(key)
+    except Exception as e:
+        logger.error(f"Failed to read {field} of {page.get('url')}: {str(e)}")
+        return None
+
 
 def save_page(page_data: dict) -> Optional[PyObjectId]:
     try:
@@ -43,8 +120,10 @@ def save_page(page_data: dict) -> Optional[PyObjectId]:
 
         # Remove created_at from update if it exists
         page_data.pop('created_at', None)
+        unset = _store_content(db, [page_data])
 
-        result = db.pages.update_one(
+        # Single round trip: upsert and get the id back in the same call
+        page = db.pages.find_one_and_update(
             {'url': page_data['url']},
             {'$set': {
                 **page_data,
@@ -52,104 +131,503 @@ def save_page(page_data: dict) -> Optional[PyObjectId]:
             },
                 '$setOnInsert': {
                     'created_at': now
-                }},
-            upsert=True
+                },
+                **unset},
+            projection={'_id': 1, 'created_at': 1, 'updated_at': 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
         )
 
-        if result.upserted_id:
+        if page.get('created_at') == page.get('updated_at'):
             logger.info(f"Saved new page: {page_data['url']}")
-            return PyObjectId(result.upserted_id)
         else:
-            page = db.pages.find_one({'url': page_data['url']})
             logger.info(f"Updated existing page: {page_data['url']}")
-            return PyObjectId(page['_id']) if page else None
+        return PyObjectId(page['_id'])
     except Exception as e:
         logger.error(f"Failed to save page: {str(e)}")
         return None
 
 
-def save_headings(page_id: PyObjectId, headings: List[Dict]) -> bool:
-    try:
-        db = DatabaseClient().db
-        now = datetime.now()
+def _heading_documents(page_id: PyObjectId, headings: List[HeadingRecord], now: datetime) -> List[Dict]:
+    # Ids are generated client side so parent_id can be resolved before the
+    # headings are inserted with a single insert_many
+    documents = []
+    saved_ids = {}
+    for heading in headings:
+        document = {
+            **heading.to_document(),
+            '_id': ObjectId(),
+            'page_id': page_id,
+            'created_at': now,
+            'updated_at': now
+        }
+
+        # If this heading has a parent, set the parent_id
+        if document.get('parent_id') in saved_ids:
+            document['parent_id'] = saved_ids[document['parent_id']]
+
+        documents.append(document)
+        saved_ids[document['checksum']] = document['_id']
+    return documents
+
+
+def _link_documents(page_id: PyObjectId, links: List[LinkRecord], now: datetime) -> List[Dict]:
+    return [{
+        'url': link.url,
+        'page_id': page_id,
+        'title': link.title,
+        'href': link.href,
+        'created_at': now
+    } for link in links]
+
+
+def _file_documents(page_id: PyObjectId, files: List[FileRecord], now: datetime) -> List[Dict]:
+    # A document linked twice on a page is one file
+    unique = {}
+    for file in files:
+        unique.setdefault(file.url, file)
+    return [{
+        'url': file.url,
+        'page_id': page_id,
+        'title': file.title,
+        'file_name': file.file_name,
+        'file_extension': file.file_extension,
+        'created_at': now
+    } for file in unique.values()]
+
+
+def _diff_headings(page_id: PyObjectId, headings: List[HeadingRecord], stored: List[Dict],
+                   now: datetime) -> Tuple[List, int]:
+    # Headings are matched on checksum (the heading markup), duplicates in
+    # stored order. Matched headings keep their _id and only get parent_id
+    # re-linked when the hierarchy around them changed.
+    available = defaultdict(deque)
+    for document in stored:
+        available[document['checksum']].append(document)
+
+    operations = []
+    saved_ids = {}
+    for heading in headings:
+        parent_id = saved_ids.get(heading.parent_id) if heading.parent_id else None
+        matches = available.get(heading.checksum)
+
+        if matches:
+            document = matches.popleft()
+            heading_id = document['_id']
+            if document.get('parent_id') != parent_id:
+                operations.append(UpdateOne(
+                    {'_id': heading_id},
+                    {'$set': {'parent_id': parent_id, 'updated_at': now}}
+                ))
+        else:
+            heading_id = ObjectId()
+            operations.append(InsertOne({
+                **heading.to_document(),
+                '_id': heading_id,
+                'page_id': page_id,
+                'parent_id': parent_id,
+                'created_at': now,
+                'updated_at': now
+            }))
+        saved_ids[heading.checksum] = heading_id
+
+    removed = [document['_id'] for documents in available.values() for document in documents]
+    writes = len(operations) + len(removed)
+    if removed:
+        operations.append(DeleteMany({'_id': {'$in': removed}}))
+    return operations, writes
+
+
+def _diff_by_url(new_documents: List[Dict], stored: List[Dict], fields: Sequence[str]) -> Tuple[List, int]:
+    # Matched on URL, duplicates in stored order; stored rows left over are removed
+    available = defaultdict(deque)
+    for document in stored:
+        available[document['url']].append(document)
 
-        # First remove old headings for this page
-        db.headings.delete_many({'page_id': page_id})
+    operations = []
+    for new_document in new_documents:
+        matches = available.get(new_document['url'])
+        if matches:
+            document = matches.popleft()
+            changes = {
+                key: new_document[key] for key in fields
+                if document.get(key) != new_document[key]
+            }
+            if changes:
+                operations.append(UpdateOne({'_id': document['_id']}, {'$set': changes}))
+        else:
+            operations.append(InsertOne(new_document))
+
+    removed = [document['_id'] for documents in available.values() for document in documents]
+    writes = len(operations) + len(removed)
+    if removed:
+        operations.append(DeleteMany({'_id': {'$in': removed}}))
+    return operations, writes
+
+
+def _diff_links(page_id: PyObjectId, links: List[LinkRecord], stored: List[Dict],
+                now: datetime) -> Tuple[List, int]:
+    return _diff_by_url(_link_documents(page_id, links, now), stored, LINK_FIELDS)
+
+
+def _diff_files(page_id: PyObjectId, files: List[FileRecord], stored: List[Dict],
+                now: datetime) -> Tuple[List, int]:
+    return _diff_by_url(_file_documents(page_id, files, now), stored, FILE_FIELDS)
+
+
+def _sync_headings(db, headings_by_page: Dict[PyObjectId, List[HeadingRecord]], now: datetime,
+                   write_mode: str) -> Tuple[int, set]:
+    """Store the headings of several pages, returns the writes avoided and the pages whose writes failed."""
+    page_ids = list(headings_by_page)
+
+    if write_mode != 'diff':
+        # Replace: remove old headings for these pages and insert everything
+        db.headings.delete_many({'page_id': {'$in': page_ids}})
+        operations, owners = [], []
+        for page_id, headings in headings_by_page.items():
+            for document in _heading_documents(page_id, headings, now):
+                operations.append(InsertOne(document))
+                owners.append(page_id)
+        return 0, _bulk_write(db.headings, operations, owners)
+
+    stored = defaultdict(list)
+    for document in db.headings.find(
+            {'page_id': {'$in': page_ids}}, {'page_id': 1, 'checksum': 1, 'parent_id': 1}
+    ).sort('_id', 1):
+        stored[document['page_id']].append(document)
+
+    operations, owners, writes = [], [], 0
+    for page_id, headings in headings_by_page.items():
+        page_operations, page_writes = _diff_headings(page_id, headings, stored[page_id], now)
+        operations.extend(page_operations)
+        owners.extend([page_id] * len(page_operations))
+        writes += page_writes
+    failed = _bulk_write(db.headings, operations, owners)
+
+    full_rewrite = sum(len(documents) for documents in stored.values()) + \
+        sum(len(headings) for headings in headings_by_page.values())
+    return full_rewrite - writes, failed
+
+
+def _sync_by_url(collection, by_page: Dict[PyObjectId, List], documents: Callable, diff: Callable,
+                 fields: Sequence[str], now: datetime, write_mode: str) -> Tuple[int, set]:
+    """Store the links or files of several pages, returns the writes avoided and the pages whose writes failed."""
+    page_ids = list(by_page)
+
+    if write_mode != 'diff':
+        # Replace: remove old rows for these pages and insert everything
+        collection.delete_many({'page_id': {'$in': page_ids}})
+        operations, owners = [], []
+        for page_id, records in by_page.items():
+            for document in documents(page_id, records, now):
+                operations.append(InsertOne(document))
+                owners.append(page_id)
+        return 0, _bulk_write(collection, operations, owners)
+
+    stored = defaultdict(list)
+    for document in collection.find(
+            {'page_id': {'$in': page_ids}}, {'page_id': 1, 'url': 1, **dict.fromkeys(fields, 1)}
+    ).sort('_id', 1):
+        stored[document['page_id']].append(document)
+
+    operations, owners, writes = [], [], 0
+    for page_id, records in by_page.items():
+        page_operations, page_writes = diff(page_id, records, stored[page_id], now)
+        operations.extend(page_operations)
+        owners.extend([page_id] * len(page_operations))
+        writes += page_writes
+    failed = _bulk_write(collection, operations, owners)
+
+    full_rewrite = sum(len(documents) for documents in stored.values()) + \
+        sum(len(records) for records in by_page.values())
+    return full_rewrite - writes, failed
 
-        if headings:
-            # Process hierarchy and save headings
-            saved_ids = {}
-            for heading in headings:
-                heading['page_id'] = page_id
-                heading['created_at'] = now
-                heading['updated_at'] = now
 
-                # If this heading has a parent, set the parent_id
-                if 'parent_id' in heading and heading['parent_id'] in saved_ids:
-                    heading['parent_id'] = saved_ids[heading['parent_id']]
+def _sync_links(db, links_by_page: Dict[PyObjectId, List[LinkRecord]], now: datetime,
+                write_mode: str) -> Tuple[int, set]:
+    """Store the links of several pages, see _sync_by_url."""
+    return _sync_by_url(db.links, links_by_page, _link_documents, _diff_links, LINK_FIELDS, now, write_mode)
 
-                result = db.headings.insert_one(heading)
-                saved_ids[heading['checksum']] = result.inserted_id
 
-            logger.info(f"Saved {len(saved_ids)} headings for page {page_id}")
+def _sync_files(db, files_by_page: Dict[PyObjectId, List[FileRecord]], now: datetime,
+                write_mode: str) -> Tuple[int, set]:
+    """Store the files of several pages, one row per page and file URL; see _sync_by_url."""
+    return _sync_by_url(db.files, files_by_page, _file_documents, _diff_files, FILE_FIELDS, now, write_mode)
+
+
+def save_headings(page_id: PyObjectId, headings: List[HeadingRecord], write_mode: str = Config.WRITE_MODE) -> bool:
+    try:
+        db = DatabaseClient().db
+        avoided, failed = _sync_headings(db, {page_id: headings}, datetime.now(), write_mode)
+        if failed:
+            logger.error(f"Failed to save some headings for page {page_id}")
+            return False
+        logger.info(f"Saved {len(headings)} headings for page {page_id} ({avoided} writes avoided)")
         return True
     except Exception as e:
         logger.error(f"Failed to save headings: {str(e)}")
         return False
 
 
-def save_links(page_id: PyObjectId, links: List[Dict]) -> bool:
+def save_links(page_id: PyObjectId, links: List[LinkRecord], write_mode: str = Config.WRITE_MODE) -> bool:
     try:
         db = DatabaseClient().db
-        now = datetime.now()
-
-        # First remove old links for this page
-        db.links.delete_many({'page_id': page_id})
-
-        if links:
-            links_data = [{
-                'url': link['url'],
-                'page_id': page_id,
-                'title': link.get('title', ''),
-                'href': link['href'],
-                'created_at': now
-            } for link in links]
-
-            result = db.links.insert_many(links_data)
-            logger.info(f"Saved {len(result.inserted_ids)} links for page {page_id}")
+        avoided, failed = _sync_links(db, {page_id: links}, datetime.now(), write_mode)
+        if failed:
+            logger.error(f"Failed to save some links for page {page_id}")
+            return False
+        logger.info(f"Saved {len(links)} links for page {page_id} ({avoided} writes avoided)")
         return True
     except Exception as e:
         logger.error(f"Failed to save links: {str(e)}")
         return False
 
 
-def save_files(page_id: PyObjectId, files: List[Dict]) -> bool:
+def save_files(page_id: PyObjectId, files: List[FileRecord], write_mode: str = Config.WRITE_MODE) -> bool:
     try:
         db = DatabaseClient().db
-        now = datetime.now()
-
-        if files:
-            files_data = [{
-                'url': file['url'],
-                'page_id': page_id,
-                'title': file.get('title', ''),
-                'file_name': file['file_name'],
-                'file_extension': file['file_extension'],
-                'created_at': now
-            } for file in files]
-
-            result = db.files.insert_many(files_data)
-            logger.info(f"Saved {len(result.inserted_ids)} files for page {page_id}")
+        avoided, failed = _sync_files(db, {page_id: files}, datetime.now(), write_mode)
+        if failed:
+            logger.error(f"Failed to save some files for page {page_id}")
+            return False
+        logger.info(f"Saved {len(files)} files for page {page_id} ({avoided} writes avoided)")
         return True
     except Exception as e:
         logger.error(f"Failed to save files: {str(e)}")
         return False
 
 
+def save_page_bundles(bundles: List[Dict], write_mode: str = Config.WRITE_MODE) -> Dict:
+    """Persist a batch of pages with their headings, links and files.
+
+    Each bundle is a dict with 'page', 'headings', 'links' and 'files', or
+    with 'url' and 'set' for a plain field update of a stored page. Uses
+    one bulk_write for the pages, one find for their ids and one round of
+    writes per related collection for the whole batch. In 'diff' mode
+    headings and links are only inserted, re-linked or deleted where they
+    changed.
+
+    Writes that fail only fail their own page. A page gets its
+    COMMIT_FIELDS last, once everything else of it is stored, so a page
+    saved halfway is not mistaken for unchanged by the next crawl.
+    Returns the number of pages saved, of writes avoided and the URLs
+    whose writes failed; other database errors fail the whole batch.
+    """
+    result = {'pages': 0, 'writes_avoided': 0, 'failed': []}
+    if not bundles:
+        return result
+
+    db = DatabaseClient().db
+    now = datetime.now()
+
+    # Field updates for pages that were not re-downloaded
+    updated = [bundle['url'] for bundle in bundles if 'set' in bundle]
+    failed = _bulk_write(db.pages, [
+        UpdateOne({'url': bundle['url']}, {'$set': bundle['set']})
+        for bundle in bundles if 'set' in bundle
+    ], updated)
+
+    # Later bundles for the same URL win
+    by_url = {}
+    for bundle in bundles:
+        if 'page' not in bundle:
+            continue
+        page_data = dict(bundle['page'])
+        page_data.pop('created_at', None)
+        by_url[page_data['url']] = (page_data, bundle)
+
+    if not by_url:
+        result['failed'] = sorted(failed)
+        return result
+
+    commits = {
+        url: {field: page_data.pop(field) for field in COMMIT_FIELDS if field in page_data}
+        for url, (page_data, _) in by_url.items()
+    }
+    unset = _store_content(db, [page_data for page_data, _ in by_url.values()])
+    urls = list(by_url)
+    failed |= _bulk_write(db.pages, [
+        UpdateOne(
+            {'url': url},
+            {'$set': {**by_url[url][0], 'updated_at': now}, '$setOnInsert': {'created_at': now}, **unset},
+            upsert=True
+        )
+        for url in urls
+    ], urls)
+
+    page_ids = {
+        page['url']: page['_id']
+        for page in db.pages.find({'url': {'$in': [url for url in urls if url not in failed]}}, {'url': 1})
+    }
+    failed |= {url for url in urls if url not in page_ids}
+
+    headings, links, files = {}, {}, {}
+    for url, page_id in page_ids.items():
+        bundle = by_url[url][1]
+        headings[page_id] = bundle['headings']
+        links[page_id] = bundle['links']
+        files[page_id] = bundle['files']
+
+    avoided = 0
+    failed_ids = set()
+    if page_ids:
+        for sync, records in ((_sync_headings, headings), (_sync_links, links), (_sync_files, files)):
+            sync_avoided, sync_failed = sync(db, records, now, write_mode)
+            avoided += sync_avoided
+            failed_ids |= sync_failed
+
+    committed = [url for url, page_id in page_ids.items() if page_id not in failed_ids and commits[url]]
+    failed |= {url for url, page_id in page_ids.items() if page_id in failed_ids}
+    failed |= _bulk_write(db.pages, [
+        UpdateOne({'_id': page_ids[url]}, {'$set': commits[url]}) for url in committed
+    ], committed)
+
+    saved = [url for url in page_ids if url not in failed]
+    logger.info(f"Saved {len(saved)} pages, {sum(map(len, headings.values()))} headings, "
+                f"{sum(map(len, links.values()))} links and {sum(map(len, files.values()))} files "
+                f"({avoided} writes avoided)")
+    if failed:
+        logger.error(f"Failed to save {len(failed)} pages: {', '.join(sorted(failed)[:5])}")
+    result['pages'] = len(saved)
+    result['writes_avoided'] = avoided
+    result['failed'] = sorted(failed)
+    return result
+
+
 def get_page(url: str) -> Optional[dict]:
     try:
         db = DatabaseClient().db
         return db.pages.find_one({'url': url})
     except Exception as e:
         logger.error(f"Failed to get page: {str(e)}")
-        return None
\ No newline at end of file
+        return None
+
+
+def get_page_meta(url: str) -> Optional[dict]:
+    try:
+        db = DatabaseClient().db
+        return db.pages.find_one({'url': url}, PAGE_META_FIELDS)
+    except Exception as e:
+        logger.error(f"Failed to get page: {str(e)}")
+        return None
+
+
+def get_pages_meta(urls: List[str]) -> Dict[str, dict]:
+    """get_page_meta for several URLs in one query, URLs not stored are left out."""
+    try:
+        db = DatabaseClient().db
+        return {page['url']: page for page in db.pages.find({'url': {'$in': urls}}, PAGE_META_FIELDS)}
+    except Exception as e:
+        logger.error(f"Failed to get pages: {str(e)}")
+        return {}
+
+
+def get_page_links(page_id: PyObjectId) -> List[LinkRecord]:
+    try:
+        db = DatabaseClient().db
+        return [
+            LinkRecord(link['url'], link.get('title', ''), link['href'])
+            for link in db.links.find({'page_id': page_id}, {'_id': 0, 'url': 1, 'title': 1, 'href': 1})
+        ]
+    except Exception as e:
+        logger.error(f"Failed to get links: {str(e)}")
+        return []
+
+
+def get_page_simhashes(site_id: str, since: Optional[datetime] = None) -> List[Dict]:
+    """SimHashes of the site's pages that are not duplicates, only those saved after since if given."""
+    try:
+        db = DatabaseClient().db
+        query = {'site_id': site_id, 'simhash': {'$ne': None}, 'duplicate_of': None}
+        if since is not None:
+            query['updated_at'] = {'$gt': since}
+        return list(db.pages.find(query, {'_id': 0, 'url': 1, 'simhash': 1}))
+    except Exception as e:
+        logger.error(f"Failed to get page simhashes: {str(e)}")
+        return []
+
+
+def get_pages_last_seen(urls: List[str]) -> Dict[str, datetime]:
+    """When each stored page was last saved or fetched, one query for all urls."""
+    try:
+        db = DatabaseClient().db
+        last_seen = {}
+        for page in db.pages.find({'url': {'$in': urls}}, {'_id': 0, 'url': 1, 'updated_at': 1, 'fetched_at': 1}):
+            timestamps = [page.get('updated_at'), page.get('fetched_at')]
+            last_seen[page['url']] = max((t for t in timestamps if t), default=None)
+        return last_seen
+    except Exception as e:
+        logger.error(f"Failed to get page timestamps: {str(e)}")
+        return {}
+
+
+def get_revisit_candidates(site_id: str) -> Iterable[Dict]:
+    """Change history of every stored page of the site, streamed from a cursor."""
+    try:
+        db = DatabaseClient().db
+        return db.pages.find(
+            {'site_id': site_id},
+            {'_id': 0, 'url': 1, 'updated_at': 1, 'last_checked_at': 1, 'change_rate': 1}
+        )
+    except Exception as e:
+        logger.error(f"Failed to get revisit candidates: {str(e)}")
+        return []
+
+
+def get_download(url: str) -> Optional[dict]:
+    try:
+        db = DatabaseClient().db
+        return db.downloads.find_one({'url': url})
+    except Exception as e:
+        logger.error(f"Failed to get download: {str(e)}")
+        return None
+
+
+def save_download(url: str, fields: Dict) -> bool:
+    """Record the state of a file download, one document per file URL."""
+    try:
+        db = DatabaseClient().db
+        now = datetime.now()
+        db.downloads.update_one(
+            {'url': url},
+            {'$set': {**fields, 'updated_at': now}, '$setOnInsert': {'created_at': now}},
+            upsert=True
+        )
+        return True
+    except Exception as e:
+        logger.error(f"Failed to save download: {str(e)}")
+        return False
+
+
+def get_pending_file_urls(site_id: Optional[str] = None, limit: int = 1000, batch_size: int = 1000) -> List[str]:
+    """File URLs linked from stored pages that were never downloaded completely."""
+    try:
+        db = DatabaseClient().db
+        query = {}
+        if site_id:
+            query['page_id'] = {'$in': db.pages.distinct('_id', {'site_id': site_id})}
+
+        def not_downloaded(urls: List[str]) -> List[str]:
+            done = {
+                download['url']
+                for download in db.downloads.find({'url': {'$in': urls}, 'state': 'done'}, {'_id': 0, 'url': 1})
+            }
+            return [url for url in urls if url not in done]
+
+        pending, batch, seen = [], [], set()
+        for file in db.files.find(query, {'_id': 0, 'url': 1}):
+            if file['url'] in seen:
+                continue
+            seen.add(file['url'])
+            batch.append(file['url'])
+            if len(batch) >= batch_size:
+                pending.extend(not_downloaded(batch))
+                batch = []
+                if len(pending) >= limit:
+                    break
+        if batch:
+            pending.extend(not_downloaded(batch))
+        return pending[:limit]
+    except Exception as e:
+        logger.error(f"Failed to get pending files: {str(e)}")
+        return []
@@ -0,0 +1,89 @@
+import logging
+import os
+import shutil
+from abc import ABCMeta, abstractmethod
+from typing import Tuple
+
+from gridfs import GridFSBucket
+
+from web_scraper.config.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class FileStore(metaclass=ABCMeta):
+    """Downloaded documents addressed by the sha256 of their bytes.
+
+    put() takes a finished download from disk, so a file is never held in
+    memory. The same document linked under several URLs is stored once.
+    """
+
+    def put(self, key: str, path: str, extension: str = '') -> Tuple[str, bool]:
+        """Store the file at path under key and remove path.
+
+        Returns the location of the stored file and whether it is new.
+        """
+        if self.exists(key, extension):
+            os.remove(path)
+            return self.location(key, extension), False
+        location = self._write(key, path, extension)
+        return location, True
+
+    @abstractmethod
+    def exists(self, key: str, extension: str = '') -> bool:
+        pass
+
+    @abstractmethod
+    def location(self, key: str, extension: str = '') -> str:
+        pass
+
+    @abstractmethod
+    def _write(self, key: str, path: str, extension: str) -> str:
+        pass
+
+
+class DirectoryFileStore(FileStore):
+    """Files under ``root``, fanned out by the first two hex digits of their key."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def location(self, key: str, extension: str = '') -> str:
+        return os.path.join(self.root, key[:2], key + extension)
+
+    def exists(self, key: str, extension: str = '') -> bool:
+        return os.path.exists(self.location(key, extension))
+
+    def _write(self, key: str, path: str, extension: str) -> str:
+        target = self.location(key, extension)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # A rename when the partial directory is on the same file system
+        shutil.move(path, target)
+        return target
+
+
+class GridFSFileStore(FileStore):
+    """Files in MongoDB GridFS, streamed in chunks from disk."""
+
+    def __init__(self, db, bucket_name: str = 'documents'):
+        self.bucket = GridFSBucket(db, bucket_name=bucket_name)
+        self.files = db[f"{bucket_name}.files"]
+
+    def location(self, key: str, extension: str = '') -> str:
+        return f"gridfs:{key}"
+
+    def exists(self, key: str, extension: str = '') -> bool:
+        return self.files.count_documents({'_id': key}, limit=1) > 0
+
+    def _write(self, key: str, path: str, extension: str) -> str:
+        with open(path, 'rb') as file:
+            self.bucket.upload_from_stream_with_id(key, key + extension, file)
+        os.remove(path)
+        return self.location(key, extension)
+
+
+def get_file_store(db) -> FileStore:
+    """The configured store for downloaded documents."""
+    if Config.FILE_STORE == 'gridfs':
+        return GridFSFileStore(db)
+    return DirectoryFileStore(Config.FILE_DIR)
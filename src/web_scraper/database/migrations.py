@@ -0,0 +1,59 @@
+import logging
+from typing import Dict, List, Tuple, Union
+
+from pymongo import ASCENDING, IndexModel
+
+from web_scraper.database.client import DatabaseClient
+
+logger = logging.getLogger(__name__)
+
+IndexKeys = Union[str, List[Tuple[str, int]]]
+
+# Every index the application relies on, by collection. `scrape migrate`
+# creates them; the crawl itself no longer touches indexes.
+INDEXES: Dict[str, List[Tuple[IndexKeys, Dict]]] = {
+    'pages': [
+        ('url', {'unique': True}),
+        ([('site_id', 1), ('updated_at', 1)], {}),
+    ],
+    'headings': [
+        ('page_id', {}),
+        ('parent_id', {}),
+    ],
+    'files': [
+        ('page_id', {}),
+        ('url', {}),
+    ],
+    'downloads': [
+        ('url', {'unique': True}),
+        ('content_key', {}),
+    ],
+    'links': [
+        ('page_id', {}),
+    ],
+    'frontier': [
+        ([('site_id', 1), ('url', 1)], {'unique': True}),
+        ([('site_id', 1), ('state', 1), ('shard', 1), ('priority', 1), ('depth', 1), ('_id', 1)], {}),
+        ([('site_id', 1), ('state', 1), ('priority', 1), ('depth', 1), ('_id', 1)], {}),
+    ],
+}
+
+
+def _index_model(keys: IndexKeys, options: Dict) -> IndexModel:
+    if isinstance(keys, str):
+        keys = [(keys, ASCENDING)]
+    return IndexModel(keys, **options)
+
+
+def ensure_indexes(db=None) -> Dict[str, List[str]]:
+    """Create missing indexes, returns the index names per collection.
+
+    Safe to run any number of times, existing indexes are left alone.
+    """
+    db = db if db is not None else DatabaseClient().db
+    created = {}
+    for collection, indexes in INDEXES.items():
+        models = [_index_model(keys, options) for keys, options in indexes]
+        created[collection] = db[collection].create_indexes(models)
+        logger.info(f"{collection}: {', '.join(created[collection])}")
+    return created
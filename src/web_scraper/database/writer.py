@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import time
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from web_scraper.config.config import Config
+from web_scraper.crawler.retry import backoff_delay
+from web_scraper.crawler.stats import CrawlStats
+from web_scraper.database.client import save_page_bundles
+from web_scraper.entity.records import FileRecord, HeadingRecord, LinkRecord
+
+logger = logging.getLogger(__name__)
+
+_CLOSE = object()
+
+
+class PageWriter:
+    """Write-behind persistence stage for crawled pages.
+
+    Pages are queued with their headings, links and files and flushed in
+    batches of ``batch_size`` or every ``flush_interval`` seconds, whichever
+    comes first. Flushes run in a worker thread so pymongo never blocks the
+    event loop. The queue is bounded: when the database falls behind,
+    submit() waits, which slows the crawl down instead of growing memory.
+
+    A batch that fails as a whole is written again up to ``attempts``
+    times. Pages that still could not be written are reported by sync(),
+    so callers never take them for saved.
+    """
+
+    def __init__(self,
+                 batch_size: int = Config.WRITE_BATCH_SIZE,
+                 flush_interval: float = Config.WRITE_FLUSH_INTERVAL,
+                 max_queue: int = Config.WRITE_QUEUE_SIZE,
+                 write_mode: str = Config.WRITE_MODE,
+                 flush: Optional[Callable[[List[Dict]], Dict]] = None,
+                 stats: Optional[CrawlStats] = None,
+                 on_flushed: Optional[Callable[[List[Dict]], Any]] = None,
+                 attempts: int = Config.WRITE_ATTEMPTS,
+                 retry_delay: float = Config.WRITE_RETRY_DELAY):
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.flush = flush or partial(save_page_bundles, write_mode=write_mode)
+        self.pages_written = 0
+        self.writes_avoided = 0
+        self.batches_written = 0
+        self.pages_failed = 0
+        self.attempts = max(1, attempts)
+        self.retry_delay = retry_delay
+        self.stats = stats
+        # Called in a worker thread with the pages of every batch saved, e.g. to update the search index
+        self.on_flushed = on_flushed
+        # URLs whose writes failed since the last sync()
+        self._failed: Set[str] = set()
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def submit(self, page: Dict, headings: List[HeadingRecord], links: List[LinkRecord],
+                     files: List[FileRecord]):
+        await self._queue.put({
+            'page': page,
+            'headings': headings,
+            'links': links,
+            'files': files
+        })
+
+    async def submit_update(self, url: str, fields: Dict):
+        """Queue a field update for a page that is already stored."""
+        await self._queue.put({'url': url, 'set': fields})
+
+    async def sync(self) -> Set[str]:
+        """Wait until everything submitted so far has been written.
+
+        Returns the URLs whose writes failed since the previous sync(): their
+        pages are not stored, or only partly, and have to be crawled again.
+        """
+        barrier = asyncio.get_running_loop().create_future()
+        await self._queue.put(barrier)
+        return await barrier
+
+    def _take_failed(self) -> Set[str]:
+        failed, self._failed = self._failed, set()
+        return failed
+
+    async def close(self):
+        """Flush everything still queued and stop the writer."""
+        if self._task is None:
+            return
+        await self._queue.put(_CLOSE)
+        await self._task
+        self._task = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def _run(self):
+        while True:
+            item = await self._queue.get()
+            if item is _CLOSE:
+                return
+            if isinstance(item, asyncio.Future):
+                item.set_result(self._take_failed())
+                continue
+
+            batch = [item]
+            barrier = None
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _CLOSE or isinstance(item, asyncio.Future):
+                    barrier = item
+                    break
+                batch.append(item)
+
+            await self._flush(batch)
+            if barrier is _CLOSE:
+                return
+            if barrier is not None:
+                barrier.set_result(self._take_failed())
+
+    async def _flush(self, batch: List[Dict]):
+        started = time.perf_counter()
+        result = None
+        for attempt in range(1, self.attempts + 1):
+            try:
+                result = await asyncio.to_thread(self.flush, batch)
+                break
+            except Exception as e:
+                if attempt == self.attempts:
+                    logger.error(f"Failed to save batch of {len(batch)} pages after {attempt} attempts: {str(e)}")
+                    break
+                delay = backoff_delay(attempt, base=self.retry_delay)
+                logger.warning(f"Failed to save batch of {len(batch)} pages, retrying in {delay:.1f}s: {str(e)}")
+                await asyncio.sleep(delay)
+        if self.stats:
+            self.stats.observe('db_write', time.perf_counter() - started)
+
+        if result is None:
+            failed = {_bundle_url(bundle) for bundle in batch}
+        else:
+            failed = set(result.get('failed', ()))
+            self.pages_written += result['pages']
+            self.writes_avoided += result['writes_avoided']
+            self.batches_written += 1
+        if failed:
+            self._failed |= failed
+            self.pages_failed += len(failed)
+            if self.stats:
+                self.stats.incr('write_failed', len(failed))
+
+        saved = [bundle for bundle in batch if 'page' in bundle and bundle['page']['url'] not in failed]
+        if self.on_flushed and saved:
+            try:
+                await asyncio.to_thread(self.on_flushed, saved)
+            except Exception as e:
+                logger.error(f"Failed to process saved batch of {len(saved)} pages: {str(e)}")
+
+
+def _bundle_url(bundle: Dict) -> str:
+    return bundle['page']['url'] if 'page' in bundle else bundle['url']
@@ -68,7 +68,26 @@ class Page(BaseModel):
     status_code: int
     content_html: Optional[str] = None
     content_text: Optional[str] = None
+    # sha256 keys of the content in the blob store, the fields above are then empty
+    content_html_ref: Optional[str] = None
+    content_text_ref: Optional[str] = None
     checksum: Optional[str] = None
+    # Hash of the normalized main content and its SimHash (signed 64-bit)
+    fingerprint: Optional[str] = None
+    simhash: Optional[int] = None
+    duplicate_of: Optional[str] = None
+    # HTTP validators of the last full download, used for conditional re-crawls
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    max_age: Optional[int] = None
+    fetched_at: Optional[datetime] = None
+    # Change history: every download or revalidation is a check
+    checks: int = 0
+    changes: int = 0
+    first_checked_at: Optional[datetime] = None
+    last_checked_at: Optional[datetime] = None
+    last_changed_at: Optional[datetime] = None
+    change_rate: Optional[float] = None  # estimated changes per day
     created_at: datetime = datetime.now()
     updated_at: datetime = datetime.now()
     error: Optional[str] = None
@@ -0,0 +1,49 @@
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from web_scraper.entity.models import Page
+from web_scraper.entity.records import FileRecord, HeadingRecord, LinkRecord
+from web_scraper.extraction.base import Extraction
+
+
+@dataclass
+class PageResult:
+    """Everything produced while processing one fetched page.
+
+    The page is extracted once; headings, links, files and the parsed
+    document are reused by site services and the crawl loop.
+    """
+    page: Page
+    extraction: Optional[Extraction] = None
+    unchanged: bool = False
+    # Answered 304 (or still fresh): nothing was downloaded or parsed and the
+    # stored links stand in for the extracted ones
+    not_modified: bool = False
+    stored_links: List[LinkRecord] = field(default_factory=list)
+    # URL of the page this one is a near duplicate of
+    duplicate_of: Optional[str] = None
+    # The error was transient and the page is worth another try
+    retryable: bool = False
+    retry_after: Optional[float] = None
+    # False when no request was sent for the page, e.g. it was still fresh
+    requested: bool = True
+
+    @property
+    def url(self) -> str:
+        return self.page.url
+
+    @property
+    def error(self) -> Optional[str]:
+        return self.page.error
+
+    @property
+    def headings(self) -> List[HeadingRecord]:
+        return self.extraction.headings if self.extraction else []
+
+    @property
+    def links(self) -> List[LinkRecord]:
+        return self.extraction.links if self.extraction else self.stored_links
+
+    @property
+    def files(self) -> List[FileRecord]:
+        return self.extraction.files if self.extraction else []
@@ -0,0 +1,44 @@
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+
+class Record:
+    """Slotted record, lighter than a dict or a Pydantic model per item."""
+    __slots__ = ()
+
+    def to_document(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def as_tuple(self) -> Tuple:
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+
+@dataclass
+class HeadingRecord(Record):
+    __slots__ = ('tag', 'title', 'text', 'text_html', 'anchor', 'level', 'checksum', 'parent_id')
+    tag: str
+    title: str
+    text: str
+    text_html: str
+    anchor: str
+    level: int
+    checksum: str
+    # Checksum of the parent heading until it is saved, then its _id
+    parent_id: Optional[str]
+
+
+@dataclass
+class LinkRecord(Record):
+    __slots__ = ('url', 'title', 'href')
+    url: str
+    title: str
+    href: str
+
+
+@dataclass
+class FileRecord(Record):
+    __slots__ = ('url', 'title', 'file_name', 'file_extension')
+    url: str
+    title: str
+    file_name: str
+    file_extension: str
@@ -0,0 +1,13 @@
+from .corpus import export_site, heading_tree, iter_corpus, read_watermark
+from .writers import JsonlWriter, ParquetWriter
+from web_scraper.config.choices import EXPORT_FORMATS
+
+__all__ = [
+    'EXPORT_FORMATS',
+    'JsonlWriter',
+    'ParquetWriter',
+    'export_site',
+    'heading_tree',
+    'iter_corpus',
+    'read_watermark'
+]
@@ -0,0 +1,171 @@
+import json
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional
+
+from pymongo import ASCENDING, ReadPreference
+
+from web_scraper.config.config import Config
+from web_scraper.database.blob_store import get_blob_store
+from web_scraper.database.client import CONTENT_FIELDS, DatabaseClient
+from web_scraper.export.writers import EXTENSIONS, open_writer
+
+logger = logging.getLogger(__name__)
+
+PAGE_FIELDS = (
+    'url', 'site_id', 'status_code', 'checksum', 'fetched_at', 'created_at', 'updated_at',
+    *CONTENT_FIELDS, *(f'{field}_ref' for field in CONTENT_FIELDS)
+)
+HEADING_FIELDS = ('page_id', 'parent_id', 'tag', 'level', 'title', 'text', 'anchor')
+
+
+def heading_tree(headings: List[Dict]) -> List[Dict]:
+    """Headings of a page parents first, each with its parent id and the titles above it."""
+    by_id = {heading['_id']: heading for heading in headings}
+    children = defaultdict(list)
+    for heading in headings:
+        parent_id = heading.get('parent_id')
+        children[parent_id if parent_id in by_id else None].append(heading)
+
+    ordered = []
+    # Depth first from the roots, iterative so deep trees can't hit the recursion limit
+    stack = [(heading, []) for heading in reversed(children[None])]
+    while stack:
+        heading, path = stack.pop()
+        ordered.append({
+            'id': str(heading['_id']),
+            'parent_id': str(heading['parent_id']) if heading.get('parent_id') in by_id else None,
+            'tag': heading.get('tag'),
+            'level': heading.get('level'),
+            'title': heading.get('title'),
+            'text': heading.get('text'),
+            'anchor': heading.get('anchor'),
+            'path': path
+        })
+        child_path = path + [heading.get('title')]
+        stack.extend((child, child_path) for child in reversed(children[heading['_id']]))
+    return ordered
+
+
+def iter_corpus(db, site_id: str, since: Optional[datetime] = None, until: Optional[datetime] = None,
+                batch_size: int = Config.EXPORT_BATCH_SIZE, include_html: bool = False,
+                include_links: bool = True) -> Iterator[Dict]:
+    """Pages of a site saved in (since, until], with content, heading tree and links.
+
+    Reads ``batch_size`` pages at a time and their headings, links and
+    content blobs with one query each, so memory depends on the batch,
+    not on the corpus. Reads go to a secondary when there is one, away
+    from the primary taking the crawl writes.
+    """
+    read = dict(read_preference=ReadPreference.SECONDARY_PREFERRED)
+    pages = db.pages.with_options(**read)
+    headings = db.headings.with_options(**read)
+    links = db.links.with_options(**read)
+    store = get_blob_store(db)
+    content_fields = CONTENT_FIELDS if include_html else ('content_text',)
+
+    query = {'site_id': site_id, 'duplicate_of': None, 'error': None}
+    if since or until:
+        query['updated_at'] = {}
+        if since:
+            query['updated_at']['$gt'] = since
+        if until:
+            query['updated_at']['$lte'] = until
+    projection = [field for field in PAGE_FIELDS if not field.startswith('content_html') or include_html]
+    cursor = pages.find(query, projection).sort([('updated_at', ASCENDING), ('_id', ASCENDING)])
+    cursor = cursor.batch_size(batch_size)
+
+    batch = []
+    for page in cursor:
+        batch.append(page)
+        if len(batch) >= batch_size:
+            yield from _join_batch(batch, headings, links if include_links else None, store, content_fields)
+            batch = []
+    if batch:
+        yield from _join_batch(batch, headings, links if include_links else None, store, content_fields)
+
+
+def _join_batch(batch: List[Dict], headings, links, store, content_fields) -> Iterator[Dict]:
+    page_ids = [page['_id'] for page in batch]
+    headings_by_page = defaultdict(list)
+    for heading in headings.find({'page_id': {'$in': page_ids}}, HEADING_FIELDS).sort('_id', ASCENDING):
+        headings_by_page[heading['page_id']].append(heading)
+    links_by_page = defaultdict(list)
+    if links is not None:
+        projection = {'_id': 0, 'page_id': 1, 'url': 1, 'title': 1, 'href': 1}
+        for link in links.find({'page_id': {'$in': page_ids}}, projection).sort('_id', ASCENDING):
+            links_by_page[link.pop('page_id')].append(link)
+
+    blobs = {}
+    if store is not None:
+        keys = {page.get(f'{field}_ref') for page in batch for field in content_fields} - {None}
+        blobs = store.get_many(keys) if keys else {}
+
+    for page in batch:
+        record = {field: page.get(field) for field in PAGE_FIELDS if not field.startswith('content_')}
+        for field in CONTENT_FIELDS:
+            record[field] = None
+        for field in content_fields:
+            # Inline content of pages saved before the blob store, else the blob
+            record[field] = page.get(field) or blobs.get(page.get(f'{field}_ref'))
+        record['headings'] = heading_tree(headings_by_page[page['_id']])
+        record['links'] = links_by_page[page['_id']]
+        yield record
+
+
+def _watermark_path(output_dir: str, site_id: str) -> str:
+    return os.path.join(output_dir, f".watermark-{site_id}.json")
+
+
+def read_watermark(output_dir: str, site_id: str) -> Optional[datetime]:
+    try:
+        with open(_watermark_path(output_dir, site_id)) as file:
+            return datetime.fromisoformat(json.load(file)['updated_at'])
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def write_watermark(output_dir: str, site_id: str, watermark: datetime, pages: int, path: Optional[str]):
+    watermark_path = _watermark_path(output_dir, site_id)
+    with open(watermark_path + '.tmp', 'w') as file:
+        json.dump({'updated_at': watermark.isoformat(), 'pages': pages, 'path': path}, file, indent=2)
+    os.replace(watermark_path + '.tmp', watermark_path)
+
+
+def export_site(site_id: str, output_dir: str = Config.EXPORT_DIR, output_format: str = 'jsonl',
+                full: bool = False, include_html: bool = False, include_links: bool = True) -> Dict:
+    """Export the pages of a site saved since the last export into a new file in output_dir.
+
+    The watermark (the newest updated_at covered) is kept in output_dir and
+    only moves once the file is complete; a page saved again later is in a
+    later file too, so consumers keep the last record per URL.
+    """
+    db = DatabaseClient().db
+    os.makedirs(output_dir, exist_ok=True)
+    since = None if full else read_watermark(output_dir, site_id)
+    until = datetime.now() - timedelta(seconds=Config.EXPORT_SETTLE_SECONDS)
+    if since and since >= until:
+        return {'site_id': site_id, 'pages': 0, 'path': None, 'since': since, 'until': since}
+
+    path = os.path.join(output_dir, f"{site_id}-{until:%Y%m%dT%H%M%S}{EXTENSIONS[output_format]}")
+    # Named .partial until complete, an interrupted export leaves no file that looks finished
+    writer = open_writer(output_format, path + '.partial')
+    pages = 0
+    try:
+        for record in iter_corpus(db, site_id, since, until, include_html=include_html,
+                                  include_links=include_links):
+            writer.write(record)
+            pages += 1
+    finally:
+        writer.close()
+
+    if pages:
+        os.replace(path + '.partial', path)
+    else:
+        os.remove(path + '.partial')
+        path = None
+    write_watermark(output_dir, site_id, until, pages, path)
+    logger.info(f"Exported {pages} pages of {site_id} to {path}")
+    return {'site_id': site_id, 'pages': pages, 'path': path, 'since': since, 'until': until}
@@ -0,0 +1,109 @@
+import gzip
+import json
+from datetime import datetime
+from typing import Dict, List
+
+from bson import ObjectId
+
+from web_scraper.config.config import Config
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Parquet export is not available, JSONL is
+    pyarrow = None
+
+EXTENSIONS = {'jsonl': '.jsonl.gz', 'parquet': '.parquet'}
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class JsonlWriter:
+    """One JSON document per line, gzip compressed."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = gzip.open(path, 'wt', encoding='utf-8')
+
+    def write(self, record: Dict):
+        self._file.write(json.dumps(record, default=_json_default, ensure_ascii=False))
+        self._file.write('\n')
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetWriter:
+    """Records as Parquet, buffered into row groups of ``row_group_size`` pages."""
+
+    def __init__(self, path: str, row_group_size: int = Config.EXPORT_ROW_GROUP_SIZE):
+        if pyarrow is None:
+            raise RuntimeError('Parquet export needs pyarrow, install it with poetry install -E parquet')
+        self.path = path
+        self.row_group_size = row_group_size
+        self._rows: List[Dict] = []
+        self._writer = None
+
+    @staticmethod
+    def schema():
+        heading = pyarrow.struct([
+            ('id', pyarrow.string()),
+            ('parent_id', pyarrow.string()),
+            ('tag', pyarrow.string()),
+            ('level', pyarrow.int32()),
+            ('title', pyarrow.string()),
+            ('text', pyarrow.string()),
+            ('anchor', pyarrow.string()),
+            ('path', pyarrow.list_(pyarrow.string()))
+        ])
+        link = pyarrow.struct([
+            ('url', pyarrow.string()),
+            ('title', pyarrow.string()),
+            ('href', pyarrow.string())
+        ])
+        return pyarrow.schema([
+            ('url', pyarrow.string()),
+            ('site_id', pyarrow.string()),
+            ('status_code', pyarrow.int32()),
+            ('checksum', pyarrow.string()),
+            ('fetched_at', pyarrow.timestamp('us')),
+            ('created_at', pyarrow.timestamp('us')),
+            ('updated_at', pyarrow.timestamp('us')),
+            ('content_text', pyarrow.string()),
+            ('content_html', pyarrow.string()),
+            ('headings', pyarrow.list_(heading)),
+            ('links', pyarrow.list_(link))
+        ])
+
+    def write(self, record: Dict):
+        self._rows.append(record)
+        if len(self._rows) >= self.row_group_size:
+            self._flush()
+
+    def _flush(self):
+        if not self._rows:
+            return
+        schema = self.schema()
+        if self._writer is None:
+            self._writer = pyarrow.parquet.ParquetWriter(self.path, schema, compression='zstd')
+        self._writer.write_table(pyarrow.Table.from_pylist(self._rows, schema=schema))
+        self._rows = []
+
+    def close(self):
+        self._flush()
+        if self._writer is None:
+            # No pages: still a valid, empty file
+            self._writer = pyarrow.parquet.ParquetWriter(self.path, self.schema(), compression='zstd')
+        self._writer.close()
+
+
+def open_writer(output_format: str, path: str):
+    if output_format == 'parquet':
+        return ParquetWriter(path)
+    return JsonlWriter(path)
@@ -0,0 +1,25 @@
+from .base import Extraction, ExtractionEngine
+from .bs4_engine import BeautifulSoupEngine
+from .lxml_engine import LxmlEngine
+from .dom_engine import DomEngine
+
+ENGINES = {
+    'bs4': BeautifulSoupEngine,
+    'lxml': LxmlEngine,
+    'dom': DomEngine
+}
+
+
+def get_engine(name: str, **kwargs) -> ExtractionEngine:
+    return ENGINES[name](**kwargs)
+
+
+__all__ = [
+    'ENGINES',
+    'Extraction',
+    'ExtractionEngine',
+    'BeautifulSoupEngine',
+    'LxmlEngine',
+    'DomEngine',
+    'get_engine'
+]
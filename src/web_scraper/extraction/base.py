@@ -0,0 +1,147 @@
+import os
+from abc import ABCMeta, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import urljoin
+
+from web_scraper.config.config import Config
+from web_scraper.entity.records import FileRecord, HeadingRecord, LinkRecord
+from web_scraper.utils.helpers import generate_checksum
+
+HEADING_TAGS = ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']
+
+
+@dataclass
+class Extraction:
+    """Headings, links, files and text pulled out of one page by an engine."""
+    engine: 'ExtractionEngine'
+    html: str
+    text: Optional[str] = None
+    headings: List[HeadingRecord] = field(default_factory=list)
+    links: List[LinkRecord] = field(default_factory=list)
+    files: List[FileRecord] = field(default_factory=list)
+    main_text: Optional[str] = None
+    _document: Any = None
+
+    @property
+    def document(self) -> Any:
+        # Engines working on the live DOM never parse the HTML, so the
+        # document is only built when a site service asks for it
+        if self._document is None:
+            self._document = self.engine.parse(self.html)
+        return self._document
+
+    def select_text(self, selector: str, exclude: Sequence[str] = (), separator: str = ' ') -> Optional[str]:
+        return self.engine.document_engine.select_text(self.document, selector, exclude, separator)
+
+    def select_all_text(self, selector: str) -> List[str]:
+        return self.engine.document_engine.select_all_text(self.document, selector)
+
+
+def build_headings(raw_headings: Iterable[Tuple[str, str, str]]) -> List[HeadingRecord]:
+    """Turn (tag, text, outer html) triples in document order into the heading hierarchy."""
+    headings = []
+    stack = []  # To track heading hierarchy
+
+    for tag, heading_text, heading_html in raw_headings:
+        if not heading_text:
+            continue
+
+        level = int(tag[1])
+
+        # Pop stack until we find parent heading
+        while stack and stack[-1].level >= level:
+            stack.pop()
+
+        parent_id = stack[-1].checksum if stack else None
+
+        heading_data = HeadingRecord(
+            tag=tag,
+            title=heading_text,
+            text=heading_text,
+            text_html=heading_html,
+            anchor=heading_html,
+            level=level,
+            checksum=generate_checksum(heading_html),
+            parent_id=parent_id
+        )
+
+        headings.append(heading_data)
+        stack.append(heading_data)
+
+    return headings
+
+
+def build_links(raw_links: Iterable[Tuple[str, str]], base_url: str
+                ) -> Tuple[List[LinkRecord], List[FileRecord]]:
+    """Split (href, text) pairs in document order into page links and file links."""
+    links = []
+    files = []
+
+    for href, title in raw_links:
+        href = href.strip()
+        if not href or href.startswith(('javascript:', 'mailto:', 'tel:')):
+            continue
+
+        absolute_url = urljoin(base_url, href)
+
+        # Check if it's a file link
+        file_ext = os.path.splitext(absolute_url)[1].lower()
+        if file_ext in Config.FILE_EXTENSIONS:
+            files.append(FileRecord(
+                url=absolute_url,
+                title=title,
+                file_name=os.path.basename(absolute_url),
+                file_extension=file_ext
+            ))
+        else:
+            links.append(LinkRecord(url=absolute_url, title=title, href=href))
+
+    return links, files
+
+
+class ExtractionEngine(metaclass=ABCMeta):
+    """Extracts headings, links and text from a page.
+
+    Heading and link lists must be identical across engines for the same
+    document: headings keep document order, their text is the stripped text
+    nodes joined without a separator, and the main text is the stripped text
+    nodes of ``content_selector`` (minus ``content_exclude``) joined by a space.
+    """
+    name: str = ''
+
+    def __init__(self, content_selector: Optional[str] = None, content_exclude: Sequence[str] = ()):
+        self.content_selector = content_selector
+        self.content_exclude = list(content_exclude)
+
+    @property
+    def document_engine(self) -> 'ExtractionEngine':
+        # Engine able to query the object returned by parse()
+        return self
+
+    @abstractmethod
+    def parse(self, html: str) -> Any:
+        pass
+
+    @abstractmethod
+    def extract(self, html: str, base_url: str, text: Optional[str] = None) -> Extraction:
+        pass
+
+    @abstractmethod
+    def select_text(self, document: Any, selector: str, exclude: Sequence[str] = (),
+                    separator: str = ' ') -> Optional[str]:
+        pass
+
+    @abstractmethod
+    def select_all_text(self, document: Any, selector: str) -> List[str]:
+        pass
+
+    async def extract_from_page(self, page, base_url: str) -> Extraction:
+        content = await page.content()
+        body_text = await page.inner_text('body')
+        return self.extract(content, base_url, text=body_text)
+
+    def _main_text(self, document: Any) -> Optional[str]:
+        if not self.content_selector:
+            return None
+        return self.select_text(document, self.content_selector, self.content_exclude)
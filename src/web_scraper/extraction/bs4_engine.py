@@ -0,0 +1,64 @@
+import copy
+from typing import List, Optional, Sequence
+
+from bs4 import BeautifulSoup
+
+from web_scraper.extraction.base import (
+    Extraction, ExtractionEngine, HEADING_TAGS, build_headings, build_links
+)
+
+
+class BeautifulSoupEngine(ExtractionEngine):
+    name = 'bs4'
+
+    def __init__(self, parser: str = 'html.parser', **kwargs):
+        super().__init__(**kwargs)
+        self.parser = parser
+
+    def parse(self, html: str) -> BeautifulSoup:
+        return BeautifulSoup(html, self.parser)
+
+    def extract(self, html: str, base_url: str, text: Optional[str] = None) -> Extraction:
+        soup = self.parse(html)
+
+        headings = build_headings(
+            (heading.name, heading.get_text(strip=True), str(heading))
+            for heading in soup.find_all(HEADING_TAGS)
+        )
+        links, files = build_links(
+            ((a['href'], a.get_text(strip=True)) for a in soup.find_all('a', href=True)),
+            base_url
+        )
+
+        if text is None:
+            body = soup.body or soup
+            text = body.get_text(' ', strip=True)
+
+        return Extraction(
+            engine=self,
+            html=html,
+            text=text,
+            headings=headings,
+            links=links,
+            files=files,
+            main_text=self._main_text(soup),
+            _document=soup
+        )
+
+    def select_text(self, document: BeautifulSoup, selector: str, exclude: Sequence[str] = (),
+                    separator: str = ' ') -> Optional[str]:
+        element = document.select_one(selector)
+        if element is None:
+            return None
+
+        if exclude:
+            # Work on a copy, the document is shared with the site services
+            element = copy.copy(element)
+            for excluded in element.select(', '.join(exclude)):
+                if not excluded.decomposed:
+                    excluded.decompose()
+
+        return element.get_text(separator, strip=True)
+
+    def select_all_text(self, document: BeautifulSoup, selector: str) -> List[str]:
+        return [element.get_text(strip=True) for element in document.select(selector)]
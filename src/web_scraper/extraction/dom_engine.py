@@ -0,0 +1,106 @@
+from typing import Any, List, Optional, Sequence
+
+from web_scraper.extraction.base import Extraction, ExtractionEngine, build_headings, build_links
+from web_scraper.extraction.bs4_engine import BeautifulSoupEngine
+
+# Runs inside the page and returns everything we need in a single round trip.
+# Text is collected the same way the static engines do it: stripped text
+# nodes outside script/style/template, joined by the given separator.
+EXTRACT_SCRIPT = """
+({contentSelector, contentExclude}) => {
+    const skipped = new Set(['SCRIPT', 'STYLE', 'TEMPLATE']);
+    const textOf = (root, separator) => {
+        const parts = [];
+        const walker = document.createTreeWalker(root, NodeFilter.SHOW_TEXT);
+        let node;
+        while ((node = walker.nextNode())) {
+            if (node.parentElement && skipped.has(node.parentElement.tagName)) {
+                continue;
+            }
+            const text = node.nodeValue.trim();
+            if (text) {
+                parts.push(text);
+            }
+        }
+        return parts.join(separator);
+    };
+
+    let mainText = null;
+    if (contentSelector) {
+        const content = document.querySelector(contentSelector);
+        if (content) {
+            const clone = content.cloneNode(true);
+            if (contentExclude.length) {
+                clone.querySelectorAll(contentExclude.join(', ')).forEach(el => el.remove());
+            }
+            mainText = textOf(clone, ' ');
+        }
+    }
+
+    let html = document.doctype ? new XMLSerializer().serializeToString(document.doctype) : '';
+    if (document.documentElement) {
+        html += document.documentElement.outerHTML;
+    }
+
+    return {
+        html: html,
+        text: document.body ? document.body.innerText : '',
+        headings: Array.from(document.querySelectorAll('h1, h2, h3, h4, h5, h6')).map(h => [
+            h.tagName.toLowerCase(), textOf(h, ''), h.outerHTML
+        ]),
+        links: Array.from(document.querySelectorAll('a[href]')).map(a => [
+            a.getAttribute('href'), textOf(a, '')
+        ]),
+        mainText: mainText
+    };
+}
+"""
+
+
+class DomEngine(ExtractionEngine):
+    """Extracts straight from the live browser DOM with one page.evaluate call.
+
+    Replaces the separate page.content() and page.inner_text('body') calls.
+    When only HTML is available (no live page) it falls back to a static
+    engine, which is also used to query the document for site services.
+    """
+    name = 'dom'
+
+    def __init__(self, fallback: Optional[ExtractionEngine] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.fallback = fallback or BeautifulSoupEngine(**kwargs)
+
+    @property
+    def document_engine(self) -> ExtractionEngine:
+        return self.fallback
+
+    def parse(self, html: str) -> Any:
+        return self.fallback.parse(html)
+
+    def extract(self, html: str, base_url: str, text: Optional[str] = None) -> Extraction:
+        return self.fallback.extract(html, base_url, text=text)
+
+    async def extract_from_page(self, page, base_url: str) -> Extraction:
+        data = await page.evaluate(EXTRACT_SCRIPT, {
+            'contentSelector': self.content_selector,
+            'contentExclude': self.content_exclude
+        })
+
+        links, files = build_links(data['links'], base_url)
+
+        return Extraction(
+            engine=self,
+            html=data['html'],
+            text=data['text'],
+            headings=build_headings(data['headings']),
+            links=links,
+            files=files,
+            main_text=data['mainText']
+        )
+
+    def select_text(self, document: Any, selector: str, exclude: Sequence[str] = (),
+                    separator: str = ' ') -> Optional[str]:
+        return self.fallback.select_text(document, selector, exclude, separator)
+
+    def select_all_text(self, document: Any, selector: str) -> List[str]:
+        return self.fallback.select_all_text(document, selector)
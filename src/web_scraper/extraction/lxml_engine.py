@@ -0,0 +1,82 @@
+import copy
+from typing import List, Optional, Sequence
+
+import lxml.html
+from lxml import etree
+
+from web_scraper.extraction.base import (
+    Extraction, ExtractionEngine, HEADING_TAGS, build_headings, build_links
+)
+
+# Same text nodes BeautifulSoup's get_text() returns: comments, script, style
+# and template contents are skipped
+_TEXT_NODES = etree.XPath(
+    './/text()[not(parent::script) and not(parent::style) and not(ancestor::template)]'
+)
+_HEADINGS = etree.XPath(' | '.join(f'//{tag}' for tag in HEADING_TAGS))
+_LINKS = etree.XPath('//a[@href]')
+
+
+def _text(element, separator: str = '') -> str:
+    return separator.join(
+        stripped for stripped in (node.strip() for node in _TEXT_NODES(element)) if stripped
+    )
+
+
+class LxmlEngine(ExtractionEngine):
+    name = 'lxml'
+
+    def parse(self, html: str) -> lxml.html.HtmlElement:
+        if not html or not html.strip():
+            return lxml.html.document_fromstring('<html></html>')
+        try:
+            return lxml.html.document_fromstring(html)
+        except ValueError:
+            # Unicode strings with an XML encoding declaration are rejected
+            return lxml.html.document_fromstring(html.encode('utf-8'))
+
+    def extract(self, html: str, base_url: str, text: Optional[str] = None) -> Extraction:
+        document = self.parse(html)
+
+        headings = build_headings(
+            (element.tag, _text(element),
+             lxml.html.tostring(element, encoding='unicode', with_tail=False))
+            for element in _HEADINGS(document)
+        )
+        links, files = build_links(
+            ((a.get('href'), _text(a)) for a in _LINKS(document)),
+            base_url
+        )
+
+        if text is None:
+            body = document.find('body')
+            text = _text(body if body is not None else document, ' ')
+
+        return Extraction(
+            engine=self,
+            html=html,
+            text=text,
+            headings=headings,
+            links=links,
+            files=files,
+            main_text=self._main_text(document),
+            _document=document
+        )
+
+    def select_text(self, document: lxml.html.HtmlElement, selector: str, exclude: Sequence[str] = (),
+                    separator: str = ' ') -> Optional[str]:
+        matches = document.cssselect(selector)
+        if not matches:
+            return None
+
+        element = matches[0]
+        if exclude:
+            element = copy.deepcopy(element)
+            for excluded in element.cssselect(', '.join(exclude)):
+                # drop_tree() keeps the tail text, unlike getparent().remove()
+                excluded.drop_tree()
+
+        return _text(element, separator)
+
+    def select_all_text(self, document: lxml.html.HtmlElement, selector: str) -> List[str]:
+        return [_text(element) for element in document.cssselect(selector)]
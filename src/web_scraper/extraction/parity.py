@@ -0,0 +1,76 @@
+import time
+from typing import Dict, List, Optional, Sequence
+
+from web_scraper.entity.records import Record
+from web_scraper.extraction.base import Extraction, ExtractionEngine
+
+
+def _heading_tree(extraction: Extraction) -> List[tuple]:
+    # Markup (text_html, anchor, checksum) is serialized differently by every
+    # parser, so parents are compared by position rather than by checksum
+    positions = {}
+    tree = []
+    for index, heading in enumerate(extraction.headings):
+        parent = positions.get(heading.parent_id) if heading.parent_id else None
+        tree.append((heading.tag, heading.title, heading.level, parent))
+        positions[heading.checksum] = index
+    return tree
+
+
+def _link_list(items: List[Record]) -> List[tuple]:
+    return [item.as_tuple() for item in items]
+
+
+def compare_extractions(reference: Extraction, other: Extraction) -> List[str]:
+    """Describe every difference between two extractions of the same page."""
+    differences = []
+
+    for label, expected, actual in (
+        ('headings', _heading_tree(reference), _heading_tree(other)),
+        ('links', _link_list(reference.links), _link_list(other.links)),
+        ('files', _link_list(reference.files), _link_list(other.files)),
+    ):
+        if len(expected) != len(actual):
+            differences.append(f"{label}: expected {len(expected)} items, got {len(actual)}")
+        for index, (left, right) in enumerate(zip(expected, actual)):
+            if left != right:
+                differences.append(f"{label}[{index}]: expected {left}, got {right}")
+                break
+
+    if reference.main_text != other.main_text:
+        differences.append("main_text differs")
+
+    return differences
+
+
+async def check_parity(engines: Sequence[ExtractionEngine], html: str, base_url: str,
+                       page=None, repeat: int = 1) -> Dict[str, Dict]:
+    """Run every engine over the same page and compare them to the first one.
+
+    Engines extracting from the live DOM need ``page``, a Playwright page
+    that already has ``html`` loaded. Returns per engine the list of
+    differences and the average extraction time in milliseconds.
+    """
+    report = {}
+    reference: Optional[Extraction] = None
+
+    for engine in engines:
+        started = time.perf_counter()
+        for _ in range(max(1, repeat)):
+            if page is not None:
+                extraction = await engine.extract_from_page(page, base_url)
+            else:
+                extraction = engine.extract(html, base_url)
+        elapsed_ms = (time.perf_counter() - started) * 1000 / max(1, repeat)
+
+        if reference is None:
+            reference = extraction
+
+        report[engine.name] = {
+            'differences': compare_extractions(reference, extraction),
+            'headings': len(extraction.headings),
+            'links': len(extraction.links),
+            'time_ms': elapsed_ms
+        }
+
+    return report
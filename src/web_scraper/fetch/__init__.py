@@ -0,0 +1,21 @@
+from .base import Fetcher, FetchResult, looks_like_js_shell
+from .browser_pool import BrowserPool, ResourcePolicy
+from .browser_fetcher import BrowserFetcher
+from .downloader import DownloadError, FileDownloader
+from .http_fetcher import HttpFetcher
+from .hybrid_fetcher import HybridFetcher
+from web_scraper.config.choices import FETCH_MODES
+
+__all__ = [
+    'FETCH_MODES',
+    'Fetcher',
+    'FetchResult',
+    'BrowserPool',
+    'BrowserFetcher',
+    'DownloadError',
+    'FileDownloader',
+    'HttpFetcher',
+    'HybridFetcher',
+    'ResourcePolicy',
+    'looks_like_js_shell'
+]
@@ -0,0 +1,74 @@
+import re
+from abc import ABCMeta, abstractmethod
+from contextlib import nullcontext
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from web_scraper.config.config import Config
+from web_scraper.crawler.stats import CrawlStats
+from web_scraper.extraction.base import Extraction
+
+_INVISIBLE = re.compile(r'<(script|style|noscript|template)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+_TAGS = re.compile(r'<[^>]+>')
+_WHITESPACE = re.compile(r'\s+')
+_APP_ROOT = re.compile(
+    r'<div[^>]+id=["\'](root|app|__next|__nuxt)["\'][^>]*>\s*</div>', re.IGNORECASE
+)
+_NOSCRIPT_WARNING = re.compile(r'<noscript\b[^>]*>[^<]*(enable|requires?)\s+javascript', re.IGNORECASE)
+
+# Stats of the crawl running in the current task and the tasks it started,
+# so a fetcher shared by concurrent crawls times each into its own stats
+_crawl_stats: ContextVar[Optional[CrawlStats]] = ContextVar('crawl_stats', default=None)
+
+
+@dataclass
+class FetchResult:
+    url: str
+    final_url: str
+    status_code: int
+    html: str
+    headers: Dict[str, str] = field(default_factory=dict)
+    # Set by fetchers that extract straight from a live DOM
+    extraction: Optional[Extraction] = None
+    fetcher: str = ''
+
+
+class Fetcher(metaclass=ABCMeta):
+    name: str = ''
+    # Set by the crawl to time the stages of a fetch
+    stats: Optional[CrawlStats] = None
+
+    def instrument(self, stats: CrawlStats, shared: bool = False):
+        """Time fetch stages into stats, only for the calling task and the tasks it starts when shared."""
+        if not shared:
+            self.stats = stats
+        _crawl_stats.set(stats)
+
+    def _time(self, stage: str):
+        stats = _crawl_stats.get() or self.stats
+        return stats.time(stage) if stats else nullcontext()
+
+    async def start(self):
+        return self
+
+    async def close(self):
+        pass
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    @abstractmethod
+    async def fetch(self, url: str, headers: Optional[Dict[str, str]] = None) -> FetchResult:
+        pass
+
+
+def looks_like_js_shell(html: str, min_text_length: int = Config.JS_SHELL_MIN_TEXT) -> bool:
+    """Guess whether server HTML is an empty shell that needs JavaScript to render."""
+    if _APP_ROOT.search(html) or _NOSCRIPT_WARNING.search(html):
+        return True
+    text = _WHITESPACE.sub(' ', _TAGS.sub(' ', _INVISIBLE.sub(' ', html))).strip()
+    return len(text) < min_text_length
@@ -0,0 +1,93 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+from playwright.async_api import async_playwright
+
+from web_scraper.config.config import Config
+from web_scraper.extraction.base import ExtractionEngine
+from web_scraper.fetch.base import Fetcher, FetchResult
+from web_scraper.fetch.browser_pool import BrowserPool, ResourcePolicy
+
+
+class BrowserFetcher(Fetcher):
+    """Renders pages in Chromium through a BrowserPool.
+
+    The browser is launched on the first fetch, so crawls that never need
+    JavaScript never pay for it. Extraction runs while the page is still
+    open, which lets DOM based engines read the live document.
+    """
+    name = 'browser'
+
+    def __init__(self, engine: ExtractionEngine, visible: bool = False, size: int = 1,
+                 policy: Optional[ResourcePolicy] = None, timeout: int = Config.REQUEST_TIMEOUT):
+        self.engine = engine
+        self.visible = visible
+        self.size = size
+        self.policy = policy
+        self.timeout = timeout
+        self.playwright = None
+        self.browser = None
+        self.pool: Optional[BrowserPool] = None
+        self._lock = asyncio.Lock()
+
+    async def start(self):
+        async with self._lock:
+            if self.browser is None:
+                self.playwright = await async_playwright().start()
+                self.browser = await self.playwright.chromium.launch(
+                    headless=not self.visible,
+                    args=['--no-sandbox']
+                )
+                self.pool = BrowserPool(self.browser, size=self.size, policy=self.policy)
+        return self
+
+    async def close(self):
+        if self.pool:
+            await self.pool.close()
+            self.pool = None
+        if self.browser:
+            await self.browser.close()
+            self.browser = None
+        if self.playwright:
+            await self.playwright.stop()
+            self.playwright = None
+
+    @asynccontextmanager
+    async def page(self):
+        await self.start()
+        async with self.pool.page() as page:
+            yield page
+
+    async def fetch(self, url: str, headers: Optional[Dict[str, str]] = None) -> FetchResult:
+        async with self.page() as page:
+            if headers:
+                # Conditional headers can't go on the navigation itself, they
+                # would leak to every sub-request, so revalidate with a HEAD first
+                with self._time('revalidate'):
+                    probe = await page.request.head(url, headers=headers, timeout=self.timeout)
+                if probe.status == 304:
+                    return FetchResult(
+                        url=url,
+                        final_url=probe.url,
+                        status_code=304,
+                        html='',
+                        headers=probe.headers,
+                        fetcher=self.name
+                    )
+
+            with self._time('goto'):
+                response = await page.goto(url, timeout=self.timeout)
+            # page.content() plus extraction, from the live DOM for the dom engine
+            with self._time('render'):
+                extraction = await self.engine.extract_from_page(page, url)
+
+            return FetchResult(
+                url=url,
+                final_url=page.url,
+                status_code=response.status if response else 0,
+                html=extraction.html,
+                headers=response.headers if response else {},
+                extraction=extraction,
+                fetcher=self.name
+            )
@@ -0,0 +1,115 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence
+from urllib.parse import urlparse
+
+from web_scraper.config.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def _host_matches(host: str, domains: Sequence[str]) -> bool:
+    return any(host == domain or host.endswith('.' + domain) for domain in domains)
+
+
+@dataclass
+class ResourcePolicy:
+    """Decides which sub-requests a page may load.
+
+    Hosts match themselves and all of their subdomains. Main frame
+    navigations are always allowed.
+    """
+    first_party_hosts: Sequence[str]
+    blocked_resource_types: Sequence[str] = field(default_factory=lambda: list(Config.BLOCKED_RESOURCE_TYPES))
+    allowed_hosts: Sequence[str] = ()
+    blocked_hosts: Sequence[str] = field(default_factory=lambda: list(Config.BLOCKED_HOSTS))
+    block_third_party: bool = True
+
+    def allows(self, url: str, resource_type: str) -> bool:
+        host = (urlparse(url).hostname or '').lower()
+        if not host:
+            # data:, blob: and friends never hit the network
+            return resource_type not in self.blocked_resource_types
+        if _host_matches(host, self.blocked_hosts):
+            return False
+        if resource_type in self.blocked_resource_types:
+            return False
+        if self.block_third_party:
+            return _host_matches(host, self.first_party_hosts) or _host_matches(host, self.allowed_hosts)
+        return True
+
+
+class _Slot:
+    __slots__ = ('context', 'page', 'uses')
+
+    def __init__(self, context, page):
+        self.context = context
+        self.page = page
+        self.uses = 0
+
+
+class BrowserPool:
+    """Reusable browser contexts, one open page each.
+
+    At most ``size`` pages are in use at once. Contexts are created lazily
+    and replaced after ``recycle_after`` pages, or straight away when a page
+    failed, so cookies, caches and leaked memory don't pile up.
+    """
+
+    def __init__(self, browser, size: int = 1, recycle_after: int = Config.BROWSER_RECYCLE_AFTER,
+                 policy: Optional[ResourcePolicy] = None):
+        self.browser = browser
+        self.size = max(1, size)
+        self.recycle_after = recycle_after
+        self.policy = policy
+        self.blocked_requests = 0
+        self._semaphore = asyncio.Semaphore(self.size)
+        self._idle: List[_Slot] = []
+
+    @asynccontextmanager
+    async def page(self):
+        async with self._semaphore:
+            slot = self._idle.pop() if self._idle else await self._new_slot()
+            failed = True
+            try:
+                yield slot.page
+                failed = False
+            finally:
+                slot.uses += 1
+                if failed or slot.uses >= self.recycle_after or slot.page.is_closed():
+                    await self._close_slot(slot)
+                else:
+                    self._idle.append(slot)
+
+    async def close(self):
+        while self._idle:
+            await self._close_slot(self._idle.pop())
+
+    async def _new_slot(self) -> _Slot:
+        context = await self.browser.new_context()
+        if self.policy is not None:
+            await context.route('**/*', self._route)
+        page = await context.new_page()
+        return _Slot(context, page)
+
+    async def _close_slot(self, slot: _Slot):
+        try:
+            await slot.context.close()
+        except Exception as e:
+            logger.debug(f"Failed to close browser context: {str(e)}")
+
+    async def _route(self, route):
+        request = route.request
+        try:
+            is_main_frame_navigation = (request.is_navigation_request()
+                                        and request.frame.parent_frame is None)
+        except Exception:
+            is_main_frame_navigation = False
+
+        if is_main_frame_navigation or self.policy.allows(request.url, request.resource_type):
+            await route.continue_()
+        else:
+            self.blocked_requests += 1
+            await route.abort()
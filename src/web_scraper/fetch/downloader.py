@@ -0,0 +1,272 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+from urllib.parse import urlparse
+
+import httpx
+
+from web_scraper.config.config import Config
+from web_scraper.crawler.politeness import HostScheduler
+from web_scraper.crawler.stats import CrawlStats
+from web_scraper.database.client import DatabaseClient, get_download, save_download
+from web_scraper.database.file_store import FileStore, get_file_store
+from web_scraper.fetch.validators import conditional_headers, response_validators
+
+logger = logging.getLogger(__name__)
+
+
+class DownloadError(Exception):
+    def __init__(self, message: str, status_code: int = 0):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _hash_file(path: str, chunk_size: int = Config.DOWNLOAD_CHUNK_SIZE):
+    """sha256 state of the bytes already on disk, to continue a resumed download."""
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            hasher.update(chunk)
+    return hasher
+
+
+def _write_chunks(file, hasher, chunks: List[bytes]):
+    data = b''.join(chunks)
+    file.write(data)
+    hasher.update(data)
+
+
+def _retryable(status_code: int) -> bool:
+    # 0 is a dropped connection or timeout, resumed from the partial file
+    return status_code == 0 or status_code >= 500 or status_code in (408, 416, 429)
+
+
+class FileDownloader:
+    """Downloads linked documents next to the crawl, with its own workers.
+
+    Files are streamed in ``chunk_size`` pieces to a partial file and
+    hashed on the way, so memory stays flat whatever their size; every
+    ``write_size`` bytes are written and hashed in a worker thread, so a
+    slow disk doesn't hold up the event loop. A
+    download that breaks off resumes from the partial file with a Range
+    request, also in a later run. Each URL is fetched once per run and
+    revalidated with ETag/Last-Modified afterwards; finished files go to
+    the file store under their sha256, so the same document is stored once.
+    """
+
+    def __init__(self, store: Optional[FileStore] = None,
+                 concurrency: int = Config.DOWNLOAD_CONCURRENCY,
+                 max_bytes: int = Config.DOWNLOAD_MAX_BYTES,
+                 chunk_size: int = Config.DOWNLOAD_CHUNK_SIZE,
+                 write_size: int = Config.DOWNLOAD_WRITE_SIZE,
+                 attempts: int = Config.DOWNLOAD_ATTEMPTS,
+                 partial_dir: str = Config.DOWNLOAD_PARTIAL_DIR,
+                 scheduler: Optional[HostScheduler] = None,
+                 stats: Optional[CrawlStats] = None,
+                 force: bool = False):
+        self.store = store
+        self.concurrency = max(1, concurrency)
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.write_size = write_size
+        self.attempts = max(1, attempts)
+        self.partial_dir = partial_dir
+        self.scheduler = scheduler
+        self.stats = stats or CrawlStats()
+        self.force = force
+        self.client: Optional[httpx.AsyncClient] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers = []
+        self._queued: Set[str] = set()
+
+    async def start(self):
+        if self.store is None:
+            self.store = get_file_store(DatabaseClient().db)
+        os.makedirs(self.partial_dir, exist_ok=True)
+        self.client = httpx.AsyncClient(
+            follow_redirects=True,
+            timeout=Config.HTTP_TIMEOUT,
+            limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+            # Byte ranges refer to the stored bytes, not to a compressed transfer
+            headers={'User-Agent': Config.USER_AGENT, 'Accept-Encoding': 'identity'}
+        )
+        self._queue = asyncio.Queue(maxsize=Config.DOWNLOAD_QUEUE_SIZE)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        return self
+
+    async def submit(self, url: str):
+        """Queue url unless it was queued before, waits while the queue is full."""
+        if url in self._queued:
+            return
+        self._queued.add(url)
+        await self._queue.put(url)
+
+    async def close(self, drain: bool = True):
+        """Stop the workers, after the queued files are downloaded unless drain is False.
+
+        Downloads cut short keep their partial file and resume next time.
+        """
+        if self._queue is not None and drain:
+            await self._queue.join()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close(drain=exc_type is None)
+
+    async def _worker(self):
+        while True:
+            url = await self._queue.get()
+            try:
+                await self.download(url)
+            except Exception as e:
+                logger.error(f"Failed to download {url}: {str(e) or type(e).__name__}")
+            finally:
+                self._queue.task_done()
+
+    def partial_path(self, url: str) -> str:
+        return os.path.join(self.partial_dir, hashlib.sha1(url.encode('utf-8')).hexdigest() + '.part')
+
+    def _discard_partial(self, url: str):
+        try:
+            os.remove(self.partial_path(url))
+        except OSError:
+            pass
+
+    async def download(self, url: str) -> str:
+        """Download url, returns 'downloaded', 'unchanged', 'disallowed' or 'failed'."""
+        if self.scheduler and not await self.scheduler.can_fetch(url):
+            self.stats.incr('files_disallowed')
+            return 'disallowed'
+
+        known = await asyncio.to_thread(get_download, url)
+        for attempt in range(1, self.attempts + 1):
+            try:
+                with self.stats.time('download'):
+                    outcome = await self._download_once(url, known)
+                self.stats.incr(f"files_{outcome}")
+                return outcome
+            except (httpx.HTTPError, DownloadError) as e:
+                error = str(e) or type(e).__name__
+                status_code = getattr(e, 'status_code', 0)
+                if isinstance(e, httpx.HTTPError) and self.scheduler:
+                    # Responses were recorded as they came in, this is a failed connection
+                    self.scheduler.record(url, 0, 0.0)
+                if status_code in (413, 416):
+                    # Too large, or a partial file the server can't continue: start over
+                    self._discard_partial(url)
+                if attempt == self.attempts or not _retryable(status_code):
+                    break
+                logger.info(f"Download of {url} interrupted ({error}), attempt {attempt + 1}")
+                known = await asyncio.to_thread(get_download, url)
+
+        if os.path.exists(self.partial_path(url)):
+            state = 'partial'
+        else:
+            # A failed revalidation leaves the stored file as it is
+            state = 'done' if known and known.get('state') == 'done' else 'failed'
+        await asyncio.to_thread(save_download, url, {
+            'state': state,
+            'status_code': status_code,
+            'error': error,
+            'checked_at': datetime.now()
+        })
+        logger.error(f"Failed to download {url}: {error}")
+        self.stats.incr('files_failed')
+        return 'failed'
+
+    def _request_headers(self, known: Optional[Dict], offset: int) -> Dict[str, str]:
+        if known and known.get('state') == 'done' and not self.force:
+            return conditional_headers(known)
+        validator = known and known.get('state') == 'partial' and (known.get('etag') or known.get('last_modified'))
+        if offset and validator:
+            # If-Range: the rest of the file if it is still the same, else all of it
+            return {'Range': f'bytes={offset}-', 'If-Range': validator}
+        return {}
+
+    async def _download_once(self, url: str, known: Optional[Dict]) -> str:
+        path = self.partial_path(url)
+        offset = os.path.getsize(path) if os.path.exists(path) else 0
+        headers = self._request_headers(known, offset)
+
+        if self.scheduler:
+            await self.scheduler.acquire(url)
+        started = time.monotonic()
+        async with self.client.stream('GET', url, headers=headers) as response:
+            if self.scheduler:
+                self.scheduler.record(url, response.status_code, time.monotonic() - started,
+                                      response.headers.get('retry-after'))
+            if response.status_code == 304:
+                await asyncio.to_thread(save_download, url, {'checked_at': datetime.now()})
+                return 'unchanged'
+            if response.status_code == 206 and 'Range' in headers:
+                mode, hasher = 'ab', await asyncio.to_thread(_hash_file, path, self.chunk_size)
+                self.stats.incr('files_resumed')
+            elif response.status_code == 200:
+                mode, hasher, offset = 'wb', hashlib.sha256(), 0
+            else:
+                raise DownloadError(f"HTTP {response.status_code}", response.status_code)
+
+            length = response.headers.get('content-length')
+            total = offset + int(length) if length and length.isdigit() else None
+            if total and total > self.max_bytes:
+                raise DownloadError(f"{total} bytes, more than DOWNLOAD_MAX_BYTES", 413)
+            validators = response_validators(response.headers)
+            # Recorded before the body, so an interrupted download can resume
+            await asyncio.to_thread(save_download, url, {
+                'state': 'partial', 'etag': validators['etag'], 'last_modified': validators['last_modified']
+            })
+
+            size = offset
+            chunks: List[bytes] = []
+            buffered = 0
+            with open(path, mode) as file:
+                try:
+                    async for chunk in response.aiter_raw(self.chunk_size):
+                        size += len(chunk)
+                        if size > self.max_bytes:
+                            raise DownloadError(f"More than {self.max_bytes} bytes", 413)
+                        chunks.append(chunk)
+                        buffered += len(chunk)
+                        if buffered >= self.write_size:
+                            await asyncio.to_thread(_write_chunks, file, hasher, chunks)
+                            chunks, buffered = [], 0
+                finally:
+                    # Also when the transfer breaks off, a retry resumes after these bytes
+                    await asyncio.to_thread(_write_chunks, file, hasher, chunks)
+            content_type = response.headers.get('content-type', '').split(';')[0].strip() or None
+            status_code = response.status_code
+
+        key = hasher.hexdigest()
+        extension = os.path.splitext(urlparse(url).path)[1].lower()
+        location, new = await asyncio.to_thread(self.store.put, key, path, extension)
+        if not new:
+            self.stats.incr('files_deduplicated')
+        self.stats.incr('file_bytes', size - offset)
+        await asyncio.to_thread(save_download, url, {
+            'state': 'done',
+            'content_key': key,
+            'location': location,
+            'size': size,
+            'content_type': content_type,
+            'status_code': status_code,
+            'etag': validators['etag'],
+            'last_modified': validators['last_modified'],
+            'error': None,
+            'downloaded_at': datetime.now(),
+            'checked_at': datetime.now()
+        })
+        logger.info(f"Downloaded {url} ({size} bytes{', already stored' if not new else ''})")
+        return 'downloaded'
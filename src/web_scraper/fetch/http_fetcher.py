@@ -0,0 +1,54 @@
+from typing import Dict, Optional
+
+import httpx
+
+from web_scraper.config.config import Config
+from web_scraper.fetch.base import Fetcher, FetchResult
+
+
+class HttpFetcher(Fetcher):
+    """Plain HTTP fetches over a pooled keep-alive client.
+
+    httpx negotiates gzip/deflate (and brotli when installed) and
+    decompresses transparently.
+    """
+    name = 'http'
+
+    def __init__(self, max_connections: int = Config.HTTP_MAX_CONNECTIONS,
+                 timeout: float = Config.HTTP_TIMEOUT, user_agent: str = Config.USER_AGENT):
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.user_agent = user_agent
+        self.client: Optional[httpx.AsyncClient] = None
+
+    async def start(self):
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                follow_redirects=True,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                ),
+                headers={'User-Agent': self.user_agent}
+            )
+        return self
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    async def fetch(self, url: str, headers: Optional[Dict[str, str]] = None,
+                    method: str = 'GET') -> FetchResult:
+        await self.start()
+        with self._time('http'):
+            response = await self.client.request(method, url, headers=headers)
+        return FetchResult(
+            url=url,
+            final_url=str(response.url),
+            status_code=response.status_code,
+            html=response.text,
+            headers=dict(response.headers),
+            fetcher=self.name
+        )
@@ -0,0 +1,56 @@
+import logging
+from typing import Callable, Dict, Optional
+
+from web_scraper.fetch.base import Fetcher, FetchResult, looks_like_js_shell
+from web_scraper.fetch.browser_fetcher import BrowserFetcher
+from web_scraper.fetch.http_fetcher import HttpFetcher
+
+logger = logging.getLogger(__name__)
+
+# Statuses bot protection answers plain HTTP clients with
+_BROWSER_RETRY_STATUSES = (401, 403)
+
+
+class HybridFetcher(Fetcher):
+    """HTTP first, Playwright only where it is needed.
+
+    URLs for which ``needs_js`` returns True go straight to the browser.
+    Everything else is fetched over HTTP and re-rendered in the browser only
+    when the response looks like an empty JavaScript shell or was refused.
+    """
+    name = 'auto'
+
+    def __init__(self, http: HttpFetcher, browser: BrowserFetcher,
+                 needs_js: Callable[[str], bool] = lambda url: False,
+                 is_shell: Callable[[str], bool] = looks_like_js_shell):
+        self.http = http
+        self.browser = browser
+        self.needs_js = needs_js
+        self.is_shell = is_shell
+        self.browser_fallbacks = 0
+
+    def instrument(self, stats, shared=False):
+        super().instrument(stats, shared)
+        self.http.instrument(stats, shared)
+        self.browser.instrument(stats, shared)
+
+    async def start(self):
+        await self.http.start()
+        return self
+
+    async def close(self):
+        await self.http.close()
+        await self.browser.close()
+
+    async def fetch(self, url: str, headers: Optional[Dict[str, str]] = None) -> FetchResult:
+        if self.needs_js(url):
+            return await self.browser.fetch(url, headers)
+
+        result = await self.http.fetch(url, headers)
+        if result.status_code in _BROWSER_RETRY_STATUSES or (
+                result.status_code == 200 and self.is_shell(result.html)):
+            logger.info(f"Falling back to browser for {url} (status {result.status_code})")
+            self.browser_fallbacks += 1
+            return await self.browser.fetch(url, headers)
+
+        return result
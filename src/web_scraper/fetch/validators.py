@@ -0,0 +1,55 @@
+import re
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+_MAX_AGE = re.compile(r'(?:^|,)\s*(?:s-)?max-age\s*=\s*"?(\d+)', re.IGNORECASE)
+_NO_CACHE = re.compile(r'(?:^|,)\s*(no-cache|no-store)\b', re.IGNORECASE)
+# Response header each stored validator comes from
+_VALIDATOR_HEADERS = {'etag': 'etag', 'last_modified': 'last-modified', 'max_age': 'cache-control'}
+
+
+def response_validators(headers: Dict[str, str]) -> Dict:
+    """ETag, Last-Modified and Cache-Control max-age of a response."""
+    headers = {key.lower(): value for key, value in (headers or {}).items()}
+
+    max_age = None
+    cache_control = headers.get('cache-control', '')
+    if not _NO_CACHE.search(cache_control):
+        match = _MAX_AGE.search(cache_control)
+        if match:
+            max_age = int(match.group(1))
+
+    return {
+        'etag': headers.get('etag'),
+        'last_modified': headers.get('last-modified'),
+        'max_age': max_age
+    }
+
+
+def revalidated_validators(headers: Dict[str, str]) -> Dict:
+    """The validators a 304 response updates; those it leaves out stay as stored."""
+    present = {key.lower() for key in (headers or {})}
+    return {
+        field: value for field, value in response_validators(headers).items()
+        if _VALIDATOR_HEADERS[field] in present
+    }
+
+
+def conditional_headers(page: Optional[Dict]) -> Dict[str, str]:
+    """If-None-Match / If-Modified-Since headers for a stored page."""
+    headers = {}
+    if not page:
+        return headers
+    if page.get('etag'):
+        headers['If-None-Match'] = page['etag']
+    if page.get('last_modified'):
+        headers['If-Modified-Since'] = page['last_modified']
+    return headers
+
+
+def is_fresh(page: Optional[Dict], now: Optional[datetime] = None) -> bool:
+    """Whether a stored page is still within its Cache-Control max-age."""
+    if not page or not page.get('max_age') or not page.get('fetched_at'):
+        return False
+    now = now or datetime.now()
+    return now < page['fetched_at'] + timedelta(seconds=page['max_age'])
@@ -0,0 +1,9 @@
+from .index import SearchHit, SearchIndex, record_tree, section_anchor, split_sections
+
+__all__ = [
+    'SearchHit',
+    'SearchIndex',
+    'record_tree',
+    'section_anchor',
+    'split_sections'
+]
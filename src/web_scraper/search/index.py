@@ -0,0 +1,284 @@
+import logging
+import re
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from web_scraper.config.config import Config
+from web_scraper.entity.records import HeadingRecord
+from web_scraper.export.corpus import iter_corpus
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sections (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL,
+    site_id TEXT,
+    position INTEGER,
+    title TEXT,
+    path TEXT,
+    level INTEGER,
+    anchor TEXT,
+    body TEXT
+);
+CREATE INDEX IF NOT EXISTS sections_url ON sections (url);
+CREATE VIRTUAL TABLE IF NOT EXISTS sections_fts USING fts5(
+    title, path, body,
+    content = 'sections', content_rowid = 'id',
+    tokenize = 'porter unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS sections_insert AFTER INSERT ON sections BEGIN
+    INSERT INTO sections_fts (rowid, title, path, body) VALUES (new.id, new.title, new.path, new.body);
+END;
+CREATE TRIGGER IF NOT EXISTS sections_delete AFTER DELETE ON sections BEGIN
+    INSERT INTO sections_fts (sections_fts, rowid, title, path, body)
+    VALUES ('delete', old.id, old.title, old.path, old.body);
+END;
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    site_id TEXT,
+    checksum TEXT,
+    indexed_at TEXT
+);
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Column weights for bm25(): a hit in a heading counts more than one in the text
+TITLE_WEIGHT = 10.0
+PATH_WEIGHT = 4.0
+BODY_WEIGHT = 1.0
+
+_ELEMENT_ID = re.compile(r'(?<![\w-])id\s*=\s*["\']([^"\']+)["\']')
+
+
+class SearchHit(NamedTuple):
+    url: str
+    anchor: Optional[str]
+    title: str
+    path: str
+    snippet: str
+    score: float
+
+    @property
+    def link(self) -> str:
+        return f"{self.url}#{self.anchor}" if self.anchor else self.url
+
+
+def section_anchor(heading_html: Optional[str]) -> Optional[str]:
+    """Fragment id of a heading from its markup, e.g. the mw-headline span of MediaWiki."""
+    match = _ELEMENT_ID.search(heading_html or '')
+    return match.group(1) if match else None
+
+
+@lru_cache(maxsize=4096)
+def _title_pattern(title: str):
+    # Heading text is joined without separators, page text with spaces
+    return re.compile(r'\s*'.join(map(re.escape, ''.join(title.split()))))
+
+
+def split_sections(text: str, headings: List[Dict]) -> List[Dict]:
+    """Cut the page text at its headings, given in document order.
+
+    Returns the text before the first heading (if any) and one section per
+    heading. A heading not found in the text keeps an empty body, so its
+    title is still searchable.
+    """
+    text = text or ''
+    found, position = [], 0
+    for heading in headings:
+        match = _title_pattern(heading['title']).search(text, position) if heading.get('title') else None
+        found.append(match)
+        if match:
+            position = match.end()
+
+    sections = []
+    starts = [match.start() for match in found if match] + [len(text)]
+    intro = text[:starts[0]].strip()
+    if intro:
+        sections.append({'title': '', 'path': '', 'level': 0, 'anchor': None, 'body': intro})
+    following = 1
+    for heading, match in zip(headings, found):
+        body = ''
+        if match:
+            body = text[match.end():starts[following]].strip()
+            following += 1
+        sections.append({
+            'title': heading.get('title') or '',
+            'path': ' > '.join(title for title in heading.get('path', []) if title),
+            'level': heading.get('level') or 0,
+            'anchor': section_anchor(heading.get('anchor')),
+            'body': body
+        })
+    return sections
+
+
+def record_tree(headings: List[HeadingRecord]) -> List[Dict]:
+    """Headings straight from extraction, with the titles above each one as path."""
+    paths = {}
+    tree = []
+    for heading in headings:
+        path = paths.get(heading.parent_id, []) if heading.parent_id else []
+        paths[heading.checksum] = path + [heading.title]
+        tree.append({'title': heading.title, 'level': heading.level, 'anchor': heading.anchor, 'path': path})
+    return tree
+
+
+def _match_expression(query: str) -> str:
+    # Every word must match, as a phrase so FTS5 operators in user input are plain text
+    return ' '.join('"{}"'.format(word.replace('"', '""')) for word in query.split())
+
+
+class SearchIndex:
+    """Full-text index of page sections in SQLite FTS5.
+
+    Pages are split into sections at their headings; every section keeps
+    the heading titles above it and its anchor, so hits link straight to
+    the section. Pages are re-indexed only when their checksum changed.
+    Usable from the writer thread and the event loop alike.
+    """
+
+    def __init__(self, path: str = Config.SEARCH_INDEX):
+        self.path = path
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _open(self) -> sqlite3.Connection:
+        if self._connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            # Searches keep working while a crawl writes
+            connection.execute('PRAGMA journal_mode = WAL')
+            connection.executescript(SCHEMA)
+            self._connection = connection
+        return self._connection
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def update(self, documents: Iterable[Dict], force: bool = False) -> int:
+        """Index pages: dicts with url, site_id, checksum, content_text and headings (title, level,
+        anchor, path) in document order. Pages without content are removed. Returns the pages indexed.
+        """
+        indexed = 0
+        now = datetime.now().isoformat()
+        with self._lock:
+            connection = self._open()
+            with connection:
+                for document in documents:
+                    url = document['url']
+                    if not document.get('content_text') and not document.get('headings'):
+                        self._remove(connection, url)
+                        continue
+                    row = connection.execute('SELECT checksum FROM pages WHERE url = ?', (url,)).fetchone()
+                    if row and not force and document.get('checksum') and row[0] == document['checksum']:
+                        continue
+                    connection.execute('DELETE FROM sections WHERE url = ?', (url,))
+                    connection.executemany(
+                        'INSERT INTO sections (url, site_id, position, title, path, level, anchor, body) '
+                        'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                        [
+                            (url, document.get('site_id'), position, section['title'], section['path'],
+                             section['level'], section['anchor'], section['body'])
+                            for position, section in enumerate(
+                                split_sections(document.get('content_text'), document.get('headings', []))
+                            )
+                        ]
+                    )
+                    connection.execute(
+                        'INSERT OR REPLACE INTO pages (url, site_id, checksum, indexed_at) VALUES (?, ?, ?, ?)',
+                        (url, document.get('site_id'), document.get('checksum'), now)
+                    )
+                    indexed += 1
+        return indexed
+
+    @staticmethod
+    def _remove(connection: sqlite3.Connection, url: str):
+        connection.execute('DELETE FROM sections WHERE url = ?', (url,))
+        connection.execute('DELETE FROM pages WHERE url = ?', (url,))
+
+    def index_bundles(self, bundles: List[Dict]) -> int:
+        """Index pages just saved by the PageWriter, see save_page_bundles."""
+        documents = []
+        for bundle in bundles:
+            if 'page' not in bundle:
+                continue
+            page = bundle['page']
+            duplicate = bool(page.get('duplicate_of'))
+            documents.append({
+                'url': page['url'],
+                'site_id': page.get('site_id'),
+                'checksum': page.get('checksum'),
+                'content_text': None if duplicate else page.get('content_text'),
+                'headings': [] if duplicate else record_tree(bundle['headings'])
+            })
+        return self.update(documents)
+
+    def sync(self, db, site_id: str, full: bool = False) -> int:
+        """Catch up with pages saved since the last sync, e.g. by crawls that did not index.
+
+        Unchanged pages are skipped by checksum, so this is cheap after a
+        crawl that indexed on save. full re-reads every page of the site.
+        """
+        key = f"synced:{site_id}"
+        since = None if full else self._state(key)
+        until = datetime.now() - timedelta(seconds=Config.EXPORT_SETTLE_SECONDS)
+        indexed = 0
+        batch = []
+        for record in iter_corpus(db, site_id, since=since, until=until, include_links=False):
+            batch.append(record)
+            if len(batch) >= Config.EXPORT_BATCH_SIZE:
+                indexed += self.update(batch, force=full)
+                batch = []
+        indexed += self.update(batch, force=full)
+        self._set_state(key, until.isoformat())
+        return indexed
+
+    def _state(self, key: str) -> Optional[datetime]:
+        with self._lock:
+            row = self._open().execute('SELECT value FROM state WHERE key = ?', (key,)).fetchone()
+        return datetime.fromisoformat(row[0]) if row else None
+
+    def _set_state(self, key: str, value: str):
+        with self._lock:
+            connection = self._open()
+            with connection:
+                connection.execute('INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)', (key, value))
+
+    def search(self, query: str, site_id: Optional[str] = None, limit: int = 10,
+               raw: bool = False) -> List[SearchHit]:
+        """Best matching sections by BM25; raw passes query to FTS5 as is (AND, OR, NEAR, prefix*)."""
+        expression = query if raw else _match_expression(query)
+        if not expression:
+            return []
+        sql = (
+            'SELECT sections.url, sections.anchor, sections.title, sections.path, '
+            "snippet(sections_fts, 2, '[', ']', '...', 16), "
+            'bm25(sections_fts, ?, ?, ?) AS score '
+            'FROM sections_fts JOIN sections ON sections.id = sections_fts.rowid '
+            'WHERE sections_fts MATCH ?'
+        )
+        parameters = [TITLE_WEIGHT, PATH_WEIGHT, BODY_WEIGHT, expression]
+        if site_id:
+            sql += ' AND sections.site_id = ?'
+            parameters.append(site_id)
+        sql += ' ORDER BY score LIMIT ?'
+        parameters.append(limit)
+        with self._lock:
+            rows = self._open().execute(sql, parameters).fetchall()
+        return [SearchHit(*row) for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            connection = self._open()
+            return {
+                'pages': connection.execute('SELECT count(*) FROM pages').fetchone()[0],
+                'sections': connection.execute('SELECT count(*) FROM sections').fetchone()[0]
+            }
@@ -2,4 +2,10 @@ from web_scraper.services.base_scraper_service import BaseScraperService
 from web_scraper.services.eyewiki_service import EyewikiService
 from web_scraper.services.medicalnewstoday_service import MedicalNewsTodayService
 
-__all__ = ['BaseScraperService', 'EyewikiService', 'MedicalNewsTodayService']
\ No newline at end of file
+# Site services by site id
+SERVICES = {
+    'eyewiki': EyewikiService,
+    'medicalnewstoday': MedicalNewsTodayService
+}
+
+__all__ = ['SERVICES', 'BaseScraperService', 'EyewikiService', 'MedicalNewsTodayService']
@@ -1,202 +1,817 @@
 import asyncio
-import hashlib
 import os
+import re
+import time
 from abc import ABCMeta, abstractmethod
 from urllib.parse import urljoin, urlparse
-from bs4 import BeautifulSoup
-from collections import deque
-from typing import List, Dict, Optional, Tuple
+from typing import Any, Callable, List, Dict, Optional, Sequence, Set, Tuple
 import logging
-from playwright.async_api import async_playwright
 from web_scraper.database.client import (
-    save_page, save_headings, save_links, save_files, get_page
+    get_page_links, get_page_meta, get_page_simhashes, get_pages_last_seen, get_pages_meta,
+    get_revisit_candidates
 )
+from web_scraper.database.writer import PageWriter
 from web_scraper.entity.models import Page, PyObjectId
+from web_scraper.entity.page_result import PageResult
 from web_scraper.config.config import Config
+from web_scraper.crawler.checkpoint import CrawlCheckpoint
+from web_scraper.crawler.dedup import (
+    SimHashIndex, content_fingerprint, from_signed64, simhash, to_signed64
+)
+from web_scraper.crawler.distributed import MongoFrontier
+from web_scraper.crawler.frontier import Frontier, FrontierEntry
+from web_scraper.crawler.metrics import MetricsFile, MetricsServer
+from web_scraper.crawler.politeness import HostScheduler, retry_after_seconds
+from web_scraper.crawler.retry import (
+    RETRYABLE_STATUSES, CircuitBreaker, RetryableStatusError, RetryQueue, backoff_delay, is_retryable
+)
+from web_scraper.crawler.revisit import change_history, select_revisits
+from web_scraper.crawler.seen import create_seen_set
+from web_scraper.crawler.sitemap import SitemapReader
+from web_scraper.crawler.stats import CrawlStats
+from web_scraper.extraction import ExtractionEngine, get_engine
+from web_scraper.fetch import (
+    BrowserFetcher, FileDownloader, Fetcher, FetchResult, HttpFetcher, HybridFetcher, ResourcePolicy
+)
+from web_scraper.fetch.validators import (
+    conditional_headers, is_fresh, response_validators, revalidated_validators
+)
+from web_scraper.search import SearchIndex
+from web_scraper.utils.helpers import canonicalize_url, generate_checksum, TRACKING_QUERY_PARAMS
 from datetime import datetime
 
 
 class BaseScraperService(metaclass=ABCMeta):
-    def __init__(self, base_url: str, site_id: str, visible: bool = False):
+    # (path regex, priority) pairs, first match wins; lower priorities are crawled first
+    priority_rules: List[Tuple[str, int]] = []
+    default_priority = 0
+    tracking_params = TRACKING_QUERY_PARAMS
+    # Main article content, used for content_text
+    content_selector: Optional[str] = None
+    content_exclude: Sequence[str] = ()
+    extraction_engine: Optional[str] = None
+    # Request interception, see ResourcePolicy
+    blocked_resource_types: Sequence[str] = Config.BLOCKED_RESOURCE_TYPES
+    allowed_hosts: Sequence[str] = ()
+    blocked_hosts: Sequence[str] = ()
+    block_third_party = True
+    # Pages that only render with JavaScript: the whole site or URL regexes
+    requires_js = False
+    js_url_patterns: List[str] = []
+    # Used by --sitemap, defaults to the Sitemap lines of robots.txt or /sitemap.xml
+    sitemap_urls: List[str] = []
+
+    def __init__(self, base_url: str, site_id: str, visible: bool = False, engine: Optional[str] = None,
+                 fetch_mode: Optional[str] = None, write_mode: Optional[str] = None,
+                 seen_backend: Optional[str] = None, metrics_port: Optional[int] = Config.METRICS_PORT,
+                 metrics_file: Optional[str] = Config.METRICS_FILE, download_files: Optional[bool] = None,
+                 index_search: Optional[bool] = None):
         self.base_url = base_url
         self.site_id = site_id
         self.visible = visible
-        self.visited = set()
-        self.queue = deque([base_url])
+        self.fetch_mode = fetch_mode or Config.FETCH_MODE
+        self.write_mode = write_mode or Config.WRITE_MODE
+        self.seen_backend = seen_backend or Config.SEEN_BACKEND
+        self.metrics_port = metrics_port
+        self.metrics_file = metrics_file
+        # Download linked documents (FILE_EXTENSIONS) next to the crawl
+        self.download_files = Config.DOWNLOAD_FILES if download_files is None else download_files
+        # Keep the `scrape search` index up to date as pages are saved
+        self.index_search = Config.SEARCH_ON_SAVE if index_search is None else index_search
+        self.engine: ExtractionEngine = get_engine(
+            engine or self.extraction_engine or Config.EXTRACTION_ENGINE,
+            content_selector=self.content_selector,
+            content_exclude=self.content_exclude
+        )
+        # Download and store pages even when they are fresh or unchanged
+        self.force = False
+        self.follow_links = True
+        self.crawl_name = site_id
+        self._js_url_patterns = [re.compile(pattern) for pattern in self.js_url_patterns]
+        self._priority_rules = [(re.compile(pattern), priority) for pattern, priority in self.priority_rules]
+        self.frontier = self.create_frontier()
+        self.frontier.push(base_url)
         self.logger = logging.getLogger(f"{__name__}.{self.__class__.__name__}")
-        self.playwright = None
-        self.browser = None
+        self.concurrency = 1
+        self.checkpoint: Optional[CrawlCheckpoint] = None
+        self.stats = CrawlStats(labels={'site': site_id})
+        self.near_duplicates = SimHashIndex(Config.NEAR_DUPLICATE_DISTANCE)
+        self.scheduler = HostScheduler()
+        self.retries = RetryQueue()
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.fetcher: Optional[Fetcher] = None
+        # Owned by someone else when set through use_shared(), not closed after a crawl
+        self._shared_fetcher = False
+        self._shared_scheduler = False
+        self._shared_near_duplicates = False
+        self._shared_search_index = False
+        self.writer: Optional[PageWriter] = None
+        self.downloader: Optional[FileDownloader] = None
+        self.search_index: Optional[SearchIndex] = None
+        self.metrics_server: Optional[MetricsServer] = None
+        self.metrics_writer: Optional[MetricsFile] = None
+        # Stored state of queued URLs, fetched ahead in batches
+        self._page_meta: Dict[str, Optional[Dict]] = {}
 
     @abstractmethod
-    async def process_page_custom(self, url: str) -> Page:
+    async def process_page_custom(self, url: str) -> PageResult:
         pass
 
+    def create_frontier(self, priority: Optional[Callable[[str, int], Any]] = None) -> Frontier:
+        return Frontier(canonicalize=self.canonicalize_url, priority=priority or self.url_priority,
+                        seen=create_seen_set(self.seen_backend))
+
+    def canonicalize_url(self, url: str) -> str:
+        return canonicalize_url(url, self.tracking_params)
+
+    def url_priority(self, url: str, depth: int) -> Tuple[int, int]:
+        path = urlparse(url).path
+        for pattern, priority in self._priority_rules:
+            if pattern.search(path):
+                return priority, depth
+        return self.default_priority, depth
+
     def _generate_checksum(self, content: str) -> str:
-        return hashlib.md5(content.encode()).hexdigest()
-
-    def _extract_headings(self, soup: BeautifulSoup) -> List[Dict]:
-        headings = []
-        stack = []  # To track heading hierarchy
-
-        for heading in soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6']):
-            level = int(heading.name[1])
-            heading_text = heading.get_text(strip=True)
-
-            if heading_text:
-                # Pop stack until we find parent heading
-                while stack and stack[-1]['level'] >= level:
-                    stack.pop()
-
-                parent_id = stack[-1]['checksum'] if stack else None
-
-                heading_data = {
-                    'tag': heading.name,
-                    'title': heading_text,
-                    'text': heading_text,
-                    'text_html': str(heading),
-                    'anchor': str(heading),
-                    'level': level,
-                    'checksum': self._generate_checksum(str(heading)),
-                    'parent_id': parent_id
-                }
-
-                headings.append(heading_data)
-                stack.append(heading_data)
-
-        return headings
-
-    def _extract_links(self, soup: BeautifulSoup, base_url: str) -> Tuple[List[Dict], List[Dict]]:
-        links = []
-        files = []
-
-        for a in soup.find_all('a', href=True):
-            href = a['href'].strip()
-            if not href or href.startswith(('javascript:', 'mailto:', 'tel:')):
-                continue
+        return generate_checksum(content)
+
+    def resource_policy(self) -> ResourcePolicy:
+        host = urlparse(self.base_url).hostname
+        if host.startswith('www.'):
+            host = host[4:]
+        return ResourcePolicy(
+            first_party_hosts=[host],
+            blocked_resource_types=list(self.blocked_resource_types),
+            allowed_hosts=list(self.allowed_hosts),
+            blocked_hosts=[*Config.BLOCKED_HOSTS, *self.blocked_hosts],
+            block_third_party=self.block_third_party
+        )
 
-            absolute_url = urljoin(base_url, href)
-            title = a.get_text(strip=True)
-
-            # Check if it's a file link
-            file_ext = os.path.splitext(absolute_url)[1].lower()
-            if file_ext in Config.FILE_EXTENSIONS:
-                files.append({
-                    'url': absolute_url,
-                    'title': title,
-                    'file_name': os.path.basename(absolute_url),
-                    'file_extension': file_ext
-                })
-            else:
-                links.append({
-                    'url': absolute_url,
-                    'title': title,
-                    'href': href
-                })
+    def needs_js(self, url: str) -> bool:
+        return self.requires_js or any(pattern.search(url) for pattern in self._js_url_patterns)
+
+    def create_browser_fetcher(self) -> BrowserFetcher:
+        return BrowserFetcher(
+            self.engine,
+            visible=self.visible,
+            size=self.concurrency,
+            policy=self.resource_policy()
+        )
 
-        return links, files
+    def use_shared(self, fetcher: Optional[Fetcher] = None, scheduler: Optional[HostScheduler] = None,
+                   near_duplicates: Optional[SimHashIndex] = None, search_index: Optional[SearchIndex] = None):
+        """Crawl with a warm fetcher, host scheduler and indexes kept by the caller, e.g. scrape serve.
+
+        They are left open after the crawl; a shared scheduler also keeps
+        robots.txt rules and rate limits across crawls of the same hosts.
+        A shared near-duplicate index is used as is instead of being loaded
+        from the database.
+        """
+        if fetcher is not None:
+            self.fetcher = fetcher
+            self._shared_fetcher = True
+        if scheduler is not None:
+            self.scheduler = scheduler
+            self._shared_scheduler = True
+        if near_duplicates is not None:
+            self.near_duplicates = near_duplicates
+            self._shared_near_duplicates = True
+        if search_index is not None:
+            self.search_index = search_index
+            self._shared_search_index = True
+
+    def create_fetcher(self) -> Fetcher:
+        if self.fetch_mode == 'browser':
+            return self.create_browser_fetcher()
+        http = HttpFetcher(max_connections=max(self.concurrency, Config.HTTP_MAX_CONNECTIONS))
+        if self.fetch_mode == 'http':
+            return http
+        return HybridFetcher(http, self.create_browser_fetcher(), needs_js=self.needs_js)
+
+    async def load_near_duplicate_index(self):
+        self.near_duplicates = SimHashIndex(Config.NEAR_DUPLICATE_DISTANCE)
+        for page in await asyncio.to_thread(get_page_simhashes, self.site_id):
+            self.near_duplicates.add(page['url'], from_signed64(page['simhash']))
+
+    async def seed_from_sitemaps(self, sitemap_urls: Optional[List[str]] = None) -> int:
+        """Queue sitemap URLs that are new or whose lastmod is newer than the stored page.
+
+        Unchanged URLs are marked seen, so following links won't queue them either.
+        """
+        sitemap_urls = (sitemap_urls or self.sitemap_urls
+                        or await self.scheduler.sitemaps(self.base_url)
+                        or [urljoin(self.base_url, '/sitemap.xml')])
+        queued = skipped = 0
+        async with SitemapReader(before_request=self.scheduler.acquire) as reader:
+            async for batch in reader.batches(sitemap_urls):
+                entries = [
+                    (self.canonicalize_url(entry.url), entry.lastmod)
+                    for entry in batch if self._should_follow_link(entry.url)
+                ]
+                last_seen = await asyncio.to_thread(get_pages_last_seen, [url for url, _ in entries])
+                for url, lastmod in entries:
+                    seen_at = last_seen.get(url)
+                    if not self.force and seen_at and lastmod and lastmod <= seen_at:
+                        self.frontier.mark_seen(url)
+                        skipped += 1
+                    elif self.frontier.push(url, 1):
+                        queued += 1
+                if isinstance(self.frontier, MongoFrontier):
+                    await asyncio.to_thread(self.frontier.flush)
+
+        self.stats.incr('sitemap_queued', queued)
+        self.stats.incr('sitemap_unchanged', skipped)
+        self.logger.info(f"Sitemaps queued {queued} URLs, {skipped} unchanged since the last crawl")
+        return queued
 
     async def __aenter__(self):
-        self.playwright = await async_playwright().start()
-        self.browser = await self.playwright.chromium.launch(
-            headless=not self.visible,
-            args=['--no-sandbox']
-        )
+        if not self._shared_near_duplicates:
+            await self.load_near_duplicate_index()
+        if not self._shared_fetcher:
+            self.fetcher = self.create_fetcher()
+            await self.fetcher.start()
+        # The stats of this run; a shared fetcher times into them for this crawl's tasks only
+        self.fetcher.instrument(self.stats, shared=self._shared_fetcher)
+        self._throttled_before = self.scheduler.throttled
+        if self.index_search and not self._shared_search_index:
+            self.search_index = SearchIndex()
+        self.writer = await PageWriter(
+            write_mode=self.write_mode, stats=self.stats,
+            on_flushed=self.search_index.index_bundles if self.search_index else None
+        ).start()
+        if self.download_files:
+            self.downloader = await FileDownloader(
+                scheduler=self.scheduler, stats=self.stats, force=self.force
+            ).start()
+        # Given a callable, the exporters always show the stats of the current run
+        if self.metrics_port is not None:
+            self.metrics_server = MetricsServer(lambda: self.stats, self.metrics_port).start()
+        if self.metrics_file:
+            self.metrics_writer = MetricsFile(lambda: self.stats, self.metrics_file).start()
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.browser:
-            await self.browser.close()
-        if self.playwright:
-            await self.playwright.stop()
-
-    async def process_page(self, url: str) -> Page:
-        existing_page = get_page(url)
+        if self.writer:
+            # Flush pages still waiting to be written
+            await self.writer.close()
+            self.stats.incr('writes_avoided', self.writer.writes_avoided)
+        if self.search_index and not self._shared_search_index:
+            self.search_index.close()
+            self.search_index = None
+        if self.downloader:
+            # Interrupted crawls leave partial files, `scrape download` resumes them
+            await self.downloader.close(drain=exc_type is None)
+            self.downloader = None
+        if self.fetcher and not self._shared_fetcher:
+            await self.fetcher.close()
+            self.fetcher = None
+        self.stats.incr('throttled', self.scheduler.throttled - self._throttled_before)
+        if not self._shared_scheduler:
+            await self.scheduler.close()
+        if self.metrics_writer:
+            await self.metrics_writer.close()
+            self.metrics_writer = None
+        if self.metrics_server:
+            self.metrics_server.close()
+            self.metrics_server = None
+
+    async def load_page_meta(self, url: str) -> Optional[Dict]:
+        """Stored state of url without its content, see PAGE_META_FIELDS.
+
+        The URLs queued next are looked up in the same query, so most
+        pages find theirs already loaded.
+        """
+        if url in self._page_meta:
+            return self._page_meta.pop(url)
+
+        upcoming = [
+            entry.url for entry in self.frontier.peek(Config.PREFETCH_BATCH_SIZE)
+            if entry.url != url and entry.url not in self._page_meta
+        ]
+        with self.stats.time('db_lookup'):
+            found = await asyncio.to_thread(get_pages_meta, [url, *upcoming])
+        if len(self._page_meta) > 4 * Config.PREFETCH_BATCH_SIZE:
+            # Prefetched for URLs that got pushed back by higher priority ones
+            self._page_meta.clear()
+        for other in upcoming:
+            self._page_meta[other] = found.get(other)
+        return found.get(url)
+
+    async def process_page(self, url: str) -> PageResult:
+        existing_page = await self.load_page_meta(url)
         try:
-            context = await self.browser.new_context()
-            page = await context.new_page()
-
-            response = await page.goto(url, timeout=15000)
-            status_code = response.status if response else 0
-
-            content = await page.content()
-            checksum = self._generate_checksum(content)
+            if not self.force and is_fresh(existing_page):
+                self.logger.info(f"Still fresh, skipping {url}")
+                self.stats.incr('fresh')
+                return await self._not_modified_result(existing_page, requested=False)
+
+            headers = None if self.force else conditional_headers(existing_page)
+            fetched = await self.fetch(url, headers=headers)
+            status_code = fetched.status_code
+            if status_code in RETRYABLE_STATUSES:
+                raise RetryableStatusError(status_code, retry_after_seconds(fetched.headers.get('retry-after')))
+
+            if status_code == 304 and existing_page:
+                self.logger.info(f"Not modified: {url}")
+                self.stats.incr('revalidated')
+                # Fresh again for the max-age of the 304, like a page fetched unchanged
+                await self.writer.submit_update(url, {
+                    **revalidated_validators(fetched.headers),
+                    **change_history(existing_page, False, datetime.now()),
+                    'fetched_at': datetime.now()
+                })
+                return await self._not_modified_result(existing_page)
+
+            if existing_page:
+                self.stats.incr('downloaded')
+
+            # Extracted once here, the crawl loop and site services reuse it
+            extraction = fetched.extraction
+            if extraction is None:
+                with self.stats.time('extract'):
+                    extraction = self.engine.extract(fetched.html, fetched.final_url)
+            checksum = self._generate_checksum(extraction.html)
+            validators = response_validators(fetched.headers)
+            # Raw HTML changes on every load (nonces, ads, timestamps), the
+            # fingerprint only covers the normalized main content
+            main_text = extraction.main_text or extraction.text or ''
+            fingerprint = content_fingerprint(main_text)
 
             # Check if page exists and hasn't changed
-            if existing_page and existing_page.get('checksum') == checksum:
+            unchanged = bool(existing_page) and (existing_page.get('checksum') == checksum
+                                                 or existing_page.get('fingerprint') == fingerprint)
+            history = change_history(existing_page, not unchanged, datetime.now())
+            if unchanged and not self.force:
                 self.logger.info(f"Content unchanged for {url}")
-                await page.close()
-                await context.close()
-                return Page(**existing_page)
-
-            soup = BeautifulSoup(content, 'html.parser')
-            body_text = await page.inner_text('body')
-
-            # Extract all data
-            headings = self._extract_headings(soup)
-            links, files = self._extract_links(soup, url)
-
-            # Save page and get its ID
-            page_data = Page(
+                await self.writer.submit_update(url, {**validators, **history, 'fetched_at': datetime.now()})
+                return PageResult(
+                    page=Page.model_construct(**existing_page),
+                    extraction=extraction,
+                    unchanged=True
+                )
+
+            content_simhash = simhash(main_text)
+            duplicate_of = None
+            if len(main_text.split()) >= Config.NEAR_DUPLICATE_MIN_WORDS:
+                duplicate_of = self.near_duplicates.find(content_simhash, exclude=url)
+
+            if duplicate_of:
+                # Mirror or print version: keep a stub so it is known, but
+                # don't store its content, headings and links again
+                self.logger.info(f"Near duplicate of {duplicate_of}: {url}")
+                page_data = Page.model_construct(
+                    site_id=self.site_id,
+                    url=url,
+                    status_code=status_code,
+                    checksum=checksum,
+                    fingerprint=fingerprint,
+                    simhash=to_signed64(content_simhash),
+                    duplicate_of=duplicate_of,
+                    fetched_at=datetime.now(),
+                    **validators,
+                    **history
+                )
+                await self.writer.submit(dict(page_data), [], [], [])
+                return PageResult(page=page_data, extraction=extraction, duplicate_of=duplicate_of)
+
+            self.near_duplicates.add(url, content_simhash)
+
+            # Build the page record, validated by construction so it skips Pydantic
+            page_data = Page.model_construct(
                 site_id=self.site_id,
                 url=url,
                 status_code=status_code,
-                content_html=content,
-                content_text=body_text,
-                checksum=checksum
+                content_html=extraction.html,
+                content_text=extraction.text,
+                checksum=checksum,
+                fingerprint=fingerprint,
+                simhash=to_signed64(content_simhash),
+                fetched_at=datetime.now(),
+                **validators,
+                **history
             )
 
-            page_id = save_page(page_data.dict())
+            # Queued for the background writer together with related data
+            await self.writer.submit(
+                dict(page_data),
+                extraction.headings,
+                extraction.links,
+                extraction.files
+            )
+            if self.downloader:
+                for file in extraction.files:
+                    await self.downloader.submit(file.url)
 
-            if page_id:
-                # Save related data
-                save_headings(page_id, headings)
-                save_links(page_id, links)
-                save_files(page_id, files)
+            return PageResult(page=page_data, extraction=extraction)
 
-            await page.close()
-            await context.close()
+        except Exception as e:
+            self.logger.error(f"Error processing {url}: {str(e) or type(e).__name__}")
+            return PageResult(
+                page=Page(
+                    site_id=self.site_id,
+                    url=url,
+                    status_code=getattr(e, 'status_code', 0),
+                    error=str(e) or type(e).__name__
+                ),
+                retryable=is_retryable(e),
+                retry_after=getattr(e, 'retry_after', None)
+            )
 
-            return page_data
+    async def fetch(self, url: str, headers: Optional[Dict[str, str]] = None) -> FetchResult:
+        """Fetch at the pace the host's scheduler allows and report back how it went."""
+        with self.stats.time('wait'):
+            await self.scheduler.acquire(url)
+        started = time.monotonic()
+        try:
+            fetched = await self.fetcher.fetch(url, headers=headers)
+        except Exception:
+            self.scheduler.record(url, 0, time.monotonic() - started)
+            raise
+        elapsed = time.monotonic() - started
+        self.scheduler.record(url, fetched.status_code, elapsed, fetched.headers.get('retry-after'))
+        self.stats.observe('fetch', elapsed)
+        self.stats.incr('fetched')
+        self.stats.incr('bytes', len(fetched.html.encode('utf-8')))
+        return fetched
+
+    async def _not_modified_result(self, existing_page: Dict, requested: bool = True) -> PageResult:
+        # Links come from the last full download so the crawl can go on
+        # without downloading or parsing the page. Near duplicates have no
+        # links of their own, the original's stand in for them.
+        page_id = existing_page['_id']
+        if existing_page.get('duplicate_of'):
+            original = await asyncio.to_thread(get_page_meta, existing_page['duplicate_of'])
+            page_id = original['_id'] if original else page_id
+        links = await asyncio.to_thread(get_page_links, page_id)
+        return PageResult(
+            page=Page.model_construct(**existing_page),
+            unchanged=True,
+            not_modified=True,
+            stored_links=links,
+            requested=requested
+        )
 
-        except Exception as e:
-            self.logger.error(f"Error processing {url}: {str(e)}")
-            return Page(
-                site_id=self.site_id,
-                url=url,
-                status_code=0,
-                error=str(e)
+    def checkpoint_path(self) -> str:
+        return os.path.join(Config.CHECKPOINT_DIR, f"{self.crawl_name}.sqlite")
+
+    def _restore_checkpoint(self):
+        pending, done = self.checkpoint.load()
+        if not pending and not done:
+            self.logger.info(f"No checkpoint in {self.checkpoint.path}, starting from {self.base_url}")
+            return
+
+        self.frontier.close()
+        self.frontier = self.create_frontier(self.frontier.priority)
+        for url in self.checkpoint.iter_done():
+            self.frontier.mark_seen(url)
+        for entry in pending:
+            self.frontier.push(entry.url, entry.depth)
+        self.logger.info(f"Resuming crawl: {done} pages done, {len(pending)} queued")
+
+    async def save_checkpoint(self):
+        async with self._checkpoint_lock:
+            done = self._done_since_checkpoint
+            self._done_since_checkpoint = []
+            # Only what changed since the last save is written: pages in flight or
+            # waiting for a retry stay pending until they are done, so a resume redoes them
+            queued = self._unsaved_queued + self.frontier.take_queued()
+            self._unsaved_queued = []
+            self._last_checkpoint = time.monotonic()
+            try:
+                # A page only counts as done once its writes are in the database;
+                # pages the writer gave up on stay pending, so a resume fetches them again
+                self._failed_writes |= await self.writer.sync()
+                saved = []
+                for entry in done:
+                    if entry.url in self._failed_writes:
+                        self._failed_writes.discard(entry.url)
+                    else:
+                        saved.append(entry.url)
+                await asyncio.to_thread(self.checkpoint.save, queued, saved)
+            except Exception as e:
+                self.logger.error(f"Failed to save checkpoint: {str(e)}")
+                self._unsaved_queued[:0] = queued
+                self._done_since_checkpoint[:0] = done
+
+    async def crawl(self, visible: bool = False, max_pages: int = 5, concurrency: int = 1,
+                    resume: bool = False, sitemap: bool = False, force: bool = False):
+        self.concurrency = max(1, concurrency)
+        self.force = force
+        self.stats = CrawlStats(labels={'site': self.site_id})
+        self.retries = RetryQueue()
+        self.checkpoint = CrawlCheckpoint(self.checkpoint_path())
+        if resume:
+            self._restore_checkpoint()
+        else:
+            self.checkpoint.clear()
+        # Saves only write what changed, the first one starts from what is queued now
+        self.frontier.take_queued()
+        queued = self.frontier.snapshot()
+
+        try:
+            async with self:
+                if sitemap:
+                    await self.seed_from_sitemaps()
+                self._in_flight = 0
+                self._in_flight_entries: Dict[str, FrontierEntry] = {}
+                self._pages_claimed = 0
+                self._frontier_changed = asyncio.Condition()
+                self._checkpoint_lock = asyncio.Lock()
+                self._done_since_checkpoint: List[FrontierEntry] = []
+                # Reported by the writer but not yet matched with a done page
+                self._failed_writes: Set[str] = set()
+                self._unsaved_queued: List[FrontierEntry] = queued
+                self._last_checkpoint = time.monotonic()
+                workers = [
+                    asyncio.create_task(self._crawl_worker(max_pages))
+                    for _ in range(self.concurrency)
+                ]
+                try:
+                    await asyncio.gather(*workers)
+                finally:
+                    for worker in workers:
+                        worker.cancel()
+                    await self.save_checkpoint()
+            self.logger.info(
+                f"Crawl finished: {self.stats.summary()}; {self.frontier.seen_count} URLs seen, "
+                f"{self.frontier.seen_memory / 2 ** 20:.1f} MiB in the '{self.seen_backend}' seen set"
             )
+            self.logger.info(f"Stage timings: {self.stats.stage_summary()}")
+        except Exception as e:
+            self.logger.error(f"Crawling failed: {str(e)}")
+            raise
+        finally:
+            self.checkpoint.close()
+            self.frontier.close()
+
+    async def refresh(self, budget: int = Config.REVISIT_BUDGET, concurrency: int = 1, resume: bool = False):
+        """Revisit the stored pages most likely to have changed, at most budget of them."""
+        self.crawl_name = f"{self.site_id}.refresh"
+        self.follow_links = False
+        revisits = await asyncio.to_thread(select_revisits, get_revisit_candidates(self.site_id), budget)
+        ranks = {url: rank for rank, (url, _) in enumerate(revisits)}
+        self.frontier.close()
+        self.frontier = self.create_frontier(priority=lambda url, depth: ranks.get(url, len(ranks)))
+        for url, _ in revisits:
+            self.frontier.push(url)
+        if revisits:
+            self.logger.info(f"Revisiting {len(revisits)} pages, change probability "
+                             f"{revisits[0][1]:.2f} to {revisits[-1][1]:.2f}")
+        await self.crawl(max_pages=budget, concurrency=concurrency, resume=resume)
+
+    def create_shared_frontier(self, shard: Optional[Tuple[int, int]] = None) -> MongoFrontier:
+        return MongoFrontier(self.site_id, shard=shard, canonicalize=self.canonicalize_url,
+                             priority=self.url_priority, seen_backend=self.seen_backend)
+
+    async def crawl_distributed(self, max_pages: int = 5, concurrency: int = 1,
+                                shard: Optional[Tuple[int, int]] = None, reset: bool = False,
+                                sitemap: bool = False, force: bool = False):
+        """Crawl as one of several workers sharing the frontier in MongoDB."""
+        self.concurrency = max(1, concurrency)
+        self.force = force
+        self.frontier.close()
+        self.frontier = self.create_shared_frontier(shard)
+        self.stats = CrawlStats(labels={'site': self.site_id, 'worker': self.frontier.worker_id})
+        if shard:
+            # Every worker may hit the same host, each gets its share of the rate
+            self.scheduler = HostScheduler(share=1 / shard[1])
+        if reset:
+            await asyncio.to_thread(self.frontier.reset)
+        # A no-op when the site is already in the shared frontier
+        self.frontier.push(self.base_url)
+        await asyncio.to_thread(self.frontier.flush)
 
-    async def crawl(self, visible: bool = False, max_pages: int = 5):
         try:
             async with self:
-                while self.queue and len(self.visited) < max_pages:
-                    current_url = self.queue.popleft()
-                    if current_url in self.visited:
-                        continue
-
-                    self.logger.info(f"Processing: {current_url}")
-
-                    page_data = await self.process_page_custom(current_url)
-                    self.visited.add(current_url)
-
-                    if not page_data.error:
-                        new_links, _ = self._extract_links(
-                            BeautifulSoup(page_data.content_html, 'html.parser'),
-                            current_url
-                        )
-                        self.queue.extend(
-                            link['url'] for link in new_links
-                            if link['url'] not in self.visited
-                            and link['url'] not in self.queue
-                            and self._should_follow_link(link['url'])
-                        )
+                if sitemap:
+                    await self.seed_from_sitemaps()
+                self._in_flight_entries: Dict[str, FrontierEntry] = {}
+                self._pages_claimed = 0
+                self._completed: List[str] = []
+                self._complete_lock = asyncio.Lock()
+                # Deferred by this worker and not yet claimed again
+                self._deferred: Set[str] = set()
+                self._failed_writes: Set[str] = set()
+                workers = [
+                    asyncio.create_task(self._distributed_worker(max_pages))
+                    for _ in range(self.concurrency)
+                ]
+                try:
+                    await asyncio.gather(*workers)
+                finally:
+                    for worker in workers:
+                        worker.cancel()
+                    await self._complete_claimed()
+                    # Interrupted pages go back to the other workers right away
+                    await asyncio.to_thread(self.frontier.release, list(self._in_flight_entries))
+            self.logger.info(
+                f"Crawl finished on {self.frontier.worker_id}: {self.stats.summary()}; "
+                f"{self.frontier.stolen} URLs stolen from other shards, "
+                f"{self.frontier.requeued} expired leases re-issued; {self.frontier.seen_count} URLs seen, "
+                f"{self.frontier.seen_memory / 2 ** 20:.1f} MiB in the '{self.seen_backend}' seen set"
+            )
+            self.logger.info(f"Stage timings: {self.stats.stage_summary()}")
         except Exception as e:
             self.logger.error(f"Crawling failed: {str(e)}")
             raise
+        finally:
+            self.frontier.close()
+
+    async def _distributed_worker(self, max_pages: int):
+        while True:
+            # Past the page limit, only the retries of our own pages are still claimed
+            retries_only = self._pages_claimed >= max_pages
+            if retries_only and not self._deferred:
+                return
+            # Counted before the claim so the limit holds while it is in flight
+            if not retries_only:
+                self._pages_claimed += 1
+            entry = await asyncio.to_thread(self.frontier.claim, retries_only)
+            if entry is None:
+                if not retries_only:
+                    self._pages_claimed -= 1
+                if not await self._wait_for_shared_work(list(self._deferred) if retries_only else None):
+                    return
+                continue
+            if self.frontier.is_retry(entry.url):
+                # Counted when it was first claimed
+                if not retries_only:
+                    self._pages_claimed -= 1
+                self._deferred.discard(entry.url)
+
+            self._in_flight_entries[entry.url] = entry
+            done = await self._crawl_url(entry)
+            # Links found on the page become visible to the other workers
+            await asyncio.to_thread(self.frontier.flush)
+            del self._in_flight_entries[entry.url]
+            if not done:
+                self._deferred.add(entry.url)
+                continue
+            self._completed.append(entry.url)
+            if len(self._completed) >= Config.FRONTIER_COMPLETE_EVERY and not self._complete_lock.locked():
+                await self._complete_claimed()
+
+    async def _wait_for_shared_work(self, urls: Optional[List[str]] = None) -> bool:
+        """False once no worker has anything left that could add URLs (or retry one of urls)."""
+        # Our own finished pages still hold leases until they are completed
+        await self._complete_claimed()
+        if not await asyncio.to_thread(self.frontier.outstanding, urls):
+            self._deferred.difference_update(urls or ())
+            return False
+        await asyncio.sleep(Config.FRONTIER_POLL_INTERVAL)
+        return True
+
+    async def _complete_claimed(self):
+        async with self._complete_lock:
+            urls = self._completed
+            self._completed = []
+            if not urls:
+                return
+            try:
+                # A URL only counts as done once its writes are in the database,
+                # the others are retried like a failed fetch
+                self._failed_writes |= await self.writer.sync()
+                unsaved = [url for url in urls if url in self._failed_writes]
+                self._failed_writes.difference_update(unsaved)
+                for url in unsaved:
+                    delay = backoff_delay(self.frontier.retries_of(url) + 1)
+                    if await asyncio.to_thread(self.frontier.defer, url, delay, True, self.retries.max_attempts):
+                        self._deferred.add(url)
+                    else:
+                        self.logger.error(f"Giving up on {url}, its page could not be written")
+                await asyncio.to_thread(self.frontier.complete, [url for url in urls if url not in unsaved])
+            except Exception as e:
+                self.logger.error(f"Failed to mark pages done: {str(e)}")
+                self._completed[:0] = urls
+
+    async def _crawl_worker(self, max_pages: int):
+        while True:
+            async with self._frontier_changed:
+                entry = self._claim_next_url(max_pages)
+                while entry is None:
+                    # Nothing queued right now, but pages still in flight may
+                    # add links and retries come due later
+                    if self._in_flight == 0 and not self.retries:
+                        self._frontier_changed.notify_all()
+                        return
+                    try:
+                        await asyncio.wait_for(self._frontier_changed.wait(), self.retries.next_due())
+                    except asyncio.TimeoutError:
+                        pass
+                    entry = self._claim_next_url(max_pages)
+                self._in_flight += 1
+
+            try:
+                if await self._crawl_url(entry):
+                    await self._page_done(entry)
+                else:
+                    del self._in_flight_entries[entry.url]
+            finally:
+                async with self._frontier_changed:
+                    self._in_flight -= 1
+                    self._frontier_changed.notify_all()
+
+    def _claim_next_url(self, max_pages: int) -> Optional[FrontierEntry]:
+        # URLs are counted when claimed, so max_pages holds no matter in which
+        # order the workers finish; the frontier never returns a URL twice.
+        # Retries were counted when first claimed.
+        entry = self.retries.pop_due()
+        if entry:
+            self._in_flight_entries[entry.url] = entry
+            return entry
+        if self.frontier and self._pages_claimed < max_pages:
+            entry = self.frontier.pop()
+            self._in_flight_entries[entry.url] = entry
+            self._pages_claimed += 1
+            return entry
+        return None
+
+    async def _page_done(self, entry: FrontierEntry):
+        del self._in_flight_entries[entry.url]
+        self._done_since_checkpoint.append(entry)
+        if self._checkpoint_lock.locked():
+            return
+        if (len(self._done_since_checkpoint) >= Config.CHECKPOINT_EVERY
+                or time.monotonic() - self._last_checkpoint >= Config.CHECKPOINT_INTERVAL):
+            await self.save_checkpoint()
+
+    def _breaker(self, url: str) -> CircuitBreaker:
+        host = urlparse(url).netloc
+        breaker = self.breakers.get(host)
+        if breaker is None:
+            breaker = self.breakers[host] = CircuitBreaker()
+        return breaker
+
+    async def _schedule_retry(self, entry: FrontierEntry, delay: float, count_attempt: bool = True) -> bool:
+        if isinstance(self.frontier, MongoFrontier):
+            # The shared frontier keeps the attempts and hands it out again once the delay is over
+            return await asyncio.to_thread(
+                self.frontier.defer, entry.url, delay, count_attempt, self.retries.max_attempts
+            )
+        return self.retries.schedule(entry, delay, count_attempt)
+
+    def _attempts_before(self, url: str) -> int:
+        if isinstance(self.frontier, MongoFrontier):
+            return self.frontier.retries_of(url)
+        return self.retries.attempts[url]
+
+    async def _crawl_url(self, entry: FrontierEntry) -> bool:
+        """Crawl one URL, False when it was put back for a later attempt."""
+        current_url = entry.url
+        if not await self.scheduler.can_fetch(current_url):
+            self.logger.info(f"Disallowed by robots.txt: {current_url}")
+            self.stats.incr('disallowed')
+            return True
+
+        breaker = self._breaker(current_url)
+        wait = breaker.wait()
+        if wait:
+            # The host is failing, don't spend a worker on it until it had a break
+            self.stats.incr('deferred')
+            return not await self._schedule_retry(entry, wait, count_attempt=False)
+        # An open circuit let this page through as the probe of the host
+        probe = breaker.is_open
+
+        self.logger.info(f"Processing: {current_url}")
+
+        with self.stats.time('page'):
+            result = await self.process_page_custom(current_url)
+
+        if result.retryable:
+            if breaker.record_failure():
+                self.logger.warning(f"Pausing {urlparse(current_url).netloc} for {breaker.cooldown:.0f}s "
+                                    f"after {breaker.failures} failures in a row")
+            attempt = self._attempts_before(current_url) + 1
+            delay = backoff_delay(attempt, retry_after=result.retry_after)
+            if await self._schedule_retry(entry, delay):
+                self.logger.info(f"Retrying {current_url} in {delay:.1f}s (attempt {attempt + 1})")
+                self.stats.incr('retried')
+                return False
+            self.logger.error(f"Giving up on {current_url} after {attempt} attempts")
+        elif result.requested:
+            breaker.record_success()
+        elif probe:
+            # Nothing was learned about the host, the next page tries it
+            breaker.release()
+
+        self.stats.incr('processed')
+        if result.error:
+            self.stats.incr('failed')
+        elif result.unchanged:
+            self.stats.incr('unchanged')
+        elif result.duplicate_of:
+            self.stats.incr('duplicates')
+        else:
+            self.stats.incr('saved')
+
+        if not result.error and self.follow_links:
+            for link in result.links:
+                if self._should_follow_link(link.url):
+                    self.frontier.push(link.url, entry.depth + 1)
+        return True
 
     def _should_follow_link(self, url: str) -> bool:
         parsed = urlparse(url)
         return (parsed.netloc == urlparse(self.base_url).netloc and
                 parsed.scheme in ('http', 'https') and
-                not any(url.endswith(ext) for ext in Config.IGNORED_EXTENSIONS))
\ No newline at end of file
+                not any(url.endswith(ext) for ext in Config.IGNORED_EXTENSIONS) and
+                self.scheduler.allowed(url))
\ No newline at end of file
@@ -1,39 +1,45 @@
-from bs4 import BeautifulSoup
 from web_scraper.services.base_scraper_service import BaseScraperService
-from web_scraper.entity.models import Page
+from web_scraper.entity.page_result import PageResult
 import logging
 from datetime import datetime
 
 
 class EyewikiService(BaseScraperService):
-    def __init__(self, site_id: str, visible: bool = False):
+    # Articles first, then MediaWiki namespace pages (Special:, Category:, ...)
+    # and index.php/api.php views
+    priority_rules = [
+        (r'^/(index|api)\.php', 2),
+        (r'^/[^/]+:', 1),
+    ]
+    content_selector = 'div#mw-content-text'
+    # Eyewiki-specific elements
+    content_exclude = ['span.mw-editsection', 'div.mw-editsection']
+    # Skins and scripts served from the AAO domain
+    allowed_hosts = ['aao.org']
+
+    def __init__(self, site_id: str, visible: bool = False, **kwargs):
         super().__init__(
             base_url="https://eyewiki.org",
             site_id=site_id,
-            visible=visible
+            visible=visible,
+            **kwargs
         )
         self.logger = logging.getLogger(__name__)
 
-    async def process_page_custom(self, url: str) -> Page:
-        page_data = await self.process_page(url)
+    async def process_page_custom(self, url: str) -> PageResult:
+        result = await self.process_page(url)
+        page_data = result.page
 
-        if page_data.error:
-            return page_data
+        if result.error or result.extraction is None:
+            return result
 
         try:
-            soup = BeautifulSoup(page_data.content_html, 'html.parser')
-            content_div = soup.find('div', id='mw-content-text')
-
-            if content_div:
-                # Clean up Eyewiki-specific elements
-                for element in content_div.find_all(['span', 'div'], class_='mw-editsection'):
-                    element.decompose()
-
-                # Update content text
-                page_data.content_text = content_div.get_text(' ', strip=True)
+            # Update content text
+            if result.extraction.main_text is not None:
+                page_data.content_text = result.extraction.main_text
 
         except Exception as e:
             self.logger.error(f"Eyewiki processing error: {str(e)}")
             page_data.error = f"Content processing error: {str(e)}"
 
-        return page_data
\ No newline at end of file
+        return result
\ No newline at end of file
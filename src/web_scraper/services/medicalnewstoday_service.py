@@ -1,47 +1,49 @@
-from bs4 import BeautifulSoup
 from .base_scraper_service import BaseScraperService
-from web_scraper.entity.models import Page
+from web_scraper.entity.page_result import PageResult
 import logging
 from typing import Optional, Dict
 
 
 class MedicalNewsTodayService(BaseScraperService):
-    def __init__(self, site_id: str, visible: bool = False):
+    # Articles first, then category listings, then everything else
+    priority_rules = [
+        (r'^/articles/', 0),
+        (r'^/categories/', 1),
+    ]
+    default_priority = 2
+    content_selector = 'article'
+    content_exclude = ['script', 'style', 'nav', 'footer', 'aside']
+    # Header bidding and ad partners on top of Config.BLOCKED_HOSTS
+    blocked_hosts = ['amazon-adsystem.com', 'pubmatic.com', 'rubiconproject.com', 'criteo.com']
+
+    def __init__(self, site_id: str, visible: bool = False, **kwargs):
         super().__init__(
             base_url="https://www.medicalnewstoday.com",
             site_id=site_id,
-            visible=visible
+            visible=visible,
+            **kwargs
         )
         self.logger = logging.getLogger(__name__)
 
-    async def process_page_custom(self, url: str) -> Page:
-        page_data = await self.process_page(url)
+    async def process_page_custom(self, url: str) -> PageResult:
+        result = await self.process_page(url)
+        page_data = result.page
 
-        if page_data.error:
-            return page_data
+        if result.error or result.extraction is None:
+            return result
 
         try:
-            soup = BeautifulSoup(page_data.content_html, 'html.parser')
-
             # Article extraction
-            article_div = soup.find('div', attrs={'data-article-body': '0'})
-            article = soup.find('article')
-            if article:
-                # Cleanup
-                for element in article.find_all(['script', 'style', 'nav', 'footer', 'aside']):
-                    element.decompose()
-
-                    # Main content
-                    page_data.body_text = article.get_text(' ', strip=True)
+            if result.extraction.main_text is not None:
+                # Main content
+                page_data.content_text = result.extraction.main_text
 
                 # Metadata
-                title = soup.find('h1')
-                published_date = soup.find('time')
-                authors = [a.get_text(strip=True) for a in soup.select('.author-name')]
-                print(authors)
+                authors = result.extraction.select_all_text('.author-name')
+                self.logger.debug(f"Authors for {url}: {authors}")
 
         except Exception as e:
             self.logger.error(f"MedicalNewsToday processing error: {str(e)}")
             page_data.error = f"Content processing error: {str(e)}"
 
-        return page_data
\ No newline at end of file
+        return result
\ No newline at end of file
@@ -0,0 +1,56 @@
+import hashlib
+import re
+from typing import Iterable
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+TRACKING_QUERY_PARAMS = (
+    'utm_*', 'gclid', 'fbclid', 'msclkid', 'yclid', 'igshid',
+    'mc_cid', 'mc_eid', '_ga', '_gl'
+)
+
+
+def _is_tracking_param(name: str, tracking_params: Iterable[str]) -> bool:
+    name = name.lower()
+    for param in tracking_params:
+        if param.endswith('*'):
+            if name.startswith(param[:-1]):
+                return True
+        elif name == param:
+            return True
+    return False
+
+
+def canonicalize_url(url: str, tracking_params: Iterable[str] = TRACKING_QUERY_PARAMS) -> str:
+    """Normalize a URL so that trivially different spellings map to one key.
+
+    Lowercases scheme and host, drops default ports, the fragment, a trailing
+    slash and tracking query parameters, and sorts the remaining parameters.
+    """
+    parsed = urlsplit(url.strip())
+    scheme = parsed.scheme.lower()
+
+    netloc = (parsed.hostname or '').lower()
+    try:
+        port = parsed.port
+    except ValueError:
+        port = None
+    if port and DEFAULT_PORTS.get(scheme) != port:
+        netloc = f"{netloc}:{port}"
+
+    path = re.sub(r'/{2,}', '/', parsed.path) or '/'
+    if len(path) > 1:
+        path = path.rstrip('/') or '/'
+
+    query = urlencode(sorted(
+        (key, value)
+        for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if not _is_tracking_param(key, tracking_params)
+    ))
+
+    return urlunsplit((scheme, netloc, path, query, ''))
+
+
+def generate_checksum(content: str) -> str:
+    return hashlib.md5(content.encode()).hexdigest()
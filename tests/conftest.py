@@ -0,0 +1,91 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from web_scraper.bench import FixtureSite, serve
+from web_scraper.database.client import DatabaseClient
+from web_scraper.database.migrations import ensure_indexes
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    # Logs, checkpoints, blobs and the search index are written relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def db():
+    """Fresh in-memory database behind DatabaseClient."""
+    mongomock = pytest.importorskip('mongomock')
+    previous = DatabaseClient._instance
+    client = mongomock.MongoClient()
+    ensure_indexes(client.db)
+    DatabaseClient.attach(client, client.db)
+    yield client.db
+    DatabaseClient._instance = previous
+
+
+@pytest.fixture
+def fixture_site():
+    """The benchmark fixture site on a local port, yields the site and its base URL."""
+    site = FixtureSite(pages=30, links_per_page=4, sections=3)
+    server, base_url = serve(site)
+    yield site, base_url
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def make_service(db, fixture_site):
+    """Builds eyewiki services pointed at the fixture site, fetching over HTTP without rate limits."""
+    from web_scraper.bench.runner import UNLIMITED_RATE
+    from web_scraper.crawler.politeness import HostScheduler
+    from web_scraper.services import EyewikiService
+
+    _, base_url = fixture_site
+
+    def make(**options):
+        service = EyewikiService('eyewiki', fetch_mode='http', **options)
+        service.base_url = base_url
+        service.frontier.close()
+        service.frontier = service.create_frontier()
+        service.frontier.push(base_url)
+        service.scheduler = HostScheduler(rate=UNLIMITED_RATE, burst=UNLIMITED_RATE, max_rate=UNLIMITED_RATE)
+        return service
+
+    return make
+
+
+@pytest.fixture
+def serve_pages():
+    """Serves {path: (status, body)} on a local port, returns the base URL without a trailing slash."""
+    servers = []
+
+    def serve_paths(pages):
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                status, body = pages.get(self.path, (404, 'Not found'))
+                data = body.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/plain' if self.path.endswith('.txt') else 'text/html')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f'http://127.0.0.1:{server.server_address[1]}'
+
+    yield serve_paths
+    for server in servers:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from web_scraper.bench import FixtureSite, compare, format_report, run_benchmark
+from web_scraper.bench.runner import percentile
+from web_scraper.database.client import DatabaseClient
+
+
+def run(label='cold', pages_per_sec=100.0, writes=2.0, fetch_p95=5.0):
+    return {
+        'label': label, 'pages_per_sec': pages_per_sec, 'db_writes_per_page': writes,
+        'stages': {'fetch': {'p95_ms': fetch_p95}}, 'peak_rss_mb': None
+    }
+
+
+def report(*runs):
+    return {'shape': 'eyewiki', 'pages': 100, 'concurrency': 8, 'database': 'memory', 'runs': list(runs)}
+
+
+def test_percentile():
+    assert percentile([], 0.5) == 0.0
+    assert percentile([3, 1, 2], 0.5) == 2
+    assert percentile(range(1, 101), 0.95) == 95
+    assert percentile([7], 0.99) == 7
+
+
+def test_compare_flags_regressions_beyond_tolerance():
+    comparisons = compare(report(run(pages_per_sec=80.0, writes=2.1)), report(run()), tolerance=0.1)
+    regressed = {comparison.metric for comparison in comparisons if comparison.regressed}
+
+    # 100 -> 80 pages/s is 25% more time per page; 5% more writes is within tolerance
+    assert regressed == {'seconds_per_page'}
+
+
+def test_compare_ignores_sub_millisecond_stage_noise():
+    comparisons = compare(report(run(fetch_p95=0.5)), report(run(fetch_p95=0.2)))
+
+    assert not any(comparison.regressed for comparison in comparisons)
+    assert compare(report(run(label='warm')), report(run(label='cold'))) == []
+
+
+def test_fixture_site_is_deterministic_and_connected():
+    site = FixtureSite(pages=20, links_per_page=3, sections=2)
+
+    assert site.render('/Article_5') == FixtureSite(pages=20, links_per_page=3, sections=2).render('/Article_5')
+    assert site.render('/Article_5') != FixtureSite(pages=20, links_per_page=3, sections=2, seed=1).render('/Article_5')
+    assert site.render('/Article_20') is None
+    assert 'href="/Article_6"' in site.render('/Article_5')
+    assert site.render('/robots.txt').startswith('User-agent')
+    with pytest.raises(ValueError):
+        FixtureSite(shape='blog')
+
+
+@pytest.fixture
+def restore_database():
+    previous = DatabaseClient._instance
+    yield
+    DatabaseClient._instance = previous
+
+
+def test_small_benchmark(restore_database):
+    pytest.importorskip('mongomock')
+    from web_scraper.services import EyewikiService
+
+    result = asyncio.run(run_benchmark(EyewikiService, 'eyewiki', 'eyewiki', pages=10, concurrency=2))
+
+    cold, warm = result['runs']
+    assert (cold['label'], warm['label']) == ('cold', 'warm')
+    assert cold['pages'] == 10 and warm['pages'] == 10
+    assert cold['counters']['saved'] == 10
+    # The second run revalidates every page instead of saving it again
+    assert warm['counters'].get('revalidated') == 10
+    assert warm['db_documents_per_page'] < cold['db_documents_per_page']
+    assert 'eyewiki (eyewiki), 10 pages' in format_report(result)
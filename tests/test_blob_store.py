@@ -0,0 +1,66 @@
+import pytest
+
+from web_scraper.database import blob_store
+from web_scraper.database.blob_store import DirectoryBlobStore, MongoBlobStore, content_key
+from web_scraper.database.client import get_page_content, save_page_bundles
+
+CONTENT = '<html><body>' + 'Retina and cornea. ' * 500 + '</body></html>'
+CODECS = ['gzip'] + (['zstd'] if blob_store.zstandard is not None else [])
+
+
+@pytest.fixture(params=['mongo', 'directory'])
+def make_store(request, db, tmp_path):
+    def make(codec):
+        if request.param == 'mongo':
+            return MongoBlobStore(db.blobs, codec=codec)
+        return DirectoryBlobStore(str(tmp_path / 'blobs'), codec=codec)
+
+    return make
+
+
+@pytest.mark.parametrize('codec', CODECS)
+def test_round_trip_and_dedup(make_store, codec):
+    store = make_store(codec)
+
+    keys = store.put_many([CONTENT, 'other', CONTENT])
+
+    assert keys == [content_key(CONTENT), content_key('other'), content_key(CONTENT)]
+    assert store.get(keys[0]) == CONTENT
+    assert store.get_many(keys + ['missing']) == {keys[0]: CONTENT, keys[1]: 'other'}
+    assert store.get('missing') is None
+
+
+def test_blobs_are_stored_once_and_compressed(db):
+    store = MongoBlobStore(db.blobs, codec='gzip')
+    store.put(CONTENT)
+    store.put(CONTENT)
+
+    blob = db.blobs.find_one()
+    assert db.blobs.count_documents({}) == 1
+    assert blob['size'] < len(CONTENT) / 10
+
+
+@pytest.mark.skipif(blob_store.zstandard is None, reason='zstandard not installed')
+def test_codecs_are_read_side_by_side(make_store):
+    old = make_store('gzip')
+    old_key = old.put('written with gzip')
+    new = make_store('zstd')
+    new_key = new.put('written with zstd')
+
+    assert new.get_many([old_key, new_key]) == {old_key: 'written with gzip', new_key: 'written with zstd'}
+
+
+def test_pages_keep_references_to_their_content(db):
+    page = {'url': 'http://a/1', 'site_id': 'test', 'status_code': 200, 'checksum': 'x',
+            'content_html': CONTENT, 'content_text': 'Retina and cornea.'}
+
+    save_page_bundles([{'page': dict(page), 'headings': [], 'links': [], 'files': []}])
+    save_page_bundles([{'page': {**page, 'url': 'http://a/2'}, 'headings': [], 'links': [], 'files': []}])
+
+    stored = db.pages.find_one({'url': 'http://a/1'})
+    assert 'content_html' not in stored
+    assert stored['content_html_ref'] == content_key(CONTENT)
+    assert get_page_content(stored) == CONTENT
+    assert get_page_content(stored, 'content_text') == 'Retina and cornea.'
+    # Both pages point at the same blobs
+    assert db.blobs.count_documents({}) == 2
@@ -0,0 +1,160 @@
+import asyncio
+
+import pytest
+
+from web_scraper.fetch import BrowserPool, ResourcePolicy
+
+
+class FakeFrame:
+    def __init__(self, parent_frame=None):
+        self.parent_frame = parent_frame
+
+
+class FakeRequest:
+    def __init__(self, url, resource_type='document', navigation=False, frame=None):
+        self.url = url
+        self.resource_type = resource_type
+        self.frame = frame or FakeFrame()
+        self._navigation = navigation
+
+    def is_navigation_request(self):
+        return self._navigation
+
+
+class FakeRoute:
+    def __init__(self, request):
+        self.request = request
+        self.outcome = None
+
+    async def continue_(self):
+        self.outcome = 'continued'
+
+    async def abort(self):
+        self.outcome = 'aborted'
+
+
+class FakePage:
+    def __init__(self):
+        self.closed = False
+
+    def is_closed(self):
+        return self.closed
+
+
+class FakeContext:
+    def __init__(self):
+        self.page = FakePage()
+        self.handler = None
+        self.closed = False
+
+    async def route(self, pattern, handler):
+        self.handler = handler
+
+    async def new_page(self):
+        return self.page
+
+    async def close(self):
+        self.closed = True
+        self.page.closed = True
+
+
+class FakeBrowser:
+    """Stands in for a Playwright browser, hands out contexts with one page each."""
+
+    def __init__(self):
+        self.contexts = []
+
+    async def new_context(self):
+        context = FakeContext()
+        self.contexts.append(context)
+        return context
+
+
+def policy(**options):
+    return ResourcePolicy(first_party_hosts=['example.org'], blocked_hosts=['tracker.net'], **options)
+
+
+def test_resource_policy_allows():
+    first_party = policy(allowed_hosts=['cdn.net'])
+
+    assert first_party.allows('https://example.org/style.css', 'stylesheet')
+    assert first_party.allows('https://static.example.org/app.js', 'script')
+    assert first_party.allows('https://cdn.net/lib.js', 'script')
+    assert not first_party.allows('https://example.org/logo.png', 'image')
+    assert not first_party.allows('https://other.com/app.js', 'script')
+    assert not first_party.allows('https://ads.tracker.net/pixel.js', 'script')
+    assert not first_party.allows('data:image/png;base64,AAAA', 'image')
+    assert first_party.allows('data:text/css,body{}', 'stylesheet')
+
+    open_policy = policy(block_third_party=False, blocked_resource_types=[])
+    assert open_policy.allows('https://other.com/photo.jpg', 'image')
+    assert not open_policy.allows('https://tracker.net/pixel.js', 'script')
+
+
+@pytest.mark.parametrize('request_, outcome', [
+    (FakeRequest('https://example.org/app.js', 'script'), 'continued'),
+    (FakeRequest('https://example.org/photo.jpg', 'image'), 'aborted'),
+    (FakeRequest('https://tracker.net/pixel.js', 'script'), 'aborted'),
+    (FakeRequest('https://other.com/app.js', 'script'), 'aborted'),
+    # Main frame navigations always go through, framed ones follow the policy
+    (FakeRequest('https://other.com/', navigation=True), 'continued'),
+    (FakeRequest('https://other.com/', navigation=True, frame=FakeFrame(parent_frame=FakeFrame())), 'aborted'),
+])
+def test_route_aborts_blocked_requests(request_, outcome):
+    async def run():
+        pool = BrowserPool(FakeBrowser(), policy=policy())
+        async with pool.page():
+            pass
+        route = FakeRoute(request_)
+        await pool.browser.contexts[0].handler(route)
+        return route.outcome, pool.blocked_requests
+
+    assert asyncio.run(run()) == (outcome, int(outcome == 'aborted'))
+
+
+def test_no_routing_without_a_policy():
+    async def run():
+        pool = BrowserPool(FakeBrowser())
+        async with pool.page():
+            pass
+        return pool.browser.contexts[0].handler
+
+    assert asyncio.run(run()) is None
+
+
+def test_contexts_are_recycled_after_max_uses():
+    async def run():
+        browser = FakeBrowser()
+        pool = BrowserPool(browser, recycle_after=2)
+        pages = []
+        for _ in range(5):
+            async with pool.page() as page:
+                pages.append(page)
+        await pool.close()
+        return browser, pages
+
+    browser, pages = asyncio.run(run())
+
+    assert len(browser.contexts) == 3
+    assert pages[0] is pages[1] and pages[2] is pages[3] and pages[1] is not pages[2]
+    assert all(context.closed for context in browser.contexts)
+
+
+def test_failed_or_closed_pages_are_not_reused():
+    async def run():
+        browser = FakeBrowser()
+        pool = BrowserPool(browser, recycle_after=10)
+        with pytest.raises(RuntimeError):
+            async with pool.page():
+                raise RuntimeError('page crashed')
+        async with pool.page() as page:
+            page.closed = True
+        async with pool.page():
+            pass
+        return browser
+
+    browser = asyncio.run(run())
+
+    assert len(browser.contexts) == 3
+    assert browser.contexts[0].closed and browser.contexts[1].closed
+    assert not browser.contexts[2].closed
@@ -0,0 +1,84 @@
+import asyncio
+
+from web_scraper.crawler.checkpoint import CrawlCheckpoint
+from web_scraper.crawler.frontier import Frontier, FrontierEntry
+from web_scraper.database import writer
+from web_scraper.database.client import save_page_bundles
+
+
+def test_checkpoint_round_trip(tmp_path):
+    checkpoint = CrawlCheckpoint(str(tmp_path / 'state' / 'crawl.sqlite'))
+    checkpoint.save([FrontierEntry('http://a/1', 0), FrontierEntry('http://a/2', 1)], ['http://a/1'])
+    # Only the changes since the last save, pending entries are never written twice
+    checkpoint.save([FrontierEntry('http://a/3', 2), FrontierEntry('http://a/2', 1)], ['http://a/2'])
+    checkpoint.save([FrontierEntry('http://a/4', 1)], [])
+
+    pending, done = checkpoint.load()
+
+    assert pending == [FrontierEntry('http://a/3', 2), FrontierEntry('http://a/4', 1)]
+    assert done == 2
+    assert list(checkpoint.iter_done(batch_size=1)) == ['http://a/1', 'http://a/2']
+    checkpoint.clear()
+    assert checkpoint.load() == ([], 0)
+    checkpoint.close()
+
+
+def test_frontier_hands_out_what_was_queued_once():
+    frontier = Frontier()
+    frontier.push('http://a/1')
+    frontier.push('http://a/1')
+    frontier.push('http://a/2', 1)
+
+    assert frontier.take_queued() == [FrontierEntry('http://a/1', 0), FrontierEntry('http://a/2', 1)]
+    frontier.pop()
+    assert frontier.take_queued() == []
+
+
+def test_checkpoint_keeps_the_whole_frontier_of_an_unfinished_crawl(make_service):
+    service = make_service()
+    asyncio.run(service.crawl(max_pages=3))
+
+    checkpoint = CrawlCheckpoint(service.checkpoint_path())
+    pending, done = checkpoint.load()
+    checkpoint.close()
+    assert done == 3
+    # In the order they were queued, a resume queues them by priority again
+    assert sorted(pending) == sorted(service.frontier.snapshot())
+    assert len(pending) == len(service.frontier)
+
+
+def test_pages_not_written_stay_pending(make_service, fixture_site, monkeypatch):
+    _, base_url = fixture_site
+
+    def save_except_home(bundles, **options):
+        result = save_page_bundles([item for item in bundles if item['page']['url'] != base_url], **options)
+        result['failed'] += [item['page']['url'] for item in bundles if item['page']['url'] == base_url]
+        return result
+
+    monkeypatch.setattr(writer, 'save_page_bundles', save_except_home)
+    service = make_service()
+    asyncio.run(service.crawl(max_pages=5))
+
+    checkpoint = CrawlCheckpoint(service.checkpoint_path())
+    pending, done = checkpoint.load()
+    assert done == 4
+    assert base_url not in set(checkpoint.iter_done())
+    assert base_url in [entry.url for entry in pending]
+    checkpoint.close()
+    assert service.stats['write_failed'] == 1
+
+    # A resumed crawl fetches the page again
+    monkeypatch.setattr(writer, 'save_page_bundles', save_page_bundles)
+    resumed = make_service()
+    fetched = []
+    fetch = resumed.fetch
+
+    async def recording(url, *args, **kwargs):
+        fetched.append(url)
+        return await fetch(url, *args, **kwargs)
+
+    resumed.fetch = recording
+    asyncio.run(resumed.crawl(max_pages=30, resume=True))
+
+    assert base_url in fetched
+    assert len(fetched) == len(set(fetched))
@@ -0,0 +1,23 @@
+import os
+import subprocess
+import sys
+
+import web_scraper
+from web_scraper.config import choices
+from web_scraper.extraction import ENGINES
+from web_scraper.services import SERVICES
+
+
+def test_choices_match_the_implementations():
+    assert choices.SITES == list(SERVICES)
+    assert choices.ENGINE_NAMES == list(ENGINES)
+
+
+def test_cli_starts_without_the_crawler_dependencies():
+    heavy = ['playwright', 'pyarrow', 'pymongo', 'lxml', 'bs4', 'httpx', 'zstandard', 'web_scraper.services']
+    script = f"import sys, web_scraper.cli; print([name for name in {heavy!r} if name in sys.modules])"
+    source = os.path.dirname(os.path.dirname(web_scraper.__file__))
+    result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True,
+                            env={**os.environ, 'PYTHONPATH': source})
+
+    assert result.stdout.strip() == '[]'
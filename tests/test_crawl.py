@@ -0,0 +1,81 @@
+import asyncio
+from collections import Counter
+from datetime import datetime
+
+
+def record_fetches(service):
+    fetched = Counter()
+    fetch = service.fetch
+
+    async def counting(url, *args, **kwargs):
+        fetched[url] += 1
+        return await fetch(url, *args, **kwargs)
+
+    service.fetch = counting
+    return fetched
+
+
+def test_concurrent_crawl_fetches_every_url_once(make_service, db):
+    service = make_service()
+    fetched = record_fetches(service)
+
+    asyncio.run(service.crawl(max_pages=15, concurrency=4))
+
+    assert service.stats['processed'] == 15
+    assert len(fetched) == 15
+    assert set(fetched.values()) == {1}
+    assert db.pages.count_documents({}) == 15
+
+
+def test_page_limit_holds_with_more_workers_than_pages(make_service, db):
+    service = make_service()
+    fetched = record_fetches(service)
+
+    asyncio.run(service.crawl(max_pages=3, concurrency=8))
+
+    assert sum(fetched.values()) == 3
+    assert db.pages.count_documents({}) == 3
+
+
+def test_not_modified_page_is_fresh_again_for_the_next_crawl(make_service, db):
+    asyncio.run(make_service().crawl(max_pages=1))
+
+    service = make_service()
+    fetch = service.fetch
+
+    async def cached(url, *args, **kwargs):
+        fetched = await fetch(url, *args, **kwargs)
+        if fetched.status_code == 304:
+            fetched.headers['cache-control'] = 'max-age=3600'
+        return fetched
+
+    service.fetch = cached
+    asyncio.run(service.crawl(max_pages=1))
+    assert service.stats['revalidated'] == 1
+
+    service = make_service()
+    fetched = record_fetches(service)
+    asyncio.run(service.crawl(max_pages=1))
+
+    assert service.stats['fresh'] == 1
+    assert sum(fetched.values()) == 0
+    page = db.pages.find_one({})
+    assert page['max_age'] == 3600 and page['etag']
+
+
+def test_fresh_page_gives_back_the_probe_of_an_open_circuit(make_service, fixture_site, db):
+    _, base_url = fixture_site
+    asyncio.run(make_service().crawl(max_pages=1))
+    db.pages.update_one({'url': base_url}, {'$set': {'max_age': 3600, 'fetched_at': datetime.now()}})
+
+    service = make_service()
+    breaker = service._breaker(base_url)
+    breaker.cooldown = 0
+    for _ in range(breaker.threshold):
+        breaker.record_failure()
+    asyncio.run(service.crawl(max_pages=1))
+
+    assert service.stats['fresh'] == 1
+    # No request went to the host: the circuit stays open and the probe is free again
+    assert breaker.is_open and not breaker.probing
+    assert breaker.wait() == 0.0
@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+
+from web_scraper.database.client import get_page_meta, get_pages_meta, save_page_bundles
+from web_scraper.extraction import get_engine
+from web_scraper.services import base_scraper_service
+
+URL = 'http://a/page'
+HTML = """<html><body>
+<h1>Title</h1><p>Intro <a href="/one">One</a> <a href="/two">Two</a></p>
+<h2>First</h2><h3>Nested</h3><p>Text <a href="/doc.pdf">Doc</a></p>
+<h2>Second</h2><p>More</p>
+</body></html>"""
+
+
+def save(html=HTML, write_mode='diff'):
+    extraction = get_engine('bs4').extract(html, URL)
+    page = {'url': URL, 'site_id': 'test', 'status_code': 200, 'checksum': str(hash(html))}
+    return save_page_bundles(
+        [{'page': page, 'headings': extraction.headings, 'links': extraction.links, 'files': extraction.files}],
+        write_mode=write_mode
+    )
+
+
+def snapshot(db):
+    return {
+        'headings': {row['title']: row for row in db.headings.find()},
+        'links': {row['url']: row for row in db.links.find()},
+        'files': {row['url']: row for row in db.files.find()},
+    }
+
+
+def test_unchanged_page_writes_nothing(db):
+    save()
+    before = snapshot(db)
+
+    result = save()
+
+    # 4 headings, 2 links and 1 file stored and offered again, none rewritten
+    assert result['writes_avoided'] == 2 * (4 + 2 + 1)
+    assert snapshot(db) == before
+
+
+def test_diff_only_touches_changed_rows(db):
+    save()
+    before = snapshot(db)
+
+    result = save(HTML.replace('<h2>First</h2>', '<h2>Renamed</h2>')
+                      .replace('>Two</a>', '>Second link</a>')
+                      .replace(' <a href="/one">One</a>', ''))
+    after = snapshot(db)
+
+    assert result['failed'] == []
+    assert set(after['headings']) == {'Title', 'Renamed', 'Nested', 'Second'}
+    for title in ('Title', 'Nested', 'Second'):
+        assert after['headings'][title]['_id'] == before['headings'][title]['_id']
+    # The nested heading is re-linked to its new parent instead of re-inserted
+    assert after['headings']['Nested']['parent_id'] == after['headings']['Renamed']['_id']
+    # Links are matched on URL and updated in place, removed ones are deleted
+    assert set(after['links']) == {'http://a/two'}
+    assert after['links']['http://a/two']['_id'] == before['links']['http://a/two']['_id']
+    assert after['links']['http://a/two']['title'] == 'Second link'
+    assert after['files'] == before['files']
+
+
+@pytest.mark.parametrize('write_mode', ['diff', 'replace'])
+def test_write_modes_store_the_same_rows(db, write_mode):
+    save(write_mode=write_mode)
+    save(HTML.replace('<h2>Second</h2>', '<h2>Second</h2><h3>Added</h3>'), write_mode=write_mode)
+
+    headings = sorted((row['title'], row['level']) for row in db.headings.find())
+    assert headings == [('Added', 3), ('First', 2), ('Nested', 3), ('Second', 2), ('Title', 1)]
+    assert db.links.count_documents({}) == 2
+    assert db.files.count_documents({}) == 1
+
+
+def test_replace_mode_rewrites_everything(db):
+    save(write_mode='replace')
+    before = snapshot(db)
+
+    result = save(write_mode='replace')
+
+    assert result['writes_avoided'] == 0
+    assert {row['_id'] for row in snapshot(db)['headings'].values()}.isdisjoint(
+        row['_id'] for row in before['headings'].values()
+    )
+
+
+def test_page_meta_leaves_content_out(db):
+    db.pages.insert_many([
+        {'url': 'http://a/1', 'checksum': 'c1', 'content_html': HTML, 'content_text': 'text'},
+        {'url': 'http://a/2', 'checksum': 'c2', 'content_html': HTML},
+    ])
+
+    meta = get_pages_meta(['http://a/1', 'http://a/2', 'http://a/missing'])
+
+    assert set(meta) == {'http://a/1', 'http://a/2'}
+    assert meta['http://a/1']['checksum'] == 'c1'
+    assert 'content_html' not in meta['http://a/1'] and 'content_text' not in meta['http://a/1']
+    assert get_page_meta('http://a/2')['checksum'] == 'c2'
+
+
+def test_page_meta_of_queued_urls_is_prefetched(make_service, db, monkeypatch):
+    service = make_service()
+    for index in range(1, 4):
+        service.frontier.push(f'http://a/{index}', 1)
+    queries = []
+
+    def counting(urls):
+        queries.append(urls)
+        return get_pages_meta(urls)
+
+    monkeypatch.setattr(base_scraper_service, 'get_pages_meta', counting)
+
+    async def lookups():
+        return [await service.load_page_meta(f'http://a/{index}') for index in range(1, 4)]
+
+    assert asyncio.run(lookups()) == [None, None, None]
+    assert len(queries) == 1
+    assert set(queries[0]) >= {'http://a/1', 'http://a/2', 'http://a/3'}
@@ -0,0 +1,76 @@
+import random
+
+from web_scraper.crawler.dedup import (
+    SimHashIndex, content_fingerprint, from_signed64, hamming_distance, normalize_text, simhash, to_signed64
+)
+
+WORDS = 'retina cornea lens glaucoma cataract macula optic nerve pressure vision patient treatment'.split()
+
+
+def article(seed: int, length: int = 400) -> str:
+    rng = random.Random(seed)
+    return ' '.join(rng.choice(WORDS) for _ in range(length))
+
+
+def test_fingerprint_ignores_case_punctuation_and_whitespace():
+    assert normalize_text('  Hello,\n WORLD!  ') == 'hello world'
+    assert content_fingerprint('Hello, World!') == content_fingerprint('hello   world')
+    assert content_fingerprint('hello world') != content_fingerprint('hello there')
+
+
+def test_simhash_of_small_edit_is_near():
+    text = article(1)
+    edited = text.replace('retina', 'Retina!', 1) + ' updated yesterday'
+
+    assert simhash(text) == simhash(text)
+    assert hamming_distance(simhash(text), simhash(edited)) <= 3
+
+
+def test_simhash_of_different_text_is_far():
+    assert hamming_distance(simhash(article(1)), simhash(article(2))) > 10
+
+
+def test_simhash_of_short_and_empty_text():
+    assert simhash('') == 0
+    assert simhash('two words') == simhash('Two, words.')
+
+
+def test_hamming_distance():
+    assert hamming_distance(0, 0) == 0
+    assert hamming_distance(0b1011, 0b0001) == 2
+    assert hamming_distance(0, (1 << 64) - 1) == 64
+
+
+def test_signed64_round_trip():
+    for value in (0, 1, (1 << 63) - 1, 1 << 63, (1 << 64) - 1):
+        stored = to_signed64(value)
+        assert -(1 << 63) <= stored < 1 << 63
+        assert from_signed64(stored) == value
+
+
+def test_index_finds_hashes_within_max_distance():
+    index = SimHashIndex(max_distance=3)
+    value = simhash(article(1))
+    index.add('http://a/1', value)
+
+    # Flip bits in different bands
+    assert index.find(value ^ (1 << 0 | 1 << 20 | 1 << 40)) == 'http://a/1'
+    assert index.find(value ^ (1 << 0 | 1 << 20 | 1 << 40 | 1 << 60)) is None
+    assert index.find(value, exclude='http://a/1') is None
+    assert len(index) == 1
+
+
+def test_index_matches_brute_force():
+    rng = random.Random(7)
+    index = SimHashIndex(max_distance=3)
+    stored = {f'http://a/{i}': rng.getrandbits(64) for i in range(200)}
+    for key, value in stored.items():
+        index.add(key, value)
+
+    for key, value in list(stored.items())[:50]:
+        probe = value
+        for bit in rng.sample(range(64), rng.randint(0, 5)):
+            probe ^= 1 << bit
+        near = {other for other, candidate in stored.items() if hamming_distance(probe, candidate) <= 3}
+        found = index.find(probe)
+        assert (found in near) if near else found is None
@@ -0,0 +1,218 @@
+import asyncio
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+
+from web_scraper.config.config import Config
+from web_scraper.crawler.distributed import DEFERRED, DONE, FAILED, LEASED, PENDING, MongoFrontier
+from web_scraper.fetch import FetchResult
+from web_scraper.services import base_scraper_service
+
+
+@pytest.fixture
+def atomic_claims(db, monkeypatch):
+    # A MongoDB server applies find_one_and_update atomically, mongomock finds and
+    # updates in two steps; serialize it so workers in threads behave as against a server
+    import mongomock
+
+    lock = threading.Lock()
+    find_one_and_update = mongomock.collection.Collection.find_one_and_update
+
+    def atomic(self, *args, **kwargs):
+        with lock:
+            return find_one_and_update(self, *args, **kwargs)
+
+    monkeypatch.setattr(mongomock.collection.Collection, 'find_one_and_update', atomic)
+    monkeypatch.setattr(Config, 'FRONTIER_POLL_INTERVAL', 0.05)
+    return db
+
+
+def frontier(worker_id='w1', **options):
+    return MongoFrontier('test', worker_id=worker_id, **options)
+
+
+def seed(shared, *urls):
+    for url in urls:
+        shared.push(url)
+    shared.flush()
+
+
+def state(db, url):
+    return db.frontier.find_one({'url': url})
+
+
+def test_claim_leases_each_url_once(atomic_claims):
+    first, second = frontier('w1'), frontier('w2')
+    seed(first, 'http://a/1', 'http://a/2')
+    seed(second, 'http://a/2', 'http://a/3')
+
+    claimed = []
+    for worker in (first, second, first, second):
+        entry = worker.claim()
+        if entry:
+            claimed.append(entry.url)
+
+    assert sorted(claimed) == ['http://a/1', 'http://a/2', 'http://a/3']
+    assert atomic_claims.frontier.count_documents({'state': LEASED}) == 3
+
+
+def test_deferred_url_is_claimed_again_when_due(atomic_claims):
+    shared = frontier()
+    seed(shared, 'http://a/1', 'http://a/2')
+    entry = shared.claim()
+
+    assert shared.defer(entry.url, delay=60)
+    assert state(atomic_claims, entry.url)['state'] == DEFERRED
+    # Not due yet: the other pending URL comes first
+    assert shared.claim().url == 'http://a/2'
+    assert shared.claim() is None
+    assert shared.outstanding()
+
+    atomic_claims.frontier.update_one({'url': entry.url}, {'$set': {'retry_at': datetime.now()}})
+    again = shared.claim()
+
+    assert again.url == entry.url
+    assert shared.is_retry(entry.url)
+    assert shared.retries_of(entry.url) == 1
+    # The retry does not count as a lease that went wrong
+    assert state(atomic_claims, entry.url)['attempts'] == 1
+
+
+def test_due_retry_is_claimed_before_pending_urls(atomic_claims):
+    shared = frontier()
+    seed(shared, 'http://a/1')
+    shared.defer(shared.claim().url, delay=0)
+    seed(shared, 'http://a/2')
+
+    assert shared.claim(retries_only=True).url == 'http://a/1'
+    assert shared.claim(retries_only=True) is None
+    assert shared.claim().url == 'http://a/2'
+
+
+def test_defer_gives_up_after_max_attempts(atomic_claims):
+    shared = frontier()
+    seed(shared, 'http://a/1')
+
+    results = []
+    for _ in range(3):
+        shared.claim()
+        results.append(shared.defer('http://a/1', delay=0, max_attempts=3))
+
+    assert results == [True, True, False]
+    assert state(atomic_claims, 'http://a/1')['state'] == FAILED
+    assert not shared.outstanding()
+
+
+def test_uncounted_deferrals_never_give_up(atomic_claims):
+    shared = frontier()
+    seed(shared, 'http://a/1')
+
+    for _ in range(5):
+        shared.claim()
+        assert shared.defer('http://a/1', delay=0, count_attempt=False, max_attempts=2)
+
+
+@pytest.mark.parametrize('backend', ['memory', 'bloom', 'disk'])
+def test_pushed_urls_are_remembered_in_the_seen_backend(atomic_claims, backend):
+    shared = frontier(seen_backend=backend)
+
+    assert shared.push('http://a/1') and not shared.push('http://a/1')
+    shared.mark_seen('http://a/2')
+    assert not shared.push('http://a/2')
+    assert shared.seen_count == 2 and 'http://a/1' in shared
+    assert shared.seen_memory > 0
+
+    shared.reset()
+
+    assert shared.push('http://a/1')
+    shared.close()
+
+
+def test_complete_only_touches_own_leases(atomic_claims):
+    first, second = frontier('w1'), frontier('w2')
+    seed(first, 'http://a/1', 'http://a/2')
+    first.claim()
+    second.claim()
+
+    first.complete(['http://a/1', 'http://a/2'])
+
+    assert state(atomic_claims, 'http://a/1')['state'] == DONE
+    assert state(atomic_claims, 'http://a/2')['state'] == LEASED
+
+
+def test_expired_lease_is_requeued(atomic_claims):
+    shared = frontier(lease_seconds=60)
+    seed(shared, 'http://a/1')
+    shared.claim()
+    atomic_claims.frontier.update_one({'url': 'http://a/1'},
+                                      {'$set': {'lease_expires': datetime.now() - timedelta(seconds=1)}})
+
+    assert frontier('w2').claim().url == 'http://a/1'
+    assert state(atomic_claims, 'http://a/1')['worker'] == 'w2'
+
+
+def distributed_service(make_service, worker_id, fetched):
+    service = make_service()
+    service.create_shared_frontier = lambda shard=None: MongoFrontier(
+        service.site_id, shard=shard, canonicalize=service.canonicalize_url,
+        priority=service.url_priority, worker_id=worker_id
+    )
+    fetch = service.fetch
+
+    async def counting(url, *args, **kwargs):
+        fetched[url] += 1
+        return await fetch(url, *args, **kwargs)
+
+    service.fetch = counting
+    return service
+
+
+def test_two_workers_never_process_a_url_twice(make_service, atomic_claims):
+    fetched = {'w1': Counter(), 'w2': Counter()}
+    workers = [distributed_service(make_service, worker_id, fetched[worker_id]) for worker_id in fetched]
+
+    async def run():
+        await asyncio.gather(*(worker.crawl_distributed(max_pages=100, concurrency=3) for worker in workers))
+
+    asyncio.run(run())
+
+    both = fetched['w1'] + fetched['w2']
+    assert set(both.values()) == {1}
+    assert fetched['w1'] and fetched['w2']
+    assert atomic_claims.frontier.count_documents({'state': {'$in': [PENDING, LEASED, DEFERRED]}}) == 0
+    assert atomic_claims.pages.count_documents({}) == sum(worker.stats['saved'] for worker in workers)
+
+
+def test_retry_is_not_counted_against_the_page_limit(make_service, fixture_site, atomic_claims, monkeypatch):
+    _, base_url = fixture_site
+    monkeypatch.setattr(base_scraper_service, 'backoff_delay', lambda attempt, **options: 0.0)
+    fetched = Counter()
+    service = distributed_service(make_service, 'w1', fetched)
+    fetch = service.fetch
+
+    async def unavailable_once(url, *args, **kwargs):
+        if url == base_url and not fetched[url]:
+            fetched[url] += 1
+            return FetchResult(url=url, final_url=url, status_code=503, html='')
+        return await fetch(url, *args, **kwargs)
+
+    service.fetch = unavailable_once
+    asyncio.run(service.crawl_distributed(max_pages=3))
+
+    assert fetched[base_url] == 2
+    assert service.stats['retried'] == 1
+    assert service.stats['processed'] == 3
+    assert state(atomic_claims, base_url)['state'] == DONE
+
+
+def test_distributed_crawl_needs_a_shard():
+    from click.testing import CliRunner
+
+    from web_scraper.cli import cli
+
+    result = CliRunner().invoke(cli, ['crawl', '--site', 'eyewiki', '--distributed'])
+
+    assert result.exit_code == 2
+    assert '--shard' in result.output
@@ -0,0 +1,164 @@
+import asyncio
+import hashlib
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from click.testing import CliRunner
+
+from web_scraper.database.file_store import DirectoryFileStore
+from web_scraper.fetch import FileDownloader
+
+DOCUMENT = bytes(range(256)) * 400
+ETAG = '"v1"'
+
+
+@pytest.fixture
+def document_server():
+    """Serves DOCUMENT at /doc.pdf with an ETag and byte ranges; the first response can be cut short."""
+    state = {'requests': [], 'cut_after': None}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            state['requests'].append(dict(self.headers))
+            if self.path != '/doc.pdf':
+                self.send_error(404)
+                return
+            if self.headers.get('If-None-Match') == ETAG:
+                self.send_response(304)
+                self.send_header('ETag', ETAG)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            start = 0
+            if self.headers.get('Range') and self.headers.get('If-Range') == ETAG:
+                start = int(self.headers['Range'].split('=')[1].rstrip('-'))
+            body = DOCUMENT[start:]
+            self.send_response(206 if start else 200)
+            self.send_header('ETag', ETAG)
+            self.send_header('Content-Type', 'application/pdf')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            cut_after, state['cut_after'] = state['cut_after'], None
+            if cut_after is not None:
+                # The connection drops halfway through the file
+                self.wfile.write(body[:cut_after])
+                self.wfile.flush()
+                self.close_connection = True
+                return
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    state['url'] = f'http://127.0.0.1:{server.server_address[1]}/doc.pdf'
+    yield state
+    server.shutdown()
+    server.server_close()
+
+
+def download(url, workdir, **options):
+    async def run():
+        store = DirectoryFileStore(str(workdir / 'files'))
+        async with FileDownloader(store=store, partial_dir=str(workdir / 'partial'), **options) as downloader:
+            return await downloader.download(url), downloader.stats
+
+    return asyncio.run(run())
+
+
+def test_download_is_stored_under_its_hash_and_revalidated(db, workdir, document_server):
+    outcome, stats = download(document_server['url'], workdir, chunk_size=1024)
+
+    assert outcome == 'downloaded'
+    record = db.downloads.find_one({'url': document_server['url']})
+    assert record['state'] == 'done' and record['size'] == len(DOCUMENT)
+    assert record['content_key'] == hashlib.sha256(DOCUMENT).hexdigest()
+    with open(record['location'], 'rb') as file:
+        assert file.read() == DOCUMENT
+    assert not os.listdir(workdir / 'partial')
+
+    outcome, stats = download(document_server['url'], workdir)
+
+    assert outcome == 'unchanged'
+    assert document_server['requests'][-1]['If-None-Match'] == ETAG
+
+
+def test_interrupted_download_resumes_with_a_range_request(db, workdir, document_server):
+    document_server['cut_after'] = 30000
+
+    outcome, stats = download(document_server['url'], workdir, chunk_size=1024)
+
+    assert outcome == 'downloaded'
+    assert stats['files_resumed'] == 1
+    resumed = document_server['requests'][-1]
+    assert resumed['Range'].startswith('bytes=') and resumed['If-Range'] == ETAG
+    # Only the missing bytes were transferred again
+    assert stats['file_bytes'] < len(DOCUMENT)
+    record = db.downloads.find_one({'url': document_server['url']})
+    assert record['content_key'] == hashlib.sha256(DOCUMENT).hexdigest()
+
+
+def test_files_above_the_size_limit_are_skipped(db, workdir, document_server):
+    outcome, stats = download(document_server['url'], workdir, max_bytes=1000, attempts=1)
+
+    assert outcome == 'failed'
+    assert stats['files_failed'] == 1
+    assert db.downloads.find_one({'url': document_server['url']})['status_code'] == 413
+    assert not os.listdir(workdir / 'partial')
+
+
+def test_submit_sends_download_files_only_when_given(monkeypatch):
+    from web_scraper import cli
+
+    requests = []
+
+    class Response:
+        status_code = 202
+
+        def json(self):
+            return {'id': 'job', 'limit': 5, 'concurrency': 1, 'state': 'queued'}
+
+    class Client:
+        def __init__(self, **options):
+            pass
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc_info):
+            pass
+
+        def post(self, path, json):
+            requests.append(json)
+            return Response()
+
+    monkeypatch.setattr('httpx.Client', Client)
+    runner = CliRunner()
+    for flag in ([], ['--download-files'], ['--no-download-files']):
+        assert runner.invoke(cli.cli, ['submit', '--site', 'eyewiki', *flag]).exit_code == 0
+
+    assert [request.get('download_files') for request in requests] == [None, True, False]
+
+
+def test_chunks_are_written_in_batches_off_the_event_loop(db, workdir, document_server, monkeypatch):
+    from web_scraper.fetch import downloader
+
+    writes = []
+    write_chunks = downloader._write_chunks
+
+    def recording(file, hasher, chunks):
+        writes.append((threading.current_thread() is threading.main_thread(), sum(map(len, chunks))))
+        write_chunks(file, hasher, chunks)
+
+    monkeypatch.setattr(downloader, '_write_chunks', recording)
+    outcome, stats = download(document_server['url'], workdir, chunk_size=1024, write_size=32 * 1024)
+
+    assert outcome == 'downloaded'
+    assert not any(on_loop for on_loop, _ in writes)
+    assert sum(size for _, size in writes) == len(DOCUMENT)
+    assert len(writes) <= len(DOCUMENT) // (32 * 1024) + 1
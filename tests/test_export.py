@@ -0,0 +1,120 @@
+import gzip
+import json
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from web_scraper.config.config import Config
+from web_scraper.database.client import save_page_bundles
+from web_scraper.export import corpus, export_site, heading_tree, read_watermark
+from web_scraper.extraction import get_engine
+
+HTML = """<html><body>
+<h1>Title</h1><p>Intro <a href="/one">One</a></p>
+<h2>First</h2><h3>Nested</h3><p>Text</p>
+<h2>Second</h2><p>More</p>
+</body></html>"""
+
+
+def save(db, url, age_seconds, site_id='test'):
+    extraction = get_engine('bs4').extract(HTML, url)
+    page = {'url': url, 'site_id': site_id, 'status_code': 200, 'checksum': url, 'content_text': 'Text'}
+    save_page_bundles([{'page': page, 'headings': extraction.headings, 'links': extraction.links, 'files': []}])
+    # Saved that long ago, exports leave out pages saved within EXPORT_SETTLE_SECONDS
+    db.pages.update_one({'url': url}, {'$set': {'updated_at': datetime.now() - timedelta(seconds=age_seconds)}})
+
+
+def read_export(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as file:
+        return [json.loads(line) for line in file]
+
+
+def test_heading_tree_orders_parents_first_with_paths():
+    root, child, grandchild, orphan = (ObjectId() for _ in range(4))
+    headings = [
+        {'_id': grandchild, 'parent_id': child, 'title': 'C', 'level': 3},
+        {'_id': root, 'parent_id': None, 'title': 'A', 'level': 1},
+        {'_id': child, 'parent_id': root, 'title': 'B', 'level': 2},
+        # Its parent was deleted, it becomes a root
+        {'_id': orphan, 'parent_id': ObjectId(), 'title': 'D', 'level': 2},
+    ]
+
+    tree = heading_tree(headings)
+
+    assert [(heading['title'], heading['path']) for heading in tree] == [
+        ('A', []), ('B', ['A']), ('C', ['A', 'B']), ('D', [])
+    ]
+    assert tree[1]['parent_id'] == str(root) and tree[3]['parent_id'] is None
+
+
+def test_export_is_incremental_from_the_watermark(db, workdir, monkeypatch):
+    output = str(workdir / 'exports')
+    save(db, 'http://a/1', age_seconds=600)
+    save(db, 'http://a/2', age_seconds=300)
+    save(db, 'http://a/other', age_seconds=300, site_id='other')
+
+    first = export_site('test', output)
+
+    records = read_export(first['path'])
+    assert [record['url'] for record in records] == ['http://a/1', 'http://a/2']
+    assert [heading['title'] for heading in records[0]['headings']] == ['Title', 'First', 'Nested', 'Second']
+    assert records[0]['headings'][2]['path'] == ['Title', 'First']
+    assert records[0]['links'][0]['url'] == 'http://a/one'
+    assert read_watermark(output, 'test') == first['until']
+
+    # Saved again after the first export, and a page saved too recently to export yet
+    db.pages.update_one({'url': 'http://a/1'}, {'$set': {'updated_at': first['until'] + timedelta(seconds=1)}})
+    save(db, 'http://a/3', age_seconds=0)
+    monkeypatch.setattr(Config, 'EXPORT_SETTLE_SECONDS', Config.EXPORT_SETTLE_SECONDS - 10)
+    second = export_site('test', output)
+
+    assert second['since'] == first['until']
+    assert [record['url'] for record in read_export(second['path'])] == ['http://a/1']
+    # Everything settled, whatever the watermark
+    assert export_site('test', output, full=True)['pages'] == 2
+
+
+def test_empty_export_moves_the_watermark_without_a_file(db, workdir):
+    output = str(workdir / 'exports')
+
+    result = export_site('test', output)
+
+    assert result['pages'] == 0 and result['path'] is None
+    assert read_watermark(output, 'test') == result['until']
+    assert os.listdir(output) == ['.watermark-test.json']
+
+
+def test_interrupted_export_keeps_the_watermark(db, workdir, monkeypatch):
+    output = str(workdir / 'exports')
+    save(db, 'http://a/1', age_seconds=600)
+    first = export_site('test', output)
+    save(db, 'http://a/2', age_seconds=0)
+    db.pages.update_one({'url': 'http://a/2'}, {'$set': {'updated_at': first['until'] + timedelta(seconds=1)}})
+
+    def failing(*args, **kwargs):
+        yield {'url': 'http://a/2'}
+        raise ConnectionError('primary stepped down')
+
+    monkeypatch.setattr(corpus, 'iter_corpus', failing)
+    with pytest.raises(ConnectionError):
+        export_site('test', output)
+
+    assert read_watermark(output, 'test') == first['until']
+    # Only the finished file of the first export, the partial one is not mistaken for it
+    finished = [name for name in os.listdir(output) if name.endswith('.jsonl.gz')]
+    assert finished == [os.path.basename(first['path'])]
+
+
+def test_parquet_export(db, workdir):
+    parquet = pytest.importorskip('pyarrow.parquet')
+    save(db, 'http://a/1', age_seconds=600)
+
+    result = export_site('test', str(workdir / 'exports'), output_format='parquet')
+
+    table = parquet.read_table(result['path'])
+    assert table.column('url').to_pylist() == ['http://a/1']
+    assert [heading['title'] for heading in table.column('headings').to_pylist()[0]] == [
+        'Title', 'First', 'Nested', 'Second'
+    ]
@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from web_scraper.extraction import get_engine
+from web_scraper.extraction.parity import compare_extractions
+
+BASE_URL = 'http://wiki.test/wiki/Page'
+
+WIKI = """<!DOCTYPE html>
+<html><head><title>Page</title><style>h1 { color: red }</style></head>
+<body>
+<div id="mw-content-text">
+  <h1 id="top">Main &amp; <i>Title</i></h1>
+  <p>Intro with&nbsp;entities &lt;b&gt; and <b>bold</b> text.</p>
+  <h3><span class="mw-headline" id="Skipped">Skipped   level</span><span class="mw-editsection">[edit]</span></h3>
+  <p>Text <a href="Other_page">relative</a> and <a href="/wiki/Abs#frag">absolute</a>.</p>
+  <h2><span class="mw-headline" id="Second">Second</span></h2>
+  <script>document.write('<h2>Not a heading</h2>');</script>
+  <h4></h4>
+  <h4>Deep <!-- comment --> heading</h4>
+  <ul><li><a href="../files/Report.PDF">Report</a><li><a href="data.csv?x=1">CSV</a></ul>
+  <p><a href="mailto:someone@wiki.test">Mail</a> <a href="javascript:void(0)">JS</a> <a href="#local">Local</a></p>
+  <h2>Café <a href="/wiki/Caf%C3%A9">über</a></h2>
+  <p>Unclosed paragraph
+  <p>Another <a href="https://other.test/x">external</a>
+  <template><h2>Template heading</h2></template>
+  <h6>Last</h6>
+</div>
+<div class="navbox"><h2>Navigation</h2><a href="/wiki/Nav">Nav</a></div>
+</body></html>
+"""
+
+FRAGMENTS = [
+    '',
+    '<p>No headings or links at all</p>',
+    '<h2>Only a heading</h2>',
+    '<?xml version="1.0" encoding="utf-8"?><html><body><h1>XML declaration</h1></body></html>',
+    '<html><body><h1>A</h1><h1>A</h1><a href="/a">A</a><a href="/a">A</a></body></html>',
+    '<body><h2>\n   Spread\n   over   lines  </h2><a href="  /padded  ">  padded  </a></body>',
+]
+
+
+def extract_all(html, **options):
+    return [get_engine(name, **options).extract(html, BASE_URL) for name in ('bs4', 'lxml')]
+
+
+@pytest.mark.parametrize('options', [
+    {},
+    {'content_selector': 'div#mw-content-text', 'content_exclude': ['span.mw-editsection']},
+    {'content_selector': 'div#missing'},
+])
+def test_static_engines_agree_on_tricky_markup(options):
+    reference, other = extract_all(WIKI, **options)
+
+    assert compare_extractions(reference, other) == []
+    # Make sure the comparison is not vacuous
+    assert len(reference.headings) >= 7
+    assert reference.files and reference.links
+
+
+@pytest.mark.parametrize('html', FRAGMENTS)
+def test_static_engines_agree_on_fragments(html):
+    reference, other = extract_all(html)
+
+    assert compare_extractions(reference, other) == []
+
+
+def test_compare_extractions_reports_differences():
+    reference = get_engine('bs4').extract(WIKI, BASE_URL)
+    changed = get_engine('lxml').extract(WIKI.replace('Second', 'Changed'), BASE_URL)
+
+    differences = compare_extractions(reference, changed)
+
+    assert differences and differences[0].startswith('headings[')
+
+
+def test_dom_engine_agrees_with_static_engines():
+    playwright_api = pytest.importorskip('playwright.async_api')
+
+    async def run():
+        async with playwright_api.async_playwright() as playwright:
+            try:
+                browser = await playwright.chromium.launch()
+            except Exception as error:
+                pytest.skip(f"Chromium not available: {error}")
+            try:
+                page = await browser.new_page()
+                await page.set_content(WIKI)
+                options = {'content_selector': 'div#mw-content-text', 'content_exclude': ['span.mw-editsection']}
+                dom = await get_engine('dom', **options).extract_from_page(page, BASE_URL)
+                return dom, get_engine('bs4', **options).extract(WIKI, BASE_URL)
+            finally:
+                await browser.close()
+
+    dom, reference = asyncio.run(run())
+
+    assert compare_extractions(reference, dom) == []
@@ -0,0 +1,149 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from web_scraper.fetch import Fetcher, FetchResult, HttpFetcher, HybridFetcher, looks_like_js_shell
+from web_scraper.fetch.validators import (
+    conditional_headers, is_fresh, response_validators, revalidated_validators
+)
+
+ARTICLE = '<html><body><h1>Static</h1><p>{}</p></body></html>'.format('Rendered on the server. ' * 20)
+SHELL = '<html><body><div id="root"></div><script src="/app.js"></script></body></html>'
+
+PAGES = {
+    '/static': (200, ARTICLE),
+    '/app': (200, SHELL),
+    '/blocked': (403, 'Forbidden'),
+}
+
+
+@pytest.fixture
+def app_url(serve_pages):
+    return serve_pages(PAGES)
+
+
+class FakeBrowser(Fetcher):
+    """Stands in for Playwright: renders every page to the same article."""
+    name = 'browser'
+
+    def __init__(self):
+        self.fetched = []
+
+    async def fetch(self, url, headers=None):
+        self.fetched.append(url)
+        return FetchResult(url=url, final_url=url, status_code=200, html=ARTICLE, fetcher=self.name)
+
+
+def fetch(fetcher, url, headers=None):
+    async def run():
+        async with fetcher:
+            return await fetcher.fetch(url, headers)
+
+    return asyncio.run(run())
+
+
+def test_http_fetcher_gets_static_page(fixture_site):
+    _, base_url = fixture_site
+
+    result = fetch(HttpFetcher(), base_url + 'Article_1')
+
+    assert result.status_code == 200
+    assert result.fetcher == 'http'
+    assert '<h1 id="firstHeading">Article 1</h1>' in result.html
+    assert result.headers['etag']
+
+
+def test_http_fetcher_revalidates_with_etag(fixture_site):
+    _, base_url = fixture_site
+    first = fetch(HttpFetcher(), base_url + 'Article_1')
+
+    second = fetch(HttpFetcher(), base_url + 'Article_1', {'If-None-Match': first.headers['etag']})
+
+    assert second.status_code == 304
+    assert second.html == ''
+
+
+def test_hybrid_fetcher_keeps_static_pages_on_http(app_url):
+    browser = FakeBrowser()
+    hybrid = HybridFetcher(HttpFetcher(), browser)
+
+    result = fetch(hybrid, app_url + '/static')
+
+    assert result.fetcher == 'http'
+    assert browser.fetched == []
+    assert hybrid.browser_fallbacks == 0
+
+
+@pytest.mark.parametrize('path', ['/app', '/blocked'])
+def test_hybrid_fetcher_falls_back_to_browser(app_url, path):
+    browser = FakeBrowser()
+    hybrid = HybridFetcher(HttpFetcher(), browser)
+
+    result = fetch(hybrid, app_url + path)
+
+    assert result.fetcher == 'browser'
+    assert browser.fetched == [app_url + path]
+    assert hybrid.browser_fallbacks == 1
+
+
+def test_hybrid_fetcher_sends_js_urls_straight_to_browser(app_url):
+    browser = FakeBrowser()
+    hybrid = HybridFetcher(HttpFetcher(), browser, needs_js=lambda url: url.endswith('/static'))
+
+    result = fetch(hybrid, app_url + '/static')
+
+    assert result.fetcher == 'browser'
+    assert hybrid.browser_fallbacks == 0
+
+
+def test_looks_like_js_shell():
+    assert looks_like_js_shell(SHELL)
+    assert looks_like_js_shell('<html><body><noscript>Please enable JavaScript</noscript>' + 'x ' * 500)
+    assert not looks_like_js_shell(ARTICLE)
+
+
+def test_recrawl_revalidates_unchanged_pages(make_service, db):
+    asyncio.run(make_service().crawl(max_pages=5, concurrency=2))
+
+    service = make_service()
+    asyncio.run(service.crawl(max_pages=5, concurrency=2))
+
+    assert service.stats['revalidated'] == 5
+    assert service.stats['saved'] == 0
+    assert db.pages.count_documents({}) == 5
+
+
+def test_response_validators():
+    validators = response_validators({
+        'ETag': '"abc"', 'Last-Modified': 'Tue, 14 Nov 2023 22:13:20 GMT', 'Cache-Control': 'public, max-age=600'
+    })
+
+    assert validators == {'etag': '"abc"', 'last_modified': 'Tue, 14 Nov 2023 22:13:20 GMT', 'max_age': 600}
+    assert response_validators({'cache-control': 's-maxage=5, max-age="60"'})['max_age'] == 60
+    assert response_validators({'cache-control': 'no-cache, max-age=600'})['max_age'] is None
+    assert response_validators({}) == {'etag': None, 'last_modified': None, 'max_age': None}
+
+
+def test_revalidated_validators_keep_what_a_304_leaves_out():
+    assert revalidated_validators({'ETag': '"v2"'}) == {'etag': '"v2"'}
+    assert revalidated_validators({'cache-control': 'no-store'}) == {'max_age': None}
+    assert revalidated_validators({}) == {}
+
+
+def test_conditional_headers():
+    assert conditional_headers(None) == {}
+    assert conditional_headers({'etag': '"abc"', 'last_modified': 'yesterday'}) == {
+        'If-None-Match': '"abc"', 'If-Modified-Since': 'yesterday'
+    }
+    assert conditional_headers({'etag': None, 'last_modified': None}) == {}
+
+
+def test_is_fresh():
+    fetched_at = datetime(2024, 1, 1, 12, 0)
+    page = {'max_age': 600, 'fetched_at': fetched_at}
+
+    assert is_fresh(page, now=fetched_at + timedelta(seconds=599))
+    assert not is_fresh(page, now=fetched_at + timedelta(seconds=600))
+    assert not is_fresh({'max_age': None, 'fetched_at': fetched_at}, now=fetched_at)
+    assert not is_fresh(None)
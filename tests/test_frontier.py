@@ -0,0 +1,56 @@
+from web_scraper.crawler.frontier import Frontier, FrontierEntry
+from web_scraper.utils.helpers import canonicalize_url
+
+
+def test_canonicalize_url_normalizes_spellings():
+    assert canonicalize_url('HTTP://EyeWiki.org:80/Glaucoma/?b=2&a=1#Diagnosis') == 'http://eyewiki.org/Glaucoma?a=1&b=2'
+    assert canonicalize_url('https://eyewiki.org:443//a//b/') == 'https://eyewiki.org/a/b'
+    assert canonicalize_url('https://eyewiki.org') == 'https://eyewiki.org/'
+
+
+def test_canonicalize_url_keeps_meaningful_differences():
+    assert canonicalize_url('https://eyewiki.org:8443/a') == 'https://eyewiki.org:8443/a'
+    assert canonicalize_url('https://eyewiki.org/A') != canonicalize_url('https://eyewiki.org/a')
+    assert canonicalize_url('https://eyewiki.org/a?q=') == 'https://eyewiki.org/a?q='
+
+
+def test_canonicalize_url_drops_tracking_parameters():
+    url = 'https://eyewiki.org/a?utm_source=x&UTM_Medium=y&gclid=1&page=2&fbclid=3'
+    assert canonicalize_url(url) == 'https://eyewiki.org/a?page=2'
+    assert canonicalize_url('https://eyewiki.org/a?ref=x', tracking_params=('ref',)) == 'https://eyewiki.org/a'
+
+
+def test_frontier_pops_lowest_priority_first_in_insertion_order():
+    frontier = Frontier()
+    frontier.push('https://a.org/deep', depth=2)
+    frontier.push('https://a.org/first', depth=1)
+    frontier.push('https://a.org/second', depth=1)
+    frontier.push('https://a.org/', depth=0)
+
+    assert [frontier.pop().url for _ in range(4)] == [
+        'https://a.org/', 'https://a.org/first', 'https://a.org/second', 'https://a.org/deep'
+    ]
+    assert frontier.pop() is None
+
+
+def test_frontier_never_queues_a_url_twice():
+    frontier = Frontier()
+    assert frontier.push('https://a.org/page')
+    assert not frontier.push('https://A.org/page/#top')
+    assert frontier.pop() == FrontierEntry('https://a.org/page', 0)
+    # Still remembered after it was popped
+    assert not frontier.push('https://a.org/page')
+    assert 'https://a.org/page?utm_source=x' in frontier
+    assert len(frontier) == 0
+
+
+def test_frontier_custom_priority_peek_and_snapshot():
+    frontier = Frontier(priority=lambda url, depth: 0 if '/Category:' in url else 1)
+    frontier.push('https://a.org/article')
+    frontier.push('https://a.org/Category:Cornea')
+    frontier.mark_seen('https://a.org/done')
+
+    assert [entry.url for entry in frontier.peek(1)] == ['https://a.org/Category:Cornea']
+    assert [entry.url for entry in frontier.snapshot()] == ['https://a.org/Category:Cornea', 'https://a.org/article']
+    assert not frontier.push('https://a.org/done')
+    assert frontier.seen_count == 3
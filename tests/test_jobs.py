@@ -0,0 +1,99 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from web_scraper.crawler.dedup import SimHashIndex, to_signed64
+from web_scraper.daemon import JobManager, jobs
+from web_scraper.database.client import get_page_simhashes
+from web_scraper.search import SearchIndex
+from web_scraper.services import EyewikiService
+
+
+def store_page(db, url, value):
+    db.pages.insert_one({'url': url, 'site_id': 'eyewiki', 'simhash': to_signed64(value),
+                         'duplicate_of': None, 'updated_at': datetime.now()})
+
+
+def test_near_duplicate_index_is_loaded_once_and_topped_up(db, monkeypatch):
+    calls = []
+
+    def counting(site_id, since=None):
+        calls.append(since)
+        return get_page_simhashes(site_id, since)
+
+    monkeypatch.setattr(jobs, 'get_page_simhashes', counting)
+    store_page(db, 'http://a/1', 0xFFFF)
+
+    async def refresh_twice():
+        manager = JobManager()
+        try:
+            first = await manager._near_duplicates_for('eyewiki')
+            store_page(db, 'http://a/2', 0xFFFF << 32)
+            second = await manager._near_duplicates_for('eyewiki')
+            return first, second
+        finally:
+            await manager.close()
+
+    first, second = asyncio.run(refresh_twice())
+
+    assert first is second
+    assert len(second) == 2
+    assert second.find(0xFFFF << 32, exclude='http://a/1') == 'http://a/2'
+    # The second refresh only reads pages saved since the first
+    assert calls[0] is None and calls[1] is not None
+
+
+def test_shared_fetcher_times_each_job_into_its_own_stats(make_service):
+    async def two_jobs():
+        manager = JobManager()
+        services = [make_service(index_search=False), make_service(index_search=False)]
+        try:
+            for service in services:
+                service.use_shared(fetcher=await manager._fetcher_for(service))
+            await asyncio.gather(*(service.crawl(max_pages=3) for service in services))
+            return services, [service.fetcher for service in services]
+        finally:
+            await manager.close()
+
+    (first, second), (first_fetcher, second_fetcher) = asyncio.run(two_jobs())
+
+    assert first_fetcher is second_fetcher
+    assert first_fetcher.stats is None
+    # crawl() starts new stats, the fetcher times into those of each crawl
+    assert first.stats.histograms['http'].count == first.stats['fetched'] == 3
+    assert second.stats.histograms['http'].count == second.stats['fetched'] == 3
+
+
+def test_service_keeps_shared_indexes_open(db, workdir):
+    near_duplicates = SimHashIndex()
+    search_index = SearchIndex(str(workdir / 'search.sqlite'))
+    service = EyewikiService('eyewiki', fetch_mode='http', metrics_port=None, metrics_file=None)
+    service.use_shared(near_duplicates=near_duplicates, search_index=search_index)
+
+    async def enter_and_leave():
+        async with service:
+            assert service.near_duplicates is near_duplicates
+
+    asyncio.run(enter_and_leave())
+
+    assert service.search_index is search_index
+    assert search_index.counts() == {'pages': 0, 'sections': 0}
+    search_index.close()
+
+
+def test_submit_rejects_bad_seeds_before_building_a_service(monkeypatch):
+    built = []
+    monkeypatch.setitem(jobs.SERVICES, 'eyewiki', lambda **options: built.append(options))
+
+    async def submit(seeds):
+        manager = JobManager()
+        try:
+            manager.submit({'site': 'eyewiki', 'seeds': seeds})
+        finally:
+            await manager.close()
+
+    for seeds in ('https://eyewiki.org/Glaucoma', [1, 2]):
+        with pytest.raises(ValueError, match='seeds must be a list'):
+            asyncio.run(submit(seeds))
+    assert built == []
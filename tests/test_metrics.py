@@ -0,0 +1,106 @@
+import asyncio
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from web_scraper.crawler.metrics import MetricsFile, MetricsServer
+from web_scraper.crawler.stats import CrawlStats, Histogram
+
+
+def test_histogram_quantiles_interpolate_within_buckets():
+    histogram = Histogram(buckets=(1.0, 2.0, 4.0))
+    for value in (0.5, 1.5, 1.5, 3.0):
+        histogram.observe(value)
+
+    assert histogram.quantile(0.25) == pytest.approx(1.0)
+    assert histogram.quantile(0.5) == pytest.approx(1.5)
+    assert histogram.quantile(1.0) == pytest.approx(4.0)
+    assert histogram.cumulative() == [1, 3, 4, 4]
+    assert Histogram().quantile(0.5) == 0.0
+
+
+def test_prometheus_format():
+    stats = CrawlStats(labels={'site': 'eyewiki'})
+    stats.incr('saved', 3)
+    stats.observe('fetch', 0.2)
+
+    text = stats.prometheus()
+
+    assert 'scraper_saved_total{site="eyewiki"} 3' in text
+    assert 'scraper_stage_seconds_bucket{site="eyewiki",stage="fetch",le="0.25"} 1' in text
+    assert 'scraper_stage_seconds_bucket{site="eyewiki",stage="fetch",le="+Inf"} 1' in text
+    assert 'scraper_stage_seconds_count{site="eyewiki",stage="fetch"} 1' in text
+
+
+def get(url):
+    try:
+        with urllib.request.urlopen(url, timeout=5) as response:
+            return response.status, response.read().decode('utf-8')
+    except urllib.error.HTTPError as e:
+        return e.code, ''
+
+
+def test_server_renders_stats_on_the_event_loop():
+    stats = CrawlStats()
+    rendered_on = []
+
+    def current():
+        rendered_on.append(threading.get_ident())
+        return stats
+
+    async def crawl():
+        server = MetricsServer(current, 0).start()
+        base = f'http://127.0.0.1:{server.address[1]}'
+        try:
+            requests = [
+                asyncio.to_thread(get, f'{base}/metrics'),
+                asyncio.to_thread(get, f'{base}/stats.json'),
+                asyncio.to_thread(get, f'{base}/missing'),
+            ]
+            pending = asyncio.gather(*requests)
+            # The crawl keeps changing its stats while the requests are answered
+            while not pending.done():
+                stats.incr('saved')
+                stats.observe(f'stage_{stats["saved"] % 50}', 0.01)
+                await asyncio.sleep(0)
+            return threading.get_ident(), await pending
+        finally:
+            server.close()
+
+    loop_thread, (metrics, stats_json, missing) = asyncio.run(crawl())
+
+    assert metrics[0] == 200 and 'scraper_saved_total' in metrics[1]
+    assert stats_json[0] == 200 and json.loads(stats_json[1])['counters']['saved'] > 0
+    assert missing[0] == 404
+    assert rendered_on and set(rendered_on) == {loop_thread}
+
+
+def test_server_without_a_loop_renders_in_its_thread():
+    stats = CrawlStats()
+    stats.incr('saved', 2)
+    server = MetricsServer(lambda: stats, 0).start()
+    try:
+        status, body = get(f'http://127.0.0.1:{server.address[1]}/stats.json')
+    finally:
+        server.close()
+
+    assert status == 200
+    assert json.loads(body)['counters'] == {'saved': 2}
+
+
+def test_metrics_file_writes_the_final_numbers(tmp_path):
+    stats = CrawlStats()
+    path = tmp_path / 'metrics' / 'stats.json'
+
+    async def crawl():
+        metrics = MetricsFile(lambda: stats, str(path), interval=60).start()
+        stats.incr('saved', 5)
+        await metrics.close()
+
+    asyncio.run(crawl())
+
+    assert json.loads(path.read_text())['counters'] == {'saved': 5}
+    assert [file.name for file in path.parent.iterdir()] == ['stats.json']
@@ -0,0 +1,95 @@
+import asyncio
+import time
+from email.utils import formatdate
+
+import pytest
+
+from web_scraper.config.config import Config
+from web_scraper.crawler.politeness import HostScheduler, TokenBucket, retry_after_seconds
+
+ROBOTS = """User-agent: *
+Disallow: /private/
+Crawl-delay: 4
+Sitemap: http://example.test/sitemap.xml
+"""
+
+
+def check(scheduler, *urls):
+    async def run():
+        try:
+            return [await scheduler.can_fetch(url) for url in urls]
+        finally:
+            await scheduler.close()
+
+    return asyncio.run(run())
+
+
+def test_token_bucket_queues_callers_behind_each_other():
+    bucket = TokenBucket(rate=2.0, burst=2.0)
+    now = bucket.updated
+
+    assert bucket.reserve(now) == 0.0
+    assert bucket.reserve(now) == 0.0
+    assert bucket.reserve(now) == pytest.approx(0.5)
+    assert bucket.reserve(now) == pytest.approx(1.0)
+    # Refills at rate, never above burst
+    assert bucket.reserve(now + 10) == 0.0
+    assert bucket.tokens == pytest.approx(1.0)
+
+
+def test_retry_after_seconds():
+    assert retry_after_seconds('120') == 120.0
+    assert retry_after_seconds(None) is None
+    assert retry_after_seconds('soon') is None
+    assert retry_after_seconds(formatdate(time.time() + 60, usegmt=True)) == pytest.approx(60, abs=2)
+    assert retry_after_seconds(formatdate(time.time() - 60, usegmt=True)) == 0.0
+
+
+def test_rate_adapts_to_responses():
+    scheduler = HostScheduler(rate=2.0, max_rate=3.0)
+    url = 'http://example.test/page'
+
+    scheduler.record(url, 200, elapsed=0.1)
+    assert scheduler.host(url)[1].rate == pytest.approx(2.0 + Config.POLITENESS_INCREASE)
+    scheduler.record(url, 429, elapsed=0.1, retry_after='30')
+    state = scheduler.host(url)[1]
+    assert state.rate == pytest.approx((2.0 + Config.POLITENESS_INCREASE) * Config.POLITENESS_BACKOFF)
+    assert state.blocked_until > time.monotonic() + 25
+    assert scheduler.throttled == 1
+    throttled_rate = state.rate
+    scheduler.record(url, 200, elapsed=Config.POLITENESS_SLOW_RESPONSE + 1)
+    assert state.rate == pytest.approx(throttled_rate * Config.POLITENESS_BACKOFF)
+    for _ in range(100):
+        scheduler.record(url, 200, elapsed=0.1)
+    assert state.rate == 3.0
+
+
+def test_share_divides_the_rates():
+    scheduler = HostScheduler(rate=2.0, max_rate=10.0, share=0.25)
+
+    assert scheduler.host('http://example.test/')[1].rate == 0.5
+    assert scheduler.host('http://example.test/')[1].max_rate == 2.5
+
+
+def test_robots_rules_and_crawl_delay(serve_pages):
+    base_url = serve_pages({'/robots.txt': (200, ROBOTS)})
+    scheduler = HostScheduler(rate=2.0, share=0.5)
+
+    assert check(scheduler, f'{base_url}/page', f'{base_url}/private/x') == [True, False]
+    state = scheduler.host(base_url)[1]
+    # Crawl-delay 4 caps the rate at 1/4 request per second, of which this worker gets half
+    assert state.max_rate == 0.125
+    assert state.rate == 0.125
+    assert state.bucket.burst == 1.0
+    assert scheduler.allowed(f'{base_url}/private/y') is False
+
+
+@pytest.mark.parametrize('status, allowed', [(404, True), (403, False), (500, True)])
+def test_robots_status(serve_pages, status, allowed):
+    base_url = serve_pages({'/robots.txt': (status, 'nope')})
+
+    assert check(HostScheduler(), f'{base_url}/page') == [allowed]
+
+
+def test_robots_can_be_ignored():
+    assert check(HostScheduler(respect_robots=False), 'http://unreachable.invalid/page') == [True]
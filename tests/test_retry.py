@@ -0,0 +1,132 @@
+import random
+
+import httpx
+import pytest
+
+from web_scraper.crawler import retry
+from web_scraper.crawler.frontier import FrontierEntry
+from web_scraper.crawler.retry import (
+    CircuitBreaker, RetryableStatusError, RetryQueue, backoff_delay, is_retryable
+)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(retry.time, 'monotonic', clock)
+    return clock
+
+
+def test_backoff_is_exponential_with_full_jitter():
+    random.seed(3)
+    for attempt in range(1, 6):
+        delays = [backoff_delay(attempt, base=1.0, cap=10.0) for _ in range(500)]
+        limit = min(10.0, 2 ** (attempt - 1))
+        assert all(0 <= delay <= limit for delay in delays)
+        # Spread over the whole window rather than bunched at its end
+        assert min(delays) < limit * 0.1 and max(delays) > limit * 0.9
+
+
+def test_backoff_respects_retry_after():
+    assert all(backoff_delay(1, base=1.0, retry_after=30) == 30 for _ in range(20))
+    assert backoff_delay(1, base=1.0, retry_after=None) <= 1.0
+
+
+def test_is_retryable():
+    assert is_retryable(RetryableStatusError(503))
+    assert is_retryable(httpx.ConnectTimeout('slow'))
+    assert is_retryable(ConnectionResetError())
+    assert not is_retryable(ValueError('bad markup'))
+
+
+def test_is_retryable_browser_errors():
+    playwright = pytest.importorskip('playwright.async_api')
+
+    assert is_retryable(playwright.TimeoutError('Timeout 15000ms exceeded'))
+    assert is_retryable(playwright.Error('net::ERR_CONNECTION_RESET at https://a/'))
+    assert not is_retryable(playwright.Error('net::ERR_CERT_DATE_INVALID at https://a/'))
+
+
+def test_retry_queue_orders_by_due_time(clock):
+    queue = RetryQueue(max_attempts=3)
+    late, soon = FrontierEntry('http://a/late', 1), FrontierEntry('http://a/soon', 1)
+
+    assert queue.schedule(late, 10)
+    assert queue.schedule(soon, 5)
+    assert queue.entries() == [soon, late]
+    assert queue.next_due() == 5
+    assert queue.pop_due() is None
+
+    clock.now += 6
+    assert queue.pop_due() == soon
+    assert queue.pop_due() is None
+    clock.now += 4
+    assert queue.pop_due() == late
+    assert not queue
+
+
+def test_retry_queue_gives_up_after_max_attempts(clock):
+    queue = RetryQueue(max_attempts=3)
+    entry = FrontierEntry('http://a/1', 0)
+
+    assert [queue.schedule(entry, 0) for _ in range(3)] == [True, True, False]
+    # Deferrals that are not attempts don't use them up
+    assert queue.schedule(entry, 0, count_attempt=False)
+    assert len(queue) == 3
+
+
+def test_breaker_opens_once_and_ignores_failures_while_open(clock):
+    breaker = CircuitBreaker(threshold=3, cooldown=10, max_cooldown=100)
+
+    assert [breaker.record_failure() for _ in range(3)] == [False, False, True]
+    assert breaker.wait() == 10
+    open_until = breaker.open_until
+
+    # Requests already in flight when it opened fail too
+    clock.now += 5
+    assert not breaker.record_failure()
+    assert not breaker.record_failure()
+    assert breaker.open_until == open_until
+    assert breaker.trips == 1
+    assert breaker.wait() == 5
+
+
+def test_breaker_probe_failure_doubles_cooldown(clock):
+    breaker = CircuitBreaker(threshold=1, cooldown=10, max_cooldown=15)
+    breaker.record_failure()
+
+    clock.now += 10
+    assert breaker.wait() == 0.0
+    # One probe at a time
+    assert breaker.wait() == 1.0
+    assert breaker.record_failure()
+    assert breaker.wait() == 15
+    assert breaker.trips == 2
+
+    clock.now += 15
+    assert breaker.wait() == 0.0
+    breaker.record_success()
+    assert not breaker.is_open
+    assert breaker.wait() == 0.0
+    assert breaker.cooldown == 10
+
+
+def test_breaker_probe_released_without_a_verdict(clock):
+    breaker = CircuitBreaker(threshold=1, cooldown=10)
+    breaker.record_failure()
+
+    clock.now += 10
+    assert breaker.wait() == 0.0
+    breaker.release()
+
+    # Still open, the next page is the probe
+    assert breaker.is_open
+    assert breaker.wait() == 0.0
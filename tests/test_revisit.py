@@ -0,0 +1,83 @@
+import math
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from web_scraper.config.config import Config
+from web_scraper.crawler.revisit import change_history, change_probability, estimate_change_rate, select_revisits
+
+NOW = datetime(2024, 6, 1)
+
+
+def test_estimate_needs_two_checks_over_time():
+    assert estimate_change_rate(1, 0, NOW, NOW) is None
+    assert estimate_change_rate(5, 2, NOW, NOW) is None
+    assert estimate_change_rate(5, 2, None, NOW) is None
+    assert estimate_change_rate(5, 0, NOW - timedelta(days=4), NOW) == 0.0
+
+
+def test_estimate_corrects_for_missed_changes():
+    # 10 daily checks that all saw a change: at least 1 change a day, likely more
+    rate = estimate_change_rate(11, 10, NOW - timedelta(days=10), NOW)
+
+    assert rate == pytest.approx(math.log(10.5 / 0.5))
+    assert rate > 1.0
+    # More changes than intervals can't be seen, they are capped
+    assert estimate_change_rate(11, 50, NOW - timedelta(days=10), NOW) == rate
+
+
+@pytest.mark.parametrize('true_rate', [0.1, 0.5, 2.0])
+def test_estimate_recovers_poisson_rate(true_rate):
+    rng = random.Random(1)
+    checks = 3000
+    # Daily checks of a page changing as a Poisson process: a check sees a
+    # change when at least one happened since the previous check
+    changes = sum(rng.random() < 1 - math.exp(-true_rate) for _ in range(checks - 1))
+
+    rate = estimate_change_rate(checks, changes, NOW - timedelta(days=checks - 1), NOW)
+
+    assert rate == pytest.approx(true_rate, rel=0.1)
+
+
+def test_change_history_counts_checks():
+    first = change_history(None, True, NOW)
+    assert first['checks'] == 1 and first['change_rate'] is None
+
+    second = change_history(first, False, NOW + timedelta(days=1))
+    third = change_history(second, True, NOW + timedelta(days=2))
+
+    assert (third['checks'], third['changes']) == (3, 1)
+    assert third['first_checked_at'] == NOW
+    assert third['last_changed_at'] == NOW + timedelta(days=2)
+    assert second['last_changed_at'] == NOW
+    assert third['change_rate'] == estimate_change_rate(3, 1, NOW, NOW + timedelta(days=2))
+
+
+def test_change_probability():
+    assert change_probability({}, NOW) == 1.0
+    checked = {'last_checked_at': NOW - timedelta(days=10)}
+
+    assert change_probability({**checked, 'change_rate': 0.1}, NOW) == pytest.approx(1 - math.exp(-1))
+    assert change_probability(checked, NOW) == pytest.approx(1 - math.exp(-Config.REVISIT_DEFAULT_RATE * 10))
+    # Never seen changing is not never changing
+    assert change_probability({**checked, 'change_rate': 0.0}, NOW) == pytest.approx(
+        1 - math.exp(-Config.REVISIT_MIN_RATE * 10)
+    )
+    assert change_probability({'last_checked_at': NOW + timedelta(days=1)}, NOW) == 0.0
+
+
+def test_select_revisits_takes_most_likely_changed():
+    pages = [
+        {'url': 'http://a/busy', 'last_checked_at': NOW - timedelta(days=1), 'change_rate': 5.0},
+        {'url': 'http://a/weekly', 'last_checked_at': NOW - timedelta(days=3), 'change_rate': 1 / 7},
+        {'url': 'http://a/static', 'last_checked_at': NOW - timedelta(days=3), 'change_rate': 0.0},
+        {'url': 'http://a/unknown'},
+    ]
+
+    assert [url for url, _ in select_revisits(pages, 10, NOW, min_probability=0.1)] == [
+        'http://a/unknown', 'http://a/busy', 'http://a/weekly'
+    ]
+    assert [url for url, _ in select_revisits(pages, 2, NOW, min_probability=0.0)] == [
+        'http://a/unknown', 'http://a/busy'
+    ]
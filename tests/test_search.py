@@ -0,0 +1,120 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from web_scraper.database.client import save_page_bundles
+from web_scraper.extraction import get_engine
+from web_scraper.search import SearchIndex, section_anchor, split_sections
+
+TEXT = "Welcome to the wiki. Retinal detachment The retina peels away. Symptoms Floaters and flashes."
+
+
+def heading(title, level=2, path=(), anchor=None):
+    return {'title': title, 'level': level, 'path': list(path), 'anchor': anchor}
+
+
+def document(url, text=TEXT, headings=None, checksum='c1', site_id='eyewiki'):
+    return {
+        'url': url, 'site_id': site_id, 'checksum': checksum, 'content_text': text,
+        'headings': headings if headings is not None else [
+            heading('Retinal detachment', 1, anchor='<span id="Retinal_detachment">'),
+            heading('Symptoms', 2, path=['Retinal detachment'], anchor='<span class="mw-headline" id="Symptoms">'),
+        ]
+    }
+
+
+@pytest.fixture
+def index(workdir):
+    search_index = SearchIndex(str(workdir / 'search.sqlite'))
+    yield search_index
+    search_index.close()
+
+
+def test_split_sections_cuts_text_at_headings():
+    sections = split_sections(TEXT, document('http://a/1')['headings'] + [heading('Not in the text')])
+
+    assert [(section['title'], section['body']) for section in sections] == [
+        ('', 'Welcome to the wiki.'),
+        ('Retinal detachment', 'The retina peels away.'),
+        ('Symptoms', 'Floaters and flashes.'),
+        ('Not in the text', ''),
+    ]
+    assert sections[2]['path'] == 'Retinal detachment'
+    assert sections[2]['anchor'] == 'Symptoms'
+
+
+def test_split_sections_matches_headings_joined_without_spaces():
+    sections = split_sections('Intro Side effects Dry eyes', [heading('Sideeffects')])
+
+    assert sections[1]['body'] == 'Dry eyes'
+    assert split_sections(None, []) == []
+
+
+def test_section_anchor():
+    assert section_anchor('<h2><span class="mw-headline" id="Causes">Causes</span></h2>') == 'Causes'
+    assert section_anchor('<h2 data-id="x">Causes</h2>') is None
+    assert section_anchor(None) is None
+
+
+def test_search_ranks_heading_hits_first_and_links_to_the_section(index):
+    index.update([
+        document('http://a/1'),
+        document('http://a/2', text='Intro Treatment Symptoms of many conditions are mentioned here.',
+                 headings=[heading('Treatment')]),
+    ])
+
+    hits = index.search('symptoms')
+
+    assert [hit.link for hit in hits] == ['http://a/1#Symptoms', 'http://a/2']
+    assert hits[0].path == 'Retinal detachment'
+    assert '[' in hits[1].snippet
+    assert index.search('symptoms', site_id='other') == []
+
+
+def test_user_queries_are_not_fts_syntax(index):
+    index.update([document('http://a/1')])
+
+    assert index.search('retina OR') == []
+    assert index.search('"floaters') != []
+    assert [hit.url for hit in index.search('retin*', raw=True)] == ['http://a/1', 'http://a/1']
+
+
+def test_update_skips_unchanged_pages_and_removes_empty_ones(index):
+    assert index.update([document('http://a/1')]) == 1
+    assert index.update([document('http://a/1')]) == 0
+    assert index.update([document('http://a/1')], force=True) == 1
+    assert index.update([document('http://a/1', text='Other words', headings=[], checksum='c2')]) == 1
+    assert index.search('floaters') == []
+
+    index.update([document('http://a/1', text='', headings=[])])
+
+    assert index.counts() == {'pages': 0, 'sections': 0}
+
+
+def test_sync_catches_up_with_saved_pages(db, index):
+    html = '<html><body><p>Intro</p><h2 id="Causes">Causes</h2><p>Trauma of the eye</p></body></html>'
+    extraction = get_engine('bs4').extract(html, 'http://a/1')
+    page = {'url': 'http://a/1', 'site_id': 'eyewiki', 'checksum': 'c1',
+            'content_text': 'Intro Causes Trauma of the eye'}
+    save_page_bundles([{'page': page, 'headings': extraction.headings, 'links': [], 'files': []}])
+    db.pages.update_one({'url': 'http://a/1'}, {'$set': {'updated_at': datetime.now() - timedelta(minutes=5)}})
+
+    assert index.sync(db, 'eyewiki') == 1
+    assert [hit.title for hit in index.search('trauma')] == ['Causes']
+    # Already indexed up to the last sync
+    assert index.sync(db, 'eyewiki') == 0
+    assert index.sync(db, 'eyewiki', full=True) == 1
+
+
+def test_crawl_indexes_pages_as_they_are_saved(make_service, workdir):
+    service = make_service(index_search=True)
+
+    asyncio.run(service.crawl(max_pages=5))
+
+    search_index = SearchIndex(str(workdir / 'search.sqlite'))
+    try:
+        assert search_index.counts()['pages'] == 5
+        assert search_index.search('Article') != []
+    finally:
+        search_index.close()
@@ -0,0 +1,83 @@
+import math
+
+import pytest
+
+from web_scraper.crawler.seen import (
+    SEEN_BACKENDS, BloomFilter, BloomSeenSet, DiskSeenSet, create_seen_set, url_hashes
+)
+
+
+def urls(prefix: str, count: int):
+    return [f'http://example.test/{prefix}/{index}' for index in range(count)]
+
+
+def test_bloom_filter_is_sized_for_capacity():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+
+    # About 9.6 bits and 7 hashes per item for 1%
+    assert bloom.size == math.ceil(-1000 * math.log(0.01) / math.log(2) ** 2)
+    assert bloom.hash_count == 7
+    assert bloom.memory_bytes == (bloom.size + 7) // 8
+
+
+@pytest.mark.parametrize('error_rate', [0.01, 0.001])
+def test_bloom_filter_false_positive_rate(error_rate):
+    bloom = BloomFilter(capacity=20000, error_rate=error_rate)
+    added = urls('added', 20000)
+    for url in added:
+        bloom.add(url_hashes(url))
+
+    assert all(url_hashes(url) in bloom for url in added)
+    probes = urls('other', 100000)
+    false_positives = sum(url_hashes(url) in bloom for url in probes) / len(probes)
+    assert false_positives < error_rate * 1.5
+
+
+def test_bloom_filter_degrades_past_capacity():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for url in urls('added', 5000):
+        bloom.add(url_hashes(url))
+
+    probes = urls('other', 10000)
+    assert sum(url_hashes(url) in bloom for url in probes) / len(probes) > 0.1
+
+
+@pytest.mark.parametrize('backend', SEEN_BACKENDS)
+def test_seen_sets(backend):
+    seen = create_seen_set(backend)
+    try:
+        assert 'http://a/1' not in seen
+        assert seen.add('http://a/1')
+        assert not seen.add('http://a/1')
+        assert 'http://a/1' in seen
+        assert seen.add('http://a/2')
+        assert len(seen) == 2
+        assert seen.memory_bytes > 0
+    finally:
+        seen.close()
+
+
+def test_disk_seen_set_stays_exact_when_its_filter_is_full():
+    seen = DiskSeenSet(capacity=10, error_rate=0.1, cache_mb=1)
+    added = urls('added', 2000)
+    assert all(seen.add(url) for url in added)
+
+    assert not any(url in seen for url in urls('other', 2000))
+    assert all(url in seen for url in added)
+    assert not any(seen.add(url) for url in added)
+    assert len(seen) == 2000
+    seen.close()
+
+
+def test_bloom_seen_set_uses_fixed_memory():
+    seen = BloomSeenSet(capacity=10000, error_rate=0.01)
+    before = seen.memory_bytes
+    for url in urls('added', 5000):
+        seen.add(url)
+
+    assert seen.memory_bytes == before
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        create_seen_set('redis')
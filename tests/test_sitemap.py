@@ -0,0 +1,140 @@
+import asyncio
+import gzip
+from datetime import datetime, timedelta
+
+import pytest
+
+from web_scraper.crawler.sitemap import SitemapParser, SitemapReader, SitemapTooLarge, parse_lastmod
+from web_scraper.crawler.stats import CrawlStats
+
+URLSET = """<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <url><loc>{base}/old</loc><lastmod>2020-01-01</lastmod></url>
+  <url><loc>{base}/changed</loc><lastmod>2030-01-01T10:00:00Z</lastmod></url>
+  <url><loc> {base}/new </loc></url>
+  <url><loc>{base}/undated</loc></url>
+  <url><loc>http://elsewhere.test/page</loc></url>
+</urlset>
+"""
+
+INDEX = """<?xml version="1.0" encoding="UTF-8"?>
+<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <sitemap><loc>{base}/sitemap-pages.xml</loc><lastmod>2024-05-01</lastmod></sitemap>
+  <sitemap><loc>{base}/sitemap-missing.xml</loc></sitemap>
+  <sitemap><loc>{base}/sitemap.xml</loc></sitemap>
+</sitemapindex>
+"""
+
+
+def parse(data: bytes, chunk_size: int = 7):
+    parser = SitemapParser()
+    entries = []
+    for start in range(0, len(data), chunk_size):
+        entries += parser.feed(data[start:start + chunk_size])
+    entries += parser.close()
+    return entries, parser.sitemaps
+
+
+def test_parse_lastmod():
+    assert parse_lastmod('2024-05-01') == datetime(2024, 5, 1)
+    assert parse_lastmod(' 2024-05-01T10:30:00 ') == datetime(2024, 5, 1, 10, 30)
+    utc = parse_lastmod('2024-05-01T10:30:00Z')
+    assert utc == parse_lastmod('2024-05-01T12:30:00+02:00')
+    assert utc.tzinfo is None
+    assert parse_lastmod('yesterday') is None
+    assert parse_lastmod(None) is None
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_parser_streams_chunks(compress):
+    data = URLSET.format(base='http://a').encode()
+    entries, sitemaps = parse(gzip.compress(data) if compress else data)
+
+    assert [entry.url for entry in entries] == [
+        'http://a/old', 'http://a/changed', 'http://a/new', 'http://a/undated', 'http://elsewhere.test/page'
+    ]
+    assert entries[0].lastmod == datetime(2020, 1, 1)
+    assert entries[2].lastmod is None
+    assert sitemaps == []
+
+
+def test_parser_collects_child_sitemaps():
+    entries, sitemaps = parse(INDEX.format(base='http://a').encode())
+
+    assert entries == []
+    assert [sitemap.url for sitemap in sitemaps] == [
+        'http://a/sitemap-pages.xml', 'http://a/sitemap-missing.xml', 'http://a/sitemap.xml'
+    ]
+    assert sitemaps[0].lastmod == datetime(2024, 5, 1)
+
+
+def test_parser_stops_inflating_at_the_size_limit():
+    # 100 MB of nothing, 100 kB compressed
+    bomb = gzip.compress(b'<urlset>' + b' ' * 100 * 2 ** 20)
+    parser = SitemapParser(max_bytes=2 ** 20)
+
+    with pytest.raises(SitemapTooLarge):
+        for start in range(0, len(bomb), 65536):
+            parser.feed(bomb[start:start + 65536])
+    assert parser.size == 2 ** 20 + 1
+
+    small = SitemapParser(max_bytes=len(URLSET))
+    with pytest.raises(SitemapTooLarge):
+        small.feed(URLSET.format(base='http://a').encode())
+
+
+def test_reader_skips_sitemaps_over_the_limit(serve_pages):
+    pages = {}
+    base_url = serve_pages(pages)
+    pages['/sitemap-pages.xml'] = (200, URLSET.format(base=base_url))
+
+    async def read(max_bytes):
+        async with SitemapReader(max_bytes=max_bytes) as reader:
+            return [entry async for entry in reader.entries(f'{base_url}/sitemap-pages.xml')]
+
+    assert asyncio.run(read(100)) == []
+    assert len(asyncio.run(read(10000))) == 5
+
+
+def test_reader_follows_index_once(serve_pages):
+    pages = {}
+    base_url = serve_pages(pages)
+    pages['/sitemap.xml'] = (200, INDEX.format(base=base_url))
+    pages['/sitemap-pages.xml'] = (200, URLSET.format(base=base_url))
+
+    async def read():
+        async with SitemapReader() as reader:
+            return [batch async for batch in reader.batches([f'{base_url}/sitemap.xml'], size=2)]
+
+    batches = asyncio.run(read())
+
+    # The index lists itself, it is not read twice; the missing child is skipped
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+
+
+def test_seed_skips_pages_unchanged_since_last_crawl(make_service, serve_pages, db):
+    pages = {}
+    base_url = serve_pages(pages)
+    pages['/sitemap.xml'] = (200, URLSET.format(base=base_url))
+    seen = datetime.now() - timedelta(days=1)
+    db.pages.insert_many([
+        {'url': f'{base_url}/old', 'updated_at': seen},
+        {'url': f'{base_url}/changed', 'fetched_at': seen},
+        {'url': f'{base_url}/undated', 'updated_at': seen},
+    ])
+    service = make_service()
+    service.base_url = base_url + '/'
+    service.frontier = service.create_frontier()
+    service.stats = CrawlStats()
+
+    queued = asyncio.run(service.seed_from_sitemaps([f'{base_url}/sitemap.xml']))
+
+    queued_urls = {service.frontier.pop().url for _ in range(queued)}
+    assert queued_urls == {f'{base_url}/changed', f'{base_url}/new', f'{base_url}/undated'}
+    assert service.stats['sitemap_unchanged'] == 1
+    # Skipped URLs are seen, a link to them is not followed either
+    assert not service.frontier.push(f'{base_url}/old')
+
+    service.force = True
+    service.frontier = service.create_frontier()
+    assert asyncio.run(service.seed_from_sitemaps([f'{base_url}/sitemap.xml'])) == 4
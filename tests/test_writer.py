@@ -0,0 +1,112 @@
+import asyncio
+
+from web_scraper.database.client import save_page_bundles
+from web_scraper.database.writer import PageWriter
+from web_scraper.extraction import get_engine
+
+HTML = '<html><body><h1>Title</h1><p>Intro</p><h2>Section</h2><p>Body <a href="/b">B</a></p></body></html>'
+
+
+def bundle(url, html=HTML, checksum='new'):
+    extraction = get_engine('bs4').extract(html, url)
+    page = {
+        'url': url, 'site_id': 'test', 'status_code': 200, 'checksum': checksum, 'fingerprint': checksum,
+        'etag': '"v2"', 'content_html': extraction.html, 'content_text': extraction.text
+    }
+    return {'page': page, 'headings': extraction.headings, 'links': extraction.links, 'files': extraction.files}
+
+
+def run_writer(bundles, **options):
+    async def run():
+        writer = await PageWriter(**options).start()
+        for item in bundles:
+            await writer.submit(item['page'], item['headings'], item['links'], item['files'])
+        failed = await writer.sync()
+        await writer.close()
+        return writer, failed
+
+    return asyncio.run(run())
+
+
+def test_writer_saves_batches_and_reports_no_failures(db):
+    writer, failed = run_writer([bundle(f'http://a/{i}') for i in range(5)], batch_size=2, flush_interval=0.01)
+
+    assert failed == set()
+    assert writer.pages_written == 5
+    assert writer.batches_written == 3
+    assert db.pages.count_documents({'checksum': 'new'}) == 5
+    assert db.headings.count_documents({}) == 10
+
+
+def test_writer_retries_failed_batch():
+    calls = []
+
+    def flaky(batch):
+        calls.append(len(batch))
+        if len(calls) == 1:
+            raise ConnectionError('primary stepped down')
+        return {'pages': len(batch), 'writes_avoided': 0, 'failed': []}
+
+    writer, failed = run_writer([bundle('http://a/1')], flush=flaky, retry_delay=0)
+
+    assert failed == set()
+    assert calls == [1, 1]
+    assert writer.pages_written == 1
+
+
+def test_writer_reports_batch_it_gave_up_on():
+    def broken(batch):
+        raise ConnectionError('down')
+
+    saved = []
+    writer, failed = run_writer([bundle('http://a/1'), bundle('http://a/2')], flush=broken, attempts=2,
+                                retry_delay=0, on_flushed=saved.extend)
+
+    assert failed == {'http://a/1', 'http://a/2'}
+    assert writer.pages_failed == 2
+    assert saved == []
+
+
+def test_sync_only_reports_failures_once():
+    async def run():
+        writer = await PageWriter(flush=lambda batch: {'pages': 0, 'writes_avoided': 0, 'failed': ['http://a/1']},
+                                  flush_interval=0.01).start()
+        item = bundle('http://a/1')
+        await writer.submit(item['page'], item['headings'], item['links'], item['files'])
+        first = await writer.sync()
+        second = await writer.sync()
+        await writer.close()
+        return first, second
+
+    assert asyncio.run(run()) == ({'http://a/1'}, set())
+
+
+def test_failed_child_writes_keep_the_old_checksum(db):
+    save_page_bundles([bundle('http://a/ok', checksum='old'), bundle('http://a/bad', checksum='old')])
+    bad_id = db.pages.find_one({'url': 'http://a/bad'})['_id']
+    # Any insert of a link for this page now fails
+    db.links.create_index([('page_id', 1), ('title', 1)], unique=True)
+    db.links.insert_one({'page_id': bad_id, 'title': 'C', 'url': 'http://a/elsewhere'})
+
+    changed = '<html><body><h1>Title</h1><p>Changed <a href="/c">C</a></p></body></html>'
+    result = save_page_bundles([bundle('http://a/ok', changed), bundle('http://a/bad', changed)])
+
+    assert result['failed'] == ['http://a/bad']
+    assert result['pages'] == 1
+    assert db.pages.find_one({'url': 'http://a/ok'})['checksum'] == 'new'
+    # The next crawl still sees the page as changed and writes it again
+    bad = db.pages.find_one({'url': 'http://a/bad'})
+    assert bad['checksum'] == 'old'
+    assert bad['fingerprint'] == 'old'
+
+
+def test_failed_page_write_does_not_abort_the_batch(db):
+    # Only one page per site and status, the second upsert fails
+    db.pages.create_index([('site_id', 1), ('status_code', 1)], unique=True)
+    first, second = bundle('http://a/1'), bundle('http://a/2')
+
+    result = save_page_bundles([first, second])
+
+    assert result['failed'] == ['http://a/2']
+    assert db.headings.count_documents({}) == 2
+    assert db.pages.find_one({'url': 'http://a/1'})['checksum'] == 'new'